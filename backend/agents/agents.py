@@ -1,54 +1,42 @@
-from agno.agent import Agent
-from agno.models.google.gemini import Gemini
-from agno.models.groq import Groq
-from agno.memory.v2.db.sqlite import SqliteMemoryDb
-from agno.memory.v2.memory import Memory
-from agno.team import Team
 from dotenv import load_dotenv
 import os
 import asyncio
-import json
+import logging
+import time
+from typing import Optional, Tuple
 
 # Import Pydantic models
 from models.schemas import (
     SceneResponse, AgentInput, Item, DialogueLine, Character, QuestObjective,
-    EnvironmentalConditions, ResourceAvailability, GameState, InteractiveElement,
-    EnvironmentalDiscovery, ThreatUpdate, AmbientEvent, LoreEntry, WorldInfo,
-    UserInteraction, CurrentSceneContext, GameProgressContext, InventoryChanges
+    GameState, InteractiveElement, EnvironmentalDiscovery, ThreatUpdate, AmbientEvent, LoreEntry,
+    UserInteraction, CurrentSceneContext, GameProgressContext
 )
+from agents.scheduler import CallScheduler
+from agents.fake_providers import FakeProvider
+from agents.routing import ModelRouter
+from agents.prompt_cache import PromptCache
+from agents.rate_limiter import PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, RateLimiter
+from agents.http_pool import http_pool
+from agents.registry import DB_FILE, AgentRegistry
+from agents.usage import BUDGET_EXHAUSTED, UsageLedger
+from agents.cassette import Cassette
+from agents.summarizer import RollingSummary
 
 load_dotenv()
 
-db_file = "data/agent_memory.db"
-os.makedirs("data", exist_ok=True)
+logger = logging.getLogger(__name__)
 
-# Initialize models
-try:
-    gemini_model = Gemini(
-   "gemini-2.0-flash",
-    api_key=os.getenv("GEMINI_API_KEY")
-)
-    
-    groq_model = Groq(
-        "gemma2-9b-it",
-        api_key=os.getenv("GROQ_API_KEY")
-    )
-except Exception as e:
-    print(f"Error initializing models: {e}")
-    exit(1)
-
-# Setup Memory
-memory = Memory(
-    model=gemini_model,
-    db=SqliteMemoryDb(table_name="game_memory", db_file=db_file)
-)
+# Every agent gets its model from the routing table; models themselves are
+# built by the agent registry on first use, not at import
+model_router = ModelRouter.from_env()
+
+# Offline stand-ins used instead of the real providers when FAKE_LLM=true, one per tier
+FAKE_PROVIDERS = {tier: FakeProvider.from_env(f"fake_{tier}") for tier in model_router.order}
 
 # OPTIMIZED AGENTS - STREAMLINED FOR EFFICIENCY
 
-narrative_tool = Agent(
-    name="narrative_agent",
-    model=groq_model,
-    instructions="""Create cinematic 400-600 word scene descriptions for movie-like experience.
+SPECIALIST_INSTRUCTIONS = {
+    "narrative_agent": """Create cinematic 400-600 word scene descriptions for movie-like experience.
 MOVIE FOCUS: Each scene is a crucial story beat - opening, rising action, climax, resolution.
 PACING: Scenes 1-10 (setup/world-building), 11-25 (rising tension), 26-40 (climax), 41-50 (resolution/ending).
 STYLE: Cinematic present tense, rich sensory details, emotional depth, cliffhanger momentum.
@@ -56,13 +44,8 @@ STORY PROGRESSION: Each scene must advance plot significantly - major revelation
 ENDING PREPARATION: Scenes 40+ should build toward meaningful conclusion with character arcs completing.
 AVOID: Trivial interactions, simple movements, basic conversations.
 INCLUDE: High stakes moments, emotional beats, plot revelations, character growth.
-OUTPUT: narration_text (600-800 words) with cinematic tension and major story advancement."""
-)
-
-npc_agent = Agent(
-    name="npc_agent",
-    model=groq_model,
-    instructions="""Create deep, evolving NPCs with significant story impact and meaningful relationships.
+OUTPUT: narration_text (600-800 words) with cinematic tension and major story advancement.""",
+    "npc_agent": """Create deep, evolving NPCs with significant story impact and meaningful relationships.
 CHARACTER DEPTH: Each NPC has complex motivations, secrets, character arcs, and story importance.
 RELATIONSHIP EVOLUTION: Trust/relationship changes should be dramatic based on major story events.
 STORY ROLES: NPCs drive plot forward - allies become enemies, reveal secrets, make sacrifices, betray player.
@@ -70,24 +53,14 @@ DIALOGUE FOCUS: NPCs speak with purpose - reveal plot, show personality, create
 AVOID: Small talk, trivial interactions, surface-level conversations.
 INCLUDE: Emotional revelations, plot-critical information, character backstory, moral conflicts.
 ENDING ARCS: Characters should have meaningful resolutions - redemption, sacrifice, revelation, growth.
-OUTPUT: Complete character data with dramatic relationship changes and story-driving interactions."""
-)
-
-world_tool = Agent(
-    name="worldbuilder_agent",
-    model=groq_model,
-    instructions="""Design evolving locations and interactive elements that respond to story progression.
+OUTPUT: Complete character data with dramatic relationship changes and story-driving interactions.""",
+    "worldbuilder_agent": """Design evolving locations and interactive elements that respond to story progression.
 WORLD EVOLUTION: World changes based on scenes completed (1-50) - settlements grow, threats spread, resources shift.
 CREATE: Environmental details, weather patterns, hazards, discoverable objects, hidden areas, resource nodes.
-FILL: location_flags, environmental_conditions, resource_availability, world_info (complete with key_locations, dominant_factions, major_threats, cultural_notes, historical_timeline), location_details (exits, hidden_areas, resource_nodes, safety_level).
+FILL: location_flags, environmental_conditions, resource_availability, world_info (complete with key_locations, dominant_factions, major_threats, cultural_notes, historical_timeline; opening scene only, afterwards only a world_info_delta with what changed), location_details (exits, hidden_areas, resource_nodes, safety_level).
 PROGRESSION: Early scenes = basic survival, mid scenes = faction conflicts, late scenes = world-changing events.
-OUTPUT: Complete world state with all location and environmental data filled."""
-)
-
-threat_agent = Agent(
-    name="threat_agent",
-    model=groq_model,
-    instructions="""Create ACTIVE, PHYSICALLY ENGAGING threats that directly attack/interact with player and NPCs.
+OUTPUT: Complete world state with all location and environmental data filled.""",
+    "threat_agent": """Create ACTIVE, PHYSICALLY ENGAGING threats that directly attack/interact with player and NPCs.
 ACTIVE ENGAGEMENT: Threats don't just exist - they ACT. "Zombie grabs your arm", "Raptor pounces on Sarah", "Raider shoots at cover", "Beast drags wounded ally away".
 PHYSICAL INTERACTION: Threats grab, chase, corner, wound, kill, trap, hunt, ambush, stalk.
 NPC IMPACT: Threats actively target NPCs - wound them, kill them, capture them, threaten them.
@@ -95,13 +68,8 @@ ESCALATION: Early threats injure/scare, mid-game threats kill NPCs, late-game th
 CONSEQUENCES: Threat actions have immediate story impact - injured allies, dead characters, changed dynamics.
 RESOLUTION VARIETY: Combat, stealth, sacrifice, negotiation, environmental solutions.
 MOVIE MOMENTS: Create scenes like "alien bursts from chest", "T-Rex breaks fence", "zombies swarm".
-OUTPUT: Immediate, physical threat interactions that create dramatic story moments and force crucial decisions."""
-)
-
-quest_agent = Agent(
-    name="quest_agent",
-    model=groq_model,
-    instructions="""Create story-critical objectives that drive the 50-scene narrative toward meaningful conclusion.
+OUTPUT: Immediate, physical threat interactions that create dramatic story moments and force crucial decisions.""",
+    "quest_agent": """Create story-critical objectives that drive the 50-scene narrative toward meaningful conclusion.
 STORY ARCS: Early quests establish world/survival, mid-game reveals larger plot, end-game resolves everything.
 MEANINGFUL OBJECTIVES: Each quest should advance main story significantly - not fetch quests or busy work.
 CHARACTER INTEGRATION: Quests involve NPCs deeply - their fates, secrets, character arcs.
@@ -109,69 +77,39 @@ ENDING PREPARATION: Final quests should offer multiple resolution paths and char
 OBJECTIVE TYPES: Rescue operations, moral choices, survival decisions, story revelations, character confrontations.
 AVOID: Collect items, explore areas, basic survival tasks unless story-critical.
 INCLUDE: Character-driven goals, plot revelations, moral dilemmas, world-changing decisions.
-OUTPUT: Story-critical objectives that create dramatic moments and advance toward meaningful ending."""
-)
-
-emotion_agent = Agent(
-    name="emotion_agent",
-    model=groq_model,
-    instructions="""Track complex emotional states and evolving relationships.
+OUTPUT: Story-critical objectives that create dramatic moments and advance toward meaningful ending.""",
+    "emotion_agent": """Track complex emotional states and evolving relationships.
 EMOTIONAL DEPTH: Characters react to major events, remember past interactions, hold grudges, form bonds.
 RELATIONSHIP EVOLUTION: Trust builds/breaks based on player choices and story events.
 MOOD DYNAMICS: Fear, hope, desperation, triumph - emotions should match story intensity.
 FILL: relationship_changes with clear numerical impacts, current_mood updates.
 GROUP DYNAMICS: How characters interact with each other, not just player.
-OUTPUT: Detailed relationship changes and emotional consequences."""
-)
-
-event_agent = Agent(
-    name="event_agent",
-    model=groq_model,
-    instructions="""Generate cinematic ambient events that enhance story atmosphere.
+OUTPUT: Detailed relationship changes and emotional consequences.""",
+    "event_agent": """Generate cinematic ambient events that enhance story atmosphere.
 EVENT TYPES: Environmental (storm approaches, ground shakes), interpersonal (arguments, revelations), discovery (hidden passages, messages), tension (sounds, movements).
 STORY RELEVANCE: Events should foreshadow major plot points or reveal world lore.
 FILL: event_type, description, affects_mood, creates_opportunities.
 CINEMATIC TIMING: Events should build tension and create story moments.
-OUTPUT: Atmospheric events that enhance narrative immersion."""
-)
-
-item_agent = Agent(
-    name="item_agent",
-    model=groq_model,
-    instructions="""Manage meaningful items that serve story and survival purposes.
+OUTPUT: Atmospheric events that enhance narrative immersion.""",
+    "item_agent": """Manage meaningful items that serve story and survival purposes.
 ITEM TYPES: survival (food, water, medicine), tools (weapons, equipment), information (journals, keys), plot items (artifacts, evidence).
 FILL: name, quantity, description, durability (0-100), item_type, properties with detailed information.
 STORY INTEGRATION: Items should connect to quests, character backstories, world lore.
 INVENTORY TRACKING: Track added_items, removed_items, modified_items with clear reasons.
-OUTPUT: Complete item data with story significance and mechanical function."""
-)
-
-structure_agent = Agent(
-    name="structure_agent",
-    model=groq_model,
-    instructions="""Create interactive structures that serve story and gameplay.
+OUTPUT: Complete item data with story significance and mechanical function.""",
+    "structure_agent": """Create interactive structures that serve story and gameplay.
 STRUCTURE TYPES: shelters (temporary safety), functional buildings (crafting, storage), ruins (lore, danger), natural formations (caves, trees).
 STORY INTEGRATION: Structures should reflect world evolution and story progression.
 FILL: All interactive_elements fields (id, name, description, interaction_types, requires_items, unlocks_options, options, potential_outcomes, side_quest_trigger).
 FUNCTIONALITY: Structures should offer meaningful choices and consequences.
-OUTPUT: Complete structure data with interaction options and story connections."""
-)
-
-lore_agent = Agent(
-    name="lore_agent",
-    model=groq_model,
-    instructions="""Discover and manage deep world lore that enhances story immersion.
+OUTPUT: Complete structure data with interaction options and story connections.""",
+    "lore_agent": """Discover and manage deep world lore that enhances story immersion.
 LORE CATEGORIES: history (world events), character (backstories), location (secrets), faction (politics), event (major incidents), artifact (mysterious items).
 FILL: id, title, content, category, discovered_at (ISO datetime), related_entries, importance_level (1-10).
 STORY INTEGRATION: Lore should explain world state, character motivations, and foreshadow future events.
 CONSISTENCY: Maintain world logic and connection between lore entries.
-OUTPUT: Rich lore entries that deepen world understanding and story engagement."""
-)
-
-choice_agent = Agent(
-    name="choice_agent",
-    model=groq_model,
-    instructions="""Create 3-4 MAJOR decision points that significantly impact story, characters, and world.
+OUTPUT: Rich lore entries that deepen world understanding and story engagement.""",
+    "choice_agent": """Create 3-4 MAJOR decision points that significantly impact story, characters, and world.
 MAJOR DECISIONS ONLY: Life/death choices, moral dilemmas, story-changing actions, character fate decisions.
 AVOID: Simple movement, basic actions, trivial choices like "look around" or "talk to NPC".
 STORY IMPACT: Each choice should have major consequences - character deaths, story branches, world changes.
@@ -179,12 +117,8 @@ MORAL WEIGHT: Choices involve sacrifice, betrayal, heroism, survival ethics, cha
 EXAMPLES: "Save ally or escape", "Trust betrayer or go alone", "Sacrifice self or let others die", "Reveal secret or protect someone".
 ENDING CHOICES: Final scenes should offer meaningful resolutions - redemption, sacrifice, different ending paths.
 CONSEQUENCE CLARITY: Players should understand the weight and potential outcomes of their choices.
-OUTPUT: 3-4 crucial decisions that drive story forward and create meaningful consequences."""
-)
-dialogue_agent = Agent(
-    name="dialogue_agent",
-    model=groq_model,
-    instructions="""Generate substantial, story-driving dialogue that advances plot and reveals character.
+OUTPUT: 3-4 crucial decisions that drive story forward and create meaningful consequences.""",
+    "dialogue_agent": """Generate substantial, story-driving dialogue that advances plot and reveals character.
 DIALOGUE DEPTH: 5-6 meaningful exchanges per scene, each revealing plot/character information.
 STORY ADVANCEMENT: Every dialogue exchange should reveal secrets, advance plot, show character growth, or create conflict.
 EMOTIONAL WEIGHT: Dialogue carries emotional impact - confessions, arguments, revelations, farewells.
@@ -192,24 +126,49 @@ AVOID: Small talk, pleasantries, trivial exchanges, exposition dumps.
 INCLUDE: Character secrets, plot revelations, emotional conflicts, backstory, moral dilemmas.
 SCENE IMPACT: Dialogue should change relationships, reveal information, create new objectives.
 ENDING PREPARATION: Late-game dialogue resolves character arcs, reveals final secrets, provides closure.
-OUTPUT: Rich dialogue array with substantial story progression and character development."""
-)
+OUTPUT: Rich dialogue array with substantial story progression and character development.""",
+}
+
+
+# Specialists that can rebuild a single SceneResponse field on their own,
+# used to salvage a turn whose other fields came back well-formed
+FIELD_REGENERATORS = {
+    "options": ("choice_agent", "Return ONLY a JSON array of 3-4 decision strings for this scene."),
+    "narration_text": ("narrative_agent", "Return ONLY the narration text (200-2000 characters), no JSON and no headings."),
+    "dialogue": ("dialogue_agent", 'Return ONLY a JSON array of dialogue objects with keys "speaker", "text", "emotion", "is_internal_thought", "audible_to".'),
+}
+
+async def regenerate_scene_field(field: str, game_context: str, partial_scene: dict,
+                                 session_id: Optional[str] = None) -> Optional[str]:
+    """Ask only the owning specialist for one broken field; returns its raw output"""
+    regenerator = FIELD_REGENERATORS.get(field)
+    if regenerator is None:
+        return None
+    agent_name, task = regenerator
+    prompt = f"""{game_context}
+
+SCENE SO FAR:
+Location: {partial_scene.get('location', 'unknown')}
+Narration: {partial_scene.get('narration_text', 'not available')}
+
+TASK: The `{field}` field of this scene was malformed and must be rebuilt. {task}"""
+    if usage_ledger.budget_state(session_id) == BUDGET_EXHAUSTED:
+        tier = model_router.lightest_tier()
+    else:
+        tier = model_router.tier_for(agent_name)
+    try:
+        return await cassette.wrap(agent_name, tier, prompt, session_id,
+                                   lambda: _run_routed(agent_name, tier, prompt, session_id=session_id))
+    except Exception as e:
+        logger.warning(f"Error regenerating {field}: {e}", exc_info=True)
+        return None
 
 
 # OPTIMIZED ORCHESTRATOR - REDUCED VERBOSITY
 
 
 
-orchestrator_agent = Agent(
-    name="orchestrator_agent",
-    model=gemini_model,
-    tools=[
-        narrative_tool, world_tool, npc_agent, threat_agent, quest_agent,
-        emotion_agent, event_agent, item_agent, structure_agent, lore_agent,
-        choice_agent, dialogue_agent
-    ],
-    memory=memory,
-    instructions="""Create cinematic survival RPG with movie-like pacing and meaningful 50-scene story arc.
+ORCHESTRATOR_INSTRUCTIONS = """Create cinematic survival RPG with movie-like pacing and meaningful 50-scene story arc.
 The name of the Player is : Sinbad (ALWAYS REFER PLAYER BY THIS NAME.)
 Always Keep the Scenes Compleleted in the input accoutable and progress the story.
 MOVIE STRUCTURE:
@@ -233,7 +192,7 @@ ENDING FOCUS: Final scenes must provide meaningful resolution to character arcs
 ESCAPE QUOTES: Use \" for internal quotes in JSON strings.
 
 PROCESS:
-1. Call all 12 tools with enhanced input
+1. Call the specialist tools named in the turn's SPECIALIST PLAN (all 12 tools when no plan is given)
 2. Synthesize into complete scene
 3. Return ONLY valid JSON matching SceneResponse schema
 
@@ -410,6 +369,20 @@ JSON STRUCTURE (exact match to SceneResponse):
     "cultural_notes": ["string"],
     "historical_timeline": [{"period": ["events"]}]
   },
+  "world_info_delta": {
+    "name": "string or null",
+    "theme": "string or null",
+    "description": "string or null",
+    "add_key_locations": ["string"],
+    "remove_key_locations": ["string"],
+    "add_dominant_factions": ["string"],
+    "remove_dominant_factions": ["string"],
+    "add_major_threats": ["string"],
+    "remove_major_threats": ["string"],
+    "add_cultural_notes": ["string"],
+    "add_historical_events": [{"period": ["events"]}],
+    "reason": "string"
+  },
   "location_details": {
     "exits": ["string"],
     "hidden_areas": ["string"],
@@ -426,6 +399,7 @@ FIELD MAPPING:
 - dialogue_agent → dialogue
 - choice_agent → options
 - world_tool → environmental_conditions + resource_availability + world_info + location_details
+- world_info is generated in full only when the context has no WORLD BIBLE; once it does, omit world_info and send world_info_delta only when the world changes
 - threat_agent → threat_updates
 - event_agent → ambient_events
 - item_agent → inventory_changes + current_inventory
@@ -433,73 +407,142 @@ FIELD MAPPING:
 - structure_agent → interactive_elements
 
 OUTPUT: Only valid JSON in ```json blocks. All fields must be populated with appropriate values or null where optional. Ensure cinematic, story-driven scenes with meaningful progression."""
-)
+
+call_scheduler = CallScheduler.from_env()
+turn_counters = {"turns": 0, "error_scenes": 0}
+
+
+class TurnFailed(RuntimeError):
+    """Every provider failed (or the turn deadline passed) before the orchestrator produced a scene"""
+
+# Static system prompts cached on the provider (Gemini tiers only), managed by the app lifespan
+prompt_cache = PromptCache.from_env()
+
+# Models, agents and memory, built by the app lifespan (or on first use)
+agent_registry = AgentRegistry(model_router, prompt_cache, SPECIALIST_INSTRUCTIONS, ORCHESTRATOR_INSTRUCTIONS,
+                               db_file=os.getenv("MEMORY_DB_FILE", DB_FILE))
+
+
+def _token_usage(response) -> Tuple[int, int, int]:
+    """(input, output, cached input) tokens from an agno RunResponse; metrics hold one value per model call"""
+    metrics = getattr(response, "metrics", None) or {}
+    total = lambda value: sum(value) if isinstance(value, list) else (value or 0)
+    return total(metrics.get("input_tokens")), total(metrics.get("output_tokens")), total(metrics.get("cached_tokens"))
+
+
+# Output tokens reserved against a provider's tokens/min budget before the real count is known
+OUTPUT_TOKENS_ESTIMATE = int(os.getenv("RATE_LIMIT_OUTPUT_ESTIMATE", "2000"))
+
+rate_limiter = RateLimiter.from_env()
+
+# Per-session, per-agent token/latency/cost accounting and budgets
+usage_ledger = UsageLedger.from_env()
+
+# Records agent calls (CASSETTE_MODE=record) or serves them back offline (replay)
+cassette = Cassette.from_env()
+
+
+def _estimate_tokens(agent_name: Optional[str], prompt: str) -> int:
+    if agent_name == "orchestrator_agent":
+        instructions = ORCHESTRATOR_INSTRUCTIONS
+    else:
+        instructions = SPECIALIST_INSTRUCTIONS.get(agent_name, "")
+    return (len(prompt) + len(instructions)) // 4 + OUTPUT_TOKENS_ESTIMATE
+
+
+async def _run_routed(agent_name: str, tier: str, prompt: str, session_id: Optional[str] = None,
+                      priority: int = PRIORITY_INTERACTIVE, **kwargs) -> str:
+    """Run an agent on a tier within its provider's rate limit and feed latency, errors and tokens back to the router"""
+    provider = model_router.tiers[tier]["provider"]
+    async with rate_limiter.slot(provider, session_id, priority, _estimate_tokens(agent_name, prompt)) as slot:
+        started = time.monotonic()
+        try:
+            response = await agent_registry.agent_for_call(agent_name, tier).arun(prompt, **kwargs)
+            if not response.content:
+                raise ValueError(f"Empty response from {tier} tier")
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            seconds = time.monotonic() - started
+            model_router.record(tier, seconds, ok=False)
+            usage_ledger.record(session_id, agent_name, tier, seconds=seconds, ok=False)
+            raise
+        input_tokens, output_tokens, cached_tokens = _token_usage(response)
+        slot.actual_tokens = input_tokens + output_tokens
+    seconds = time.monotonic() - started
+    cost = model_router.record(tier, seconds, True, input_tokens, output_tokens, cached_tokens)
+    usage_ledger.record(session_id, agent_name, tier, input_tokens, output_tokens, cached_tokens, seconds, cost)
+    prompt_cache.record_usage(agent_name, tier, input_tokens, cached_tokens)
+    return response.content
+
+
+async def _run_fake(tier: str, prompt: str, session_id: Optional[str] = None,
+                    priority: int = PRIORITY_INTERACTIVE) -> str:
+    """FAKE_LLM stand-in for _run_routed; tokens are estimated at ~4 characters each"""
+    async with rate_limiter.slot("fake", session_id, priority, _estimate_tokens(None, prompt)) as slot:
+        started = time.monotonic()
+        try:
+            content = await FAKE_PROVIDERS[tier](prompt)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            seconds = time.monotonic() - started
+            model_router.record(tier, seconds, ok=False)
+            usage_ledger.record(session_id, "orchestrator_agent", tier, seconds=seconds, ok=False)
+            raise
+        slot.actual_tokens = (len(prompt) + len(content)) // 4
+    seconds = time.monotonic() - started
+    cost = model_router.record(tier, seconds, True, len(prompt) // 4, len(content) // 4)
+    usage_ledger.record(session_id, "orchestrator_agent", tier, len(prompt) // 4, len(content) // 4, 0, seconds, cost)
+    return content
+
+
+def _orchestrator_providers(player_input: str, user_id: str) -> list:
+    """Provider calls in preference order for one orchestrator turn: routed tier first, lightest first once over budget"""
+    if cassette.replaying:
+        return [("cassette", lambda: cassette.replay("orchestrator_agent", player_input, user_id))]
+    tiers = model_router.tiers_for("orchestrator_agent", lightest_first=usage_ledger.budget_state(user_id) == BUDGET_EXHAUSTED)
+    fake = os.getenv("FAKE_LLM", "false").lower() == "true"
+
+    def call(tier: str):
+        if fake:
+            return _run_fake(tier, player_input, session_id=user_id)
+        return _run_routed("orchestrator_agent", tier, player_input, session_id=user_id, user_id=user_id)
+
+    return [
+        (tier, lambda tier=tier: cassette.wrap("orchestrator_agent", tier, player_input, user_id, lambda: call(tier)))
+        for tier in tiers
+    ]
+
+async def _summarize_history(prompt: str, session_id: str) -> Optional[str]:
+    """Fold evicted history into the rolling summary on the lightest tier, behind interactive turns"""
+    if os.getenv("FAKE_LLM", "false").lower() == "true":
+        return None  # extractive fold
+    tier = model_router.lightest_tier()
+    return await cassette.wrap("narrative_agent", tier, prompt, session_id,
+                               lambda: _run_routed("narrative_agent", tier, prompt, session_id=session_id,
+                                                   priority=PRIORITY_BACKGROUND))
+
+
+# "Story so far" for entries that fell out of the bounded history windows
+rolling_summary = RollingSummary.from_env(summarize=_summarize_history, memory=lambda: agent_registry.memory)
+
+
+async def warm_up_providers() -> dict:
+    """Open pooled connections to every available tier's provider before the first turn"""
+    return await http_pool.warm_up(agent_registry.warm_up_targets())
 
 # Streamlined usage function
-async def process_game_turn(player_input: AgentInput, user_id: str) -> str: # Changed return type to str
+async def process_game_turn(player_input: str, user_id: str) -> str:
     
-    """Process player turn and return game response"""
+    """Process player turn and return game response; raises TurnFailed when no provider answers"""
+    turn_counters["turns"] += 1
     try:
-        final_response_str = orchestrator_agent.run(player_input, user_id=user_id)
-        # Return the JSON string directly as per user's request
-        return final_response_str.content
+        # Retried with backoff and hedged across providers until the turn deadline
+        provider, content = await call_scheduler.run(_orchestrator_providers(player_input, user_id))
+        return content
     except Exception as e:
-        print(f"Error in process_game_turn: {e}")
-        # Default WorldInfo for error response
-        default_world_info = WorldInfo(
-            name="Unknown World",
-            theme="Uncertainty",
-            description="A world shrouded in error.",
-            key_locations=[],
-            dominant_factions=[],
-            major_threats=[],
-            cultural_notes=[],
-            historical_timeline=[]
-        )
-        # Default LocationDetails for error response
-        default_location_details = {
-            "exits": [],
-            "hidden_areas": [],
-            "resource_nodes": [],
-            "safety_level": 5
-        }
-
-        # Return a JSON string for the error response
-        error_response_dict = {
-            "scene_tag": "error_scene",
-            "location": "unknown",
-            "world": "unknown",
-            "narration_text": "The world shimmers momentarily, an error disrupting the fabric of reality. Please try again.",
-            "dialogue": [],
-            "characters": [],
-            "options":["Continue", "Look around", "Check inventory"],
-            "game_state": {
-                "relationships": {},
-                "revealed_secrets": [],
-                "completed_objectives": [],
-                "failed_objectives": [],
-                "active_objectives": [],
-                "location_flags": {},
-                "story_flags": {},
-                "reputation": {},
-                "major_events": [],
-                "environmental_conditions": EnvironmentalConditions().model_dump(), # Use model_dump()
-                "resource_availability": ResourceAvailability().model_dump() # Use model_dump()
-            },
-            "inventory_changes": InventoryChanges().model_dump(), # Use model_dump()
-            "current_inventory": [],
-            "mood_atmosphere": "uncertain",
-            "history_entry": "An unexpected pause occurred due to an error.",
-            "relationship_changes": {},
-            "new_secrets": [],
-            "new_objectives": [],
-            "completed_objectives_this_scene": [],
-            "interactive_elements": [],
-            "environmental_discoveries": [],
-            "threat_updates": [],
-            "ambient_events": [],
-            "discovered_lore": [],
-            "world_info": default_world_info.model_dump(), # Use model_dump()
-            "location_details": default_location_details
-        }
-        return json.dumps(error_response_dict)
\ No newline at end of file
+        logger.error(f"Error in process_game_turn: {e}", exc_info=True)
+        turn_counters["error_scenes"] += 1
+        # Not a scene: callers must not build a bible, lore or snapshot from a failed turn
+        raise TurnFailed(f"No provider produced a turn: {e}") from e
\ No newline at end of file
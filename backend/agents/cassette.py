@@ -0,0 +1,173 @@
+# cassette.py
+"""
+Record/replay of agent calls.
+
+A production turn depends on live model output, so a slow or broken turn
+could not be reproduced. With CASSETTE_MODE=record every agent call's prompt
+and raw output is appended to a JSONL cassette, keyed by a hash of the agent
+and its full context, together with each /game/interact request body. With
+CASSETTE_MODE=replay the recorded outputs are served back deterministically
+without any provider, so parsing, validation, context building and memory can
+be profiled and bisected on real traffic shapes offline
+(see benchmarks/replay_cassette.py).
+
+On replay a call is matched by its context hash first. When context building
+has changed since the recording, the hash no longer matches. Unless
+CASSETTE_STRICT=true, the call then falls back to the session's next
+unused recording for the same agent.
+"""
+from collections import defaultdict, deque
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+import asyncio
+import hashlib
+import logging
+import os
+import threading
+import time
+
+from models.serialization import dumps_str, loads
+
+logger = logging.getLogger(__name__)
+
+MODE_OFF = "off"
+MODE_RECORD = "record"
+MODE_REPLAY = "replay"
+
+
+class CassetteMiss(LookupError):
+    """No recording matches a call being replayed."""
+
+
+def context_hash(agent_name: str, prompt: str) -> str:
+    return hashlib.sha256(f"{agent_name}\n{prompt}".encode("utf-8")).hexdigest()
+
+
+class Cassette:
+    def __init__(self, mode: str = MODE_OFF, path: str = "data/cassettes/cassette.jsonl",
+                 strict: bool = False, replay_latency: bool = False):
+        if mode not in (MODE_OFF, MODE_RECORD, MODE_REPLAY):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.mode = mode
+        self.path = path
+        self.strict = strict
+        self.replay_latency = replay_latency
+        self._lock = threading.Lock()
+        self._sequence: Dict[Tuple[str, str], int] = defaultdict(int)
+        self._by_hash: Dict[str, Deque[Dict[str, Any]]] = {}
+        self._by_session: Dict[Tuple[str, str], Deque[Dict[str, Any]]] = {}
+        self._used: set = set()
+        self._stats = {"recorded": 0, "requests_recorded": 0, "replayed_by_hash": 0,
+                       "replayed_by_sequence": 0, "misses": 0}
+        if mode == MODE_REPLAY:
+            self.load(path)
+
+    @classmethod
+    def from_env(cls) -> "Cassette":
+        return cls(
+            mode=os.getenv("CASSETTE_MODE", MODE_OFF).lower(),
+            path=os.getenv("CASSETTE_PATH", "data/cassettes/cassette.jsonl"),
+            strict=os.getenv("CASSETTE_STRICT", "false").lower() == "true",
+            replay_latency=os.getenv("CASSETTE_REPLAY_LATENCY", "false").lower() == "true",
+        )
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == MODE_RECORD
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == MODE_REPLAY
+
+    def _append_sync(self, entry: Dict[str, Any]) -> None:
+        line = dumps_str(entry) + "\n"
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+    async def _append(self, entry: Dict[str, Any]) -> None:
+        # Serialized and written on a worker thread; the lock keeps concurrent lines whole
+        await asyncio.to_thread(self._append_sync, entry)
+
+    def load(self, path: str) -> int:
+        """Index a cassette for replay; returns the number of calls"""
+        self._by_hash.clear()
+        self._by_session.clear()
+        self._used.clear()
+        calls = 0
+        for entry in read_cassette(path):
+            if entry["kind"] != "call":
+                continue
+            entry["_id"] = calls
+            self._by_hash.setdefault(entry["key"], deque()).append(entry)
+            self._by_session.setdefault((entry["session_id"], entry["agent"]), deque()).append(entry)
+            calls += 1
+        logger.info(f"Loaded {calls} recorded calls from {path}")
+        return calls
+
+    async def record_request(self, session_id: str, body: Dict[str, Any]) -> None:
+        """Keep the request that started a turn so the turn can be replayed end to end"""
+        if not self.recording:
+            return
+        await self._append({"kind": "request", "session_id": session_id,
+                      "recorded_at": datetime.now().isoformat(), "body": body})
+        self._stats["requests_recorded"] += 1
+
+    def _next(self, queue: Optional[Deque[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+        while queue:
+            entry = queue.popleft()
+            if entry["_id"] not in self._used:
+                self._used.add(entry["_id"])
+                return entry
+        return None
+
+    async def replay(self, agent_name: str, prompt: str, session_id: Optional[str] = None) -> str:
+        entry = self._next(self._by_hash.get(context_hash(agent_name, prompt)))
+        if entry is not None:
+            self._stats["replayed_by_hash"] += 1
+        elif not self.strict:
+            entry = self._next(self._by_session.get((session_id or "", agent_name)))
+            if entry is not None:
+                self._stats["replayed_by_sequence"] += 1
+        if entry is None:
+            self._stats["misses"] += 1
+            raise CassetteMiss(f"No recording for {agent_name} in session {session_id}")
+        if self.replay_latency:
+            await asyncio.sleep(entry.get("seconds", 0))
+        return entry["output"]
+
+    async def wrap(self, agent_name: str, tier: str, prompt: str, session_id: Optional[str],
+                   call: Callable[[], Awaitable[str]]) -> str:
+        """Run a provider call through the cassette: replay it, or run it and record the result"""
+        if self.replaying:
+            return await self.replay(agent_name, prompt, session_id)
+        if not self.recording:
+            return await call()
+        started = time.monotonic()
+        output = await call()
+        sequence_key = (session_id or "", agent_name)
+        self._sequence[sequence_key] += 1
+        await self._append({
+            "kind": "call",
+            "key": context_hash(agent_name, prompt),
+            "session_id": session_id or "",
+            "agent": agent_name,
+            "tier": tier,
+            "seq": self._sequence[sequence_key],
+            "seconds": round(time.monotonic() - started, 3),
+            "recorded_at": datetime.now().isoformat(),
+            "prompt": prompt,
+            "output": output,
+        })
+        self._stats["recorded"] += 1
+        return output
+
+    def stats(self) -> Dict[str, Any]:
+        return {"mode": self.mode, "path": self.path if self.mode != MODE_OFF else None,
+                "strict": self.strict, **self._stats}
+
+
+def read_cassette(path: str) -> List[Dict[str, Any]]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [loads(line) for line in f if line.strip()]
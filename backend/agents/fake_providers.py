@@ -0,0 +1,96 @@
+# fake_providers.py
+"""
+Offline stand-ins for LLM providers with injectable latency and failures.
+
+Used by benchmarks and by FAKE_LLM=true runs so the full request path
+(scheduler, parsing, salvage, memory) can be exercised without API keys.
+"""
+from typing import Any, Callable, Dict, Optional
+import asyncio
+import os
+import random
+import re
+
+from benchmarks.synthetic_scenes import synthetic_scene
+from models.serialization import dumps_str
+
+_SCENES_PATTERN = re.compile(r"Total Scenes Completed:\s*(\d+)")
+_WORLD_PATTERN = re.compile(r"^World:\s*(.+)$", re.MULTILINE)
+_PLAN_PATTERN = re.compile(r"Call ONLY these specialists: (.+)")
+
+
+class FakeProviderError(Exception):
+    pass
+
+
+def plan_fraction(prompt: str) -> float:
+    """Share of the 12 specialists a planned prompt consults; a lighter plan is a shorter generation"""
+    plan = _PLAN_PATTERN.search(prompt or "")
+    return len(plan.group(1).split(",")) / 12 if plan else 1.0
+
+
+def synthetic_turn_output(prompt: str) -> str:
+    """Orchestrator-shaped output: a fenced SceneResponse JSON for the prompt's scene number."""
+    scenes = _SCENES_PATTERN.search(prompt or "")
+    world = _WORLD_PATTERN.search(prompt or "")
+    scene = synthetic_scene(
+        int(scenes.group(1)) if scenes else 1,
+        world=world.group(1).strip() if world else "The Drowned Coast",
+    )
+    return "```json\n" + dumps_str(scene) + "\n```"
+
+
+class FakeProvider:
+    """Async callable that behaves like a slow, occasionally failing model."""
+
+    def __init__(self, name: str, latency: float = 0.0, jitter: float = 0.0, failure_rate: float = 0.0,
+                 tail_rate: float = 0.0, tail_latency: float = 0.0,
+                 respond: Optional[Callable[[str], str]] = None, seed: Optional[int] = None,
+                 capacity: int = 0):
+        self.name = name
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.tail_rate = tail_rate
+        self.tail_latency = tail_latency
+        self.respond = respond or synthetic_turn_output
+        self.rng = random.Random(seed)
+        self.calls = 0
+        self.failures = 0
+        self.cancelled = 0
+        # Calls served at once (0 = unlimited); the rest queue, like a rate-limited provider
+        self.capacity = capacity
+        self._slots = asyncio.Semaphore(capacity) if capacity else None
+
+    @classmethod
+    def from_env(cls, name: str) -> "FakeProvider":
+        return cls(
+            name,
+            latency=float(os.getenv("FAKE_LLM_LATENCY_SECONDS", "0.05")),
+            jitter=float(os.getenv("FAKE_LLM_JITTER_SECONDS", "0.02")),
+            failure_rate=float(os.getenv("FAKE_LLM_FAILURE_RATE", "0")),
+            capacity=int(os.getenv("FAKE_LLM_CAPACITY", "0")),
+        )
+
+    async def __call__(self, prompt: str) -> str:
+        self.calls += 1
+        delay = (self.latency + self.rng.uniform(0, self.jitter)) * plan_fraction(prompt)
+        if self.rng.random() < self.tail_rate:
+            delay += self.tail_latency
+        fail = self.rng.random() < self.failure_rate
+        try:
+            if self._slots is None:
+                await asyncio.sleep(delay)
+            else:
+                async with self._slots:
+                    await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if fail:
+            self.failures += 1
+            raise FakeProviderError(f"{self.name}: injected failure")
+        return self.respond(prompt)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"calls": self.calls, "failures": self.failures, "cancelled": self.cancelled}
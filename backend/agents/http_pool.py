@@ -0,0 +1,122 @@
+# http_pool.py
+"""
+Shared, pre-warmed HTTP connection pools for the LLM provider clients.
+
+agno's Groq model builds a fresh httpx.AsyncClient for every async call, so
+each turn paid DNS, TCP and TLS setup again, and httpx's default 5s
+keep-alive meant even reused Gemini connections went cold between turns.
+All provider traffic now goes through long-lived pools with configurable
+limits and keep-alive, HTTP/2 when the optional `h2` package is installed,
+and a startup warm-up that opens connections before the first player turn.
+"""
+from importlib.util import find_spec
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, List, Tuple
+import asyncio
+import logging
+import os
+import time
+
+if TYPE_CHECKING:
+    import httpx
+    from google.genai import types as genai_types
+
+logger = logging.getLogger(__name__)
+
+HTTP2_AVAILABLE = find_spec("h2") is not None
+
+WarmupTarget = Tuple[str, Callable[[], Awaitable[Any]]]
+
+
+class HttpPool:
+    def __init__(self, max_connections: int = 100, max_keepalive: int = 20, keepalive_seconds: float = 120.0,
+                 http2: bool = True, warm_connections: int = 2, timeout_seconds: float = 120.0):
+        self.max_connections = max_connections
+        self.max_keepalive = max_keepalive
+        self.keepalive_seconds = keepalive_seconds
+        self.http2 = http2 and HTTP2_AVAILABLE
+        self.warm_connections = warm_connections
+        self.timeout_seconds = timeout_seconds
+        self.clients: Dict[str, "httpx.AsyncClient"] = {}
+        self.warmup_results: Dict[str, Dict[str, Any]] = {}
+        if http2 and not HTTP2_AVAILABLE:
+            logger.info("h2 is not installed; provider connections use HTTP/1.1")
+
+    @classmethod
+    def from_env(cls) -> "HttpPool":
+        return cls(
+            max_connections=int(os.getenv("HTTP_MAX_CONNECTIONS", "100")),
+            max_keepalive=int(os.getenv("HTTP_MAX_KEEPALIVE", "20")),
+            keepalive_seconds=float(os.getenv("HTTP_KEEPALIVE_SECONDS", "120")),
+            http2=os.getenv("HTTP2_ENABLED", "true").lower() == "true",
+            warm_connections=int(os.getenv("HTTP_WARM_CONNECTIONS", "2")),
+        )
+
+    def limits(self) -> "httpx.Limits":
+        import httpx
+
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive,
+            keepalive_expiry=self.keepalive_seconds,
+        )
+
+    def client_args(self) -> Dict[str, Any]:
+        """httpx.AsyncClient kwargs shared by every pool."""
+        import httpx
+
+        return {"limits": self.limits(), "http2": self.http2, "timeout": httpx.Timeout(self.timeout_seconds)}
+
+    def async_client(self, name: str) -> "httpx.AsyncClient":
+        """One long-lived client (and connection pool) per provider."""
+        import httpx
+
+        if name not in self.clients or self.clients[name].is_closed:
+            self.clients[name] = httpx.AsyncClient(**self.client_args())
+        return self.clients[name]
+
+    def gemini_http_options(self) -> "genai_types.HttpOptions":
+        from google.genai import types as genai_types
+
+        # google-genai builds its own httpx client from these args and keeps it
+        # for the lifetime of the genai.Client, which agno caches per model
+        return genai_types.HttpOptions(async_client_args=self.client_args())
+
+    async def warm_up(self, targets: List[WarmupTarget]) -> Dict[str, Dict[str, Any]]:
+        """Open warm_connections connections per provider with cheap metadata calls; failures are not fatal."""
+
+        async def once(call: Callable[[], Awaitable[Any]]) -> Any:
+            return await call()
+
+        async def warm(name: str, call: Callable[[], Awaitable[Any]]) -> None:
+            started = time.monotonic()
+            results = await asyncio.gather(*[once(call) for _ in range(self.warm_connections)], return_exceptions=True)
+            errors = [repr(result) for result in results if isinstance(result, Exception)]
+            self.warmup_results[name] = {
+                "seconds": round(time.monotonic() - started, 3),
+                "connections": self.warm_connections,
+                "errors": errors[:1],
+            }
+            if errors:
+                logger.warning(f"Warm-up for {name} failed: {errors[0]}")
+
+        await asyncio.gather(*[warm(name, call) for name, call in targets])
+        return self.warmup_results
+
+    async def aclose(self) -> None:
+        for client in self.clients.values():
+            await client.aclose()
+        self.clients.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "http2": self.http2,
+            "max_connections": self.max_connections,
+            "max_keepalive": self.max_keepalive,
+            "keepalive_seconds": self.keepalive_seconds,
+            "open_clients": sorted(name for name, client in self.clients.items() if not client.is_closed),
+            "warmup": self.warmup_results,
+        }
+
+
+http_pool = HttpPool.from_env()
+
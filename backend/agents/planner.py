@@ -0,0 +1,123 @@
+# planner.py
+"""
+Interaction-aware specialist planning.
+
+Every turn used to ask for all 12 specialist sections. Most interactions only
+touch a few of them: talking to an NPC does not need a new world_info, and
+picking up an item does not need new lore. The planner picks the minimal set
+of specialists for the interaction type and tension level; sections owned only
+by skipped specialists are carried forward from the previous scene instead of
+being regenerated.
+"""
+from typing import Dict, FrozenSet, List
+import os
+
+from models.schemas import AgentInput
+
+# Which SceneResponse fields each specialist owns (mirrors FIELD MAPPING in
+# the orchestrator instructions). game_state and the scene identity fields are
+# always produced by the orchestrator itself.
+SPECIALIST_FIELDS: Dict[str, List[str]] = {
+    "narrative_agent": ["narration_text", "history_entry", "mood_atmosphere"],
+    "npc_agent": ["characters", "relationship_changes"],
+    "emotion_agent": ["characters", "relationship_changes"],
+    "quest_agent": ["new_objectives", "completed_objectives_this_scene"],
+    "dialogue_agent": ["dialogue"],
+    "choice_agent": ["options"],
+    "worldbuilder_agent": ["world_info", "location_details", "environmental_discoveries"],
+    "threat_agent": ["threat_updates"],
+    "event_agent": ["ambient_events"],
+    "item_agent": ["inventory_changes", "current_inventory"],
+    "lore_agent": ["discovered_lore", "new_secrets"],
+    "structure_agent": ["interactive_elements"],
+}
+
+ALL_SPECIALISTS: FrozenSet[str] = frozenset(SPECIALIST_FIELDS)
+
+# Every scene needs narration and the next decision point
+CORE_SPECIALISTS: FrozenSet[str] = frozenset({"narrative_agent", "choice_agent"})
+
+INTERACTION_SPECIALISTS: Dict[str, FrozenSet[str]] = {
+    "narrative_choice": ALL_SPECIALISTS,
+    "character_interaction": frozenset({"npc_agent", "emotion_agent", "dialogue_agent"}),
+    "item_interaction": frozenset({"item_agent"}),
+    "location_interaction": frozenset({"worldbuilder_agent", "structure_agent", "event_agent", "lore_agent"}),
+    "quest_interaction": frozenset({"quest_agent", "npc_agent", "dialogue_agent", "item_agent"}),
+    "environmental_interaction": frozenset({"worldbuilder_agent", "structure_agent", "lore_agent"}),
+}
+
+# Specialists pulled in when the scene is tense regardless of interaction type
+TENSION_SPECIALISTS: FrozenSet[str] = frozenset({"threat_agent", "event_agent"})
+
+HIGH_TENSION_LEVEL = int(os.getenv("PLANNER_HIGH_TENSION_LEVEL", "7"))
+PLANNER_ENABLED = os.getenv("PLANNER_ENABLED", "true").lower() == "true"
+
+planner_stats = {"turns": 0, "full_plans": 0, "lite_plans": 0, "specialists_skipped": 0}
+
+
+class TurnPlan:
+    """Specialists to consult this turn and the fields carried forward instead."""
+
+    def __init__(self, specialists: FrozenSet[str], reason: str):
+        self.specialists = frozenset(specialists)
+        self.reason = reason
+        produced = {field for name in self.specialists for field in SPECIALIST_FIELDS[name]}
+        self.carried_fields: List[str] = sorted(
+            {field for fields in SPECIALIST_FIELDS.values() for field in fields} - produced
+        )
+
+    @property
+    def skipped(self) -> List[str]:
+        return sorted(ALL_SPECIALISTS - self.specialists)
+
+    @property
+    def is_full(self) -> bool:
+        return self.specialists == ALL_SPECIALISTS
+
+    def prompt_section(self) -> str:
+        """Per-turn instructions appended to the game context."""
+        if self.is_full:
+            return ""
+        return f"""
+SPECIALIST PLAN FOR THIS TURN ({self.reason}):
+- Call ONLY these specialists: {", ".join(sorted(self.specialists))}
+- Do NOT generate these fields; the server carries them forward from the previous scene, so return each of them as null: {", ".join(self.carried_fields)}
+"""
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            "specialists": sorted(self.specialists),
+            "skipped": self.skipped,
+            "carried_fields": self.carried_fields,
+            "reason": self.reason,
+        }
+
+
+def plan_turn(input_data: AgentInput, force_full: bool = False, lite: bool = False,
+              lite_reason: str = "session budget") -> TurnPlan:
+    """Choose the minimal specialist set for this interaction; `lite` keeps only the core specialists."""
+    planner_stats["turns"] += 1
+    interaction_type = input_data.user_interaction.interaction_type
+    tension_level = input_data.game_progress.tension_level
+
+    if force_full or not PLANNER_ENABLED:
+        plan = TurnPlan(ALL_SPECIALISTS, "full plan")
+    elif input_data.game_progress.scenes_completed <= 1:
+        # The opening scene has to build the world from scratch
+        plan = TurnPlan(ALL_SPECIALISTS, "opening scene")
+    elif lite:
+        # The session is running out of its token/cost budget, or the server is overloaded
+        plan = TurnPlan(CORE_SPECIALISTS, f"lite plan, {lite_reason}")
+        planner_stats["lite_plans"] += 1
+    else:
+        specialists = CORE_SPECIALISTS | INTERACTION_SPECIALISTS.get(interaction_type, ALL_SPECIALISTS)
+        reason = interaction_type
+        if tension_level >= HIGH_TENSION_LEVEL or input_data.emergency_flags.get("high_threat"):
+            specialists |= TENSION_SPECIALISTS
+            reason += f", tension {tension_level}/10"
+        plan = TurnPlan(specialists, reason)
+
+    if plan.is_full:
+        planner_stats["full_plans"] += 1
+    planner_stats["specialists_skipped"] += len(plan.skipped)
+    return plan
@@ -0,0 +1,197 @@
+# prompt_cache.py
+"""
+Provider-side caching of the static system prompts.
+
+The orchestrator and specialist instructions never change between turns, so
+on Gemini tiers they are uploaded once as CachedContent and later calls only
+reference the cache handle instead of resending (and re-billing) the prefix.
+Caches are created at startup, their TTL is extended by a background refresh
+loop, and they are deleted on shutdown. A prompt that is too small for the
+provider's minimum, or whose cache cannot be created, is simply sent uncached.
+
+Each entry keeps a fingerprint of its prompt; if the prompt an agent would
+send no longer matches, the entry is recreated rather than serving a stale
+prefix.
+"""
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+import asyncio
+import hashlib
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def fingerprint(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+class CacheEntry:
+    def __init__(self, agent_name: str, tier: str, model: Any, system_prompt: str):
+        self.agent_name = agent_name
+        self.tier = tier
+        self.model = model
+        self.system_prompt = system_prompt
+        self.fingerprint = fingerprint(system_prompt)
+        self.handle: Optional[str] = None
+        self.expires_at = 0.0
+        self.status = "pending"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "agent": self.agent_name,
+            "tier": self.tier,
+            "status": self.status,
+            "handle": self.handle,
+            "fingerprint": self.fingerprint,
+            "estimated_tokens": len(self.system_prompt) // 4,
+            "expires_in_seconds": round(self.expires_at - time.monotonic(), 1) if self.handle else None,
+        }
+
+
+class PromptCache:
+    def __init__(self, enabled: bool = True, ttl_seconds: int = 3600, refresh_margin_seconds: int = 300,
+                 min_tokens: int = 1024, recent_turns: int = 50):
+        self.enabled = enabled
+        self.ttl_seconds = ttl_seconds
+        self.refresh_margin_seconds = refresh_margin_seconds
+        self.min_tokens = min_tokens
+        self.entries: Dict[Tuple[str, str], CacheEntry] = {}
+        self.recent: Deque[Dict[str, Any]] = deque(maxlen=recent_turns)
+        self.totals = {"calls": 0, "input_tokens": 0, "cached_tokens": 0, "uncached_tokens": 0}
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    @classmethod
+    def from_env(cls) -> "PromptCache":
+        return cls(
+            enabled=os.getenv("PROMPT_CACHE_ENABLED", "true").lower() == "true",
+            ttl_seconds=int(os.getenv("PROMPT_CACHE_TTL_SECONDS", "3600")),
+            min_tokens=int(os.getenv("PROMPT_CACHE_MIN_TOKENS", "1024")),
+        )
+
+    def register(self, agent_name: str, tier: str, model: Any, system_prompt: Optional[str]) -> None:
+        """Declare a cacheable (agent, tier) prefix; nothing is uploaded until start()/refresh()."""
+        if not system_prompt:
+            return
+        entry = CacheEntry(agent_name, tier, model, system_prompt)
+        if len(system_prompt) // 4 < self.min_tokens:
+            entry.status = "below_minimum"
+        self.entries[(agent_name, tier)] = entry
+
+    def handle(self, agent_name: str, tier: str, system_prompt: Optional[str] = None) -> Optional[str]:
+        """Live cache name for an agent on a tier, or None to send the prompt uncached."""
+        entry = self.entries.get((agent_name, tier))
+        if entry is None or entry.handle is None or time.monotonic() >= entry.expires_at:
+            return None
+        if system_prompt is not None and fingerprint(system_prompt) != entry.fingerprint:
+            # The prompt changed under us: stop using the old prefix and rebuild it on the next refresh
+            logger.warning(f"System prompt for {agent_name} on {tier} changed; invalidating its cache")
+            entry.system_prompt = system_prompt
+            entry.fingerprint = fingerprint(system_prompt)
+            entry.handle = None
+            entry.status = "stale"
+            return None
+        return entry.handle
+
+    async def _create(self, entry: CacheEntry) -> None:
+        from google.genai import types
+
+        client = entry.model.get_client()
+        cache = await client.aio.caches.create(
+            model=entry.model.id,
+            config=types.CreateCachedContentConfig(
+                system_instruction=entry.system_prompt,
+                ttl=f"{self.ttl_seconds}s",
+                display_name=f"sinbad-{entry.agent_name}-{entry.fingerprint}",
+            ),
+        )
+        entry.handle = cache.name
+        entry.expires_at = time.monotonic() + self.ttl_seconds
+        entry.status = "active"
+        logger.info(f"Created prompt cache {cache.name} for {entry.agent_name} on {entry.tier}")
+
+    async def _extend(self, entry: CacheEntry) -> None:
+        from google.genai import types
+
+        client = entry.model.get_client()
+        await client.aio.caches.update(
+            name=entry.handle, config=types.UpdateCachedContentConfig(ttl=f"{self.ttl_seconds}s")
+        )
+        entry.expires_at = time.monotonic() + self.ttl_seconds
+
+    async def refresh(self) -> Dict[str, Any]:
+        """Create missing caches and extend the TTL of ones close to expiring."""
+        async with self._lock:
+            for entry in self.entries.values():
+                if entry.status in ("below_minimum", "unsupported"):
+                    continue
+                try:
+                    if entry.handle is None:
+                        await self._create(entry)
+                    elif entry.expires_at - time.monotonic() < self.refresh_margin_seconds:
+                        try:
+                            await self._extend(entry)
+                        except Exception:
+                            # Expired or deleted on the provider side: start over
+                            entry.handle = None
+                            await self._create(entry)
+                except Exception as e:
+                    message = str(e)
+                    # Prompts under the model's minimum cache size are a permanent condition
+                    entry.status = "unsupported" if "min" in message.lower() and "token" in message.lower() else "error"
+                    entry.handle = None
+                    logger.warning(f"Prompt cache for {entry.agent_name} on {entry.tier} unavailable: {message}")
+        return self.stats()
+
+    async def _refresh_loop(self) -> None:
+        interval = max(30, self.ttl_seconds - self.refresh_margin_seconds) / 2
+        while True:
+            await asyncio.sleep(interval)
+            await self.refresh()
+
+    async def start(self) -> None:
+        if not self.enabled or not self.entries:
+            return
+        await self.refresh()
+        self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        if self._refresh_task:
+            self._refresh_task.cancel()
+            self._refresh_task = None
+        for entry in self.entries.values():
+            if entry.handle:
+                try:
+                    await entry.model.get_client().aio.caches.delete(name=entry.handle)
+                except Exception as e:
+                    logger.warning(f"Could not delete prompt cache {entry.handle}: {e}")
+                entry.handle = None
+                entry.status = "pending"
+
+    def record_usage(self, agent_name: str, tier: str, input_tokens: int, cached_tokens: int) -> None:
+        """Per-call prompt token split; one orchestrator call is one turn."""
+        uncached = max(0, input_tokens - cached_tokens)
+        self.totals["calls"] += 1
+        self.totals["input_tokens"] += input_tokens
+        self.totals["cached_tokens"] += cached_tokens
+        self.totals["uncached_tokens"] += uncached
+        self.recent.append({
+            "agent": agent_name,
+            "tier": tier,
+            "input_tokens": input_tokens,
+            "cached_tokens": cached_tokens,
+            "uncached_tokens": uncached,
+        })
+
+    def stats(self) -> Dict[str, Any]:
+        input_tokens = self.totals["input_tokens"]
+        return {
+            "enabled": self.enabled,
+            **self.totals,
+            "cached_ratio": round(self.totals["cached_tokens"] / input_tokens, 4) if input_tokens else 0.0,
+            "entries": [entry.to_dict() for entry in self.entries.values()],
+            "recent_calls": list(self.recent)[::-1],
+        }
@@ -0,0 +1,49 @@
+# providers.py
+"""
+Backend model construction for routing tiers.
+
+Imported only when the agent registry is built: agno, google-genai and groq
+are the bulk of the backend's import time.
+"""
+from typing import Any, Dict, Optional
+import os
+
+from agno.models.google.gemini import Gemini
+from agno.models.groq import Groq
+from groq import AsyncGroq
+
+from agents.http_pool import http_pool
+
+API_KEY_ENV = {"gemini": "GEMINI_API_KEY", "groq": "GROQ_API_KEY"}
+
+
+class PooledGroq(Groq):
+    """Groq model that keeps one async client on the shared pool instead of one per call."""
+
+    def get_async_client(self) -> AsyncGroq:
+        if self.async_client is None:
+            self.async_client = AsyncGroq(
+                **self._get_client_params(), http_client=http_pool.async_client("groq")
+            )
+        return self.async_client
+
+
+def missing_key(spec: Dict[str, Any]) -> Optional[str]:
+    """Name of the env var a tier needs but does not have, if any."""
+    env_var = API_KEY_ENV.get(spec["provider"])
+    if env_var and not os.getenv(env_var):
+        return env_var
+    return None
+
+
+def build_model(spec: Dict[str, Any]):
+    """Backend model for one routing tier"""
+    if spec["provider"] == "gemini":
+        return Gemini(
+            spec["model"],
+            api_key=os.getenv("GEMINI_API_KEY"),
+            client_params={"http_options": http_pool.gemini_http_options()}
+        )
+    if spec["provider"] == "groq":
+        return PooledGroq(spec["model"], api_key=os.getenv("GROQ_API_KEY"))
+    raise ValueError(f"Unknown model provider: {spec['provider']}")
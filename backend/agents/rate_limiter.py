@@ -0,0 +1,236 @@
+# rate_limiter.py
+"""
+Per-provider token buckets with a priority, session-fair request queue.
+
+Each provider has a requests/min and a tokens/min bucket. Calls wait in a
+queue per provider instead of going out in a burst and coming back as 429s.
+The queue is ordered by:
+
+  1. priority: interactive turns before background work (summaries,
+     speculative generation)
+  2. a per-session fair-queueing tag, so one session firing many calls
+     cannot starve the others; backlogged sessions are served round-robin
+  3. arrival order
+
+Token use is reserved from an estimate when a call is admitted and settled
+against the real count afterwards. Providers without configured limits are
+not throttled.
+
+Config (JSON, merged over the defaults; free-tier limits):
+    RATE_LIMITS='{"groq": {"rpm": 30, "tpm": 15000}, "gemini": {"rpm": 15, "tpm": 1000000}}'
+"""
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import time
+
+from models.serialization import loads
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 10
+
+PRIORITY_NAMES = {PRIORITY_INTERACTIVE: "interactive", PRIORITY_BACKGROUND: "background"}
+
+DEFAULT_LIMITS: Dict[str, Dict[str, float]] = {
+    "groq": {"rpm": 30, "tpm": 15000},
+    "gemini": {"rpm": 15, "tpm": 1000000},
+}
+
+
+class TokenBucket:
+    """Continuously refilling bucket; capacity is one minute's allowance."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = float(per_minute)
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` can be taken (requests larger than capacity wait for a full bucket)."""
+        self._refill()
+        needed = min(amount, self.capacity) - self.level
+        return max(0.0, needed / self.rate)
+
+    def take(self, amount: float) -> None:
+        self._refill()
+        self.level -= amount
+
+    def give_back(self, amount: float) -> None:
+        self._refill()
+        self.level = min(self.capacity, self.level + amount)
+
+
+class _Waiter:
+    __slots__ = ("future", "tokens", "priority", "session_id", "enqueued")
+
+    def __init__(self, tokens: int, priority: int, session_id: str):
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.tokens = tokens
+        self.priority = priority
+        self.session_id = session_id
+        self.enqueued = time.monotonic()
+
+
+class ProviderQueue:
+    def __init__(self, name: str, rpm: Optional[float], tpm: Optional[float], wait_window: int = 500):
+        self.name = name
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self.heap: List[Any] = []
+        self.sequence = itertools.count()
+        self.virtual_time = 0.0
+        self.session_tags: Dict[str, float] = {}
+        self.pump: Optional[asyncio.Task] = None
+        self.waits: Dict[int, Deque[float]] = {}
+        self.counters = {"granted": 0, "throttled": 0, "cancelled": 0, "tokens_reserved": 0, "tokens_settled": 0}
+        self.wait_window = wait_window
+
+    @property
+    def limited(self) -> bool:
+        return self.requests is not None or self.tokens is not None
+
+    def enqueue(self, waiter: _Waiter) -> None:
+        # Start-time fair queueing: a session's next request is tagged one
+        # unit after its previous one, but never behind the current virtual time
+        tag = max(self.virtual_time, self.session_tags.get(waiter.session_id, 0.0)) + 1
+        self.session_tags[waiter.session_id] = tag
+        heapq.heappush(self.heap, (waiter.priority, tag, next(self.sequence), waiter))
+        if self.pump is None or self.pump.done():
+            self.pump = asyncio.create_task(self._pump())
+
+    def _wait_time(self, tokens: int) -> float:
+        wait = 0.0
+        if self.requests:
+            wait = max(wait, self.requests.wait_time(1))
+        if self.tokens:
+            wait = max(wait, self.tokens.wait_time(tokens))
+        return wait
+
+    async def _pump(self) -> None:
+        while self.heap:
+            priority, tag, _, waiter = self.heap[0]
+            if waiter.future.done():
+                heapq.heappop(self.heap)
+                continue
+            wait = self._wait_time(waiter.tokens)
+            if wait > 0:
+                # Re-check after sleeping: a higher-priority waiter may have arrived
+                await asyncio.sleep(wait)
+                continue
+            heapq.heappop(self.heap)
+            self.virtual_time = tag
+            if self.requests:
+                self.requests.take(1)
+            if self.tokens:
+                self.tokens.take(waiter.tokens)
+            self.counters["tokens_reserved"] += waiter.tokens
+            waiter.future.set_result(None)
+        self.session_tags = {session: tag for session, tag in self.session_tags.items() if tag > self.virtual_time}
+
+    def record_wait(self, priority: int, seconds: float) -> None:
+        self.counters["granted"] += 1
+        if seconds > 0.001:
+            self.counters["throttled"] += 1
+        self.waits.setdefault(priority, deque(maxlen=self.wait_window)).append(seconds)
+
+    def settle(self, reserved: int, actual: int) -> None:
+        """Correct the token bucket once the real token count is known."""
+        self.counters["tokens_settled"] += actual
+        if not self.tokens:
+            return
+        if actual > reserved:
+            self.tokens.take(actual - reserved)
+        elif actual < reserved:
+            self.tokens.give_back(reserved - actual)
+
+    def stats(self) -> Dict[str, Any]:
+        waits = {}
+        for priority, samples in self.waits.items():
+            ordered = sorted(samples)
+            pct = lambda p: round(ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))], 3)
+            waits[PRIORITY_NAMES.get(priority, str(priority))] = {
+                "samples": len(ordered),
+                "p50_seconds": pct(50),
+                "p95_seconds": pct(95),
+                "max_seconds": round(ordered[-1], 3),
+            }
+        return {
+            "rpm": self.requests.capacity if self.requests else None,
+            "tpm": self.tokens.capacity if self.tokens else None,
+            "queued": sum(1 for *_, waiter in self.heap if not waiter.future.done()),
+            **self.counters,
+            "queue_wait": waits,
+        }
+
+
+class Slot:
+    """Handle for an admitted call; set actual_tokens before leaving the block if known."""
+
+    def __init__(self, reserved: int):
+        self.reserved = reserved
+        self.actual_tokens: Optional[int] = None
+        self.waited = 0.0
+
+
+class RateLimiter:
+    def __init__(self, limits: Dict[str, Dict[str, float]]):
+        self.limits = limits
+        self.queues: Dict[str, ProviderQueue] = {}
+
+    @classmethod
+    def from_env(cls) -> "RateLimiter":
+        limits = {name: dict(spec) for name, spec in DEFAULT_LIMITS.items()}
+        for name, spec in loads(os.getenv("RATE_LIMITS") or "{}").items():
+            limits[name] = {**limits.get(name, {}), **spec}
+        return cls(limits)
+
+    def queue(self, provider: str) -> ProviderQueue:
+        if provider not in self.queues:
+            spec = self.limits.get(provider, {})
+            self.queues[provider] = ProviderQueue(provider, spec.get("rpm"), spec.get("tpm"))
+        return self.queues[provider]
+
+    @asynccontextmanager
+    async def slot(self, provider: str, session_id: Optional[str] = None, priority: int = PRIORITY_INTERACTIVE,
+                   estimated_tokens: int = 0) -> AsyncIterator[Slot]:
+        """Wait for the provider's budget, then run the block; tokens are settled on exit."""
+        queue = self.queue(provider)
+        slot = Slot(estimated_tokens)
+        if queue.limited:
+            waiter = _Waiter(estimated_tokens, priority, session_id or "anonymous")
+            queue.enqueue(waiter)
+            try:
+                await waiter.future
+            except asyncio.CancelledError:
+                # Hedged losers and abandoned requests leave the queue, and give
+                # back their reservation if they had already been admitted
+                if waiter.future.done() and not waiter.future.cancelled():
+                    queue.settle(estimated_tokens, 0)
+                else:
+                    waiter.future.cancel()
+                queue.counters["cancelled"] += 1
+                raise
+            slot.waited = time.monotonic() - waiter.enqueued
+            if slot.waited > 1:
+                logger.info(f"Waited {slot.waited:.1f}s for {provider} rate limit (priority {priority})")
+        queue.record_wait(priority, slot.waited)
+        try:
+            yield slot
+        finally:
+            queue.settle(estimated_tokens, slot.actual_tokens if slot.actual_tokens is not None else estimated_tokens)
+
+    def stats(self) -> Dict[str, Any]:
+        return {name: queue.stats() for name, queue in self.queues.items()}
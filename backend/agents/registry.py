@@ -0,0 +1,223 @@
+# registry.py
+"""
+Lazily built models, agents and memory.
+
+Nothing here is constructed at import time. The FastAPI lifespan calls
+build() on startup (anything that touches the registry first also triggers
+it), so importing the routes stays cheap and does not need provider keys.
+
+A tier whose provider key is missing, or whose model fails to build, is
+taken out of routing and the registry starts in degraded mode on the
+remaining tiers instead of exiting. With no usable tier at all, turns fall
+back to the error scene (or to the fake providers when FAKE_LLM=true).
+"""
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+DB_FILE = "data/agent_memory.db"
+
+
+def sqlite_memory_db(db_file: str):
+    """
+    Memory DB in WAL mode, so readers never block the writer and several
+    worker processes can share the file. Writers wait up to busy_timeout for
+    each other instead of failing with "database is locked".
+    """
+    from agno.memory.v2.db.sqlite import SqliteMemoryDb
+    from sqlalchemy import event
+
+    # agno 1.7 ignores a db_engine passed in (it falls through to an in-memory
+    # engine), so the pragmas go on the engine it builds from db_file
+    db = SqliteMemoryDb(table_name="game_memory", db_file=db_file)
+
+    @event.listens_for(db.db_engine, "connect")
+    def _pragmas(connection, _record):
+        cursor = connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA busy_timeout=30000")
+        cursor.close()
+
+    # Connections opened while the table was checked predate the listener
+    db.db_engine.dispose()
+    return db
+
+
+class AgentRegistry:
+    def __init__(self, model_router, prompt_cache, specialist_instructions: Dict[str, str],
+                 orchestrator_instructions: str, db_file: str = DB_FILE):
+        self.model_router = model_router
+        self.prompt_cache = prompt_cache
+        self.specialist_instructions = specialist_instructions
+        self.orchestrator_instructions = orchestrator_instructions
+        self.db_file = db_file
+        self.built = False
+        self.build_seconds: Optional[float] = None
+        self._memory = None
+        self.agents: Dict[str, Any] = {}
+        self._routed_agents: Dict[Tuple[str, str], Any] = {}
+        self._cached_agents: Dict[Tuple[str, str], Tuple[str, Any]] = {}
+
+    def build(self) -> "AgentRegistry":
+        """Build models, memory and agents once; safe to call repeatedly."""
+        if self.built:
+            return self
+        import time
+
+        started = time.monotonic()
+        from agno.agent import Agent
+        from agents.providers import build_model, missing_key
+
+        router = self.model_router
+        router.model_factory = build_model
+        fake = os.getenv("FAKE_LLM", "false").lower() == "true"
+        for tier in router.order:
+            reason = None if fake else missing_key(router.tiers[tier])
+            if reason:
+                router.disable(tier, f"{reason} is not set")
+                continue
+            try:
+                router.model(tier)
+            except Exception as e:
+                router.disable(tier, f"model init failed: {e}")
+        if not fake and not router.available_order:
+            logger.error("No model tier is available; turns will return the error scene")
+
+        if self._memory is None:
+            self._memory = self._build_memory()
+
+        for name, instructions in self.specialist_instructions.items():
+            self.agents[name] = Agent(name=name, model=self._default_model(name), instructions=instructions)
+
+        # agno drops Agent instances passed as tools, so the orchestrator does
+        # not actually call the specialists; the list is kept for when it can
+        self.agents["orchestrator_agent"] = Agent(
+            name="orchestrator_agent",
+            model=self._default_model("orchestrator_agent"),
+            tools=self.specialists,
+            memory=self._memory,
+            instructions=self.orchestrator_instructions
+        )
+
+        for tier in router.available_order:
+            if router.tiers[tier]["provider"] == "gemini":
+                for name in self.agents:
+                    agent = self.routed_agent(name, tier)
+                    self.prompt_cache.register(name, tier, router.model(tier), self.system_prompt(agent))
+
+        self.built = True
+        self.build_seconds = round(time.monotonic() - started, 3)
+        logger.info(f"Agent registry built in {self.build_seconds}s (unavailable tiers: {router.unavailable or 'none'})")
+        return self
+
+    def _default_model(self, agent_name: str):
+        router = self.model_router
+        tier = router.tier_for(agent_name)
+        return router.model(tier) if tier not in router.unavailable else None
+
+    def _build_memory(self):
+        from agno.memory.v2.memory import Memory
+
+        os.makedirs(os.path.dirname(self.db_file) or ".", exist_ok=True)
+        router = self.model_router
+        available = router.available_order
+        return Memory(
+            model=router.model(available[0]) if available else None,
+            db=sqlite_memory_db(self.db_file)
+        )
+
+    @property
+    def memory(self):
+        if self._memory is None:
+            self._memory = self._build_memory()
+        return self._memory
+
+    def use_memory(self, memory) -> None:
+        """Swap the memory backend (benchmarks and offline runs use a scratch database)."""
+        self._memory = memory
+        orchestrator = self.agents.get("orchestrator_agent")
+        if orchestrator is not None:
+            orchestrator.memory = memory
+        for agent in self._routed_agents.values():
+            if agent.name == "orchestrator_agent":
+                agent.memory = memory
+        self._cached_agents.clear()
+
+    @property
+    def specialists(self) -> List[Any]:
+        return [self.agents[name] for name in self.specialist_instructions if name in self.agents]
+
+    def agent(self, name: str):
+        return self.build().agents[name]
+
+    def routed_agent(self, name: str, tier: str):
+        """The agent on the given tier's model, built once per (agent, tier)"""
+        from agno.agent import Agent
+
+        agent = self.agents[name]
+        model = self.model_router.model(tier)
+        if agent.model is model:
+            return agent
+        key = (name, tier)
+        if key not in self._routed_agents:
+            self._routed_agents[key] = Agent(
+                name=name,
+                model=model,
+                tools=agent.tools,
+                memory=agent.memory,
+                instructions=agent.instructions
+            )
+        return self._routed_agents[key]
+
+    @staticmethod
+    def system_prompt(agent) -> Optional[str]:
+        """The exact system message an agent sends; the static, cacheable prefix of every call"""
+        message = agent.get_system_message(session_id="prompt-cache")
+        return message.content if message else None
+
+    def agent_for_call(self, name: str, tier: str):
+        """Routed agent for a tier, swapped for its cache-backed twin while the prefix cache is live"""
+        from agno.agent import Agent
+        from agents.providers import build_model
+
+        self.build()
+        routed = self.routed_agent(name, tier)
+        handle = self.prompt_cache.handle(name, tier, self.system_prompt(routed))
+        if handle is None:
+            return routed
+        cached = self._cached_agents.get((name, tier))
+        if cached is None or cached[0] != handle:
+            model = build_model(self.model_router.tiers[tier])
+            model.cached_content = handle
+            cached = (handle, Agent(
+                name=name,
+                model=model,
+                tools=routed.tools,
+                memory=routed.memory,
+                create_default_system_message=False
+            ))
+            self._cached_agents[(name, tier)] = cached
+        return cached[1]
+
+    def warm_up_targets(self) -> list:
+        """Cheap metadata calls that open a pooled connection to each available tier's provider"""
+        targets = []
+        router = self.build().model_router
+        for tier in router.available_order:
+            model = router.model(tier)
+            if router.tiers[tier]["provider"] == "gemini":
+                targets.append((tier, lambda model=model: model.get_client().aio.models.get(model=model.id)))
+            elif router.tiers[tier]["provider"] == "groq":
+                targets.append((tier, lambda model=model: model.get_async_client().models.list()))
+        return targets
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "built": self.built,
+            "build_seconds": self.build_seconds,
+            "degraded": bool(self.model_router.unavailable),
+            "unavailable_tiers": self.model_router.unavailable,
+        }
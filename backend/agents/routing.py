@@ -0,0 +1,292 @@
+# routing.py
+"""
+Per-agent model tiers with automatic downgrade.
+
+Each agent is assigned a tier ("quality", "fast", ...) from a routing table
+instead of a model hard-coded at import. A tier names one backend model plus
+its price and latency/error budgets. When a tier's recent p95 latency or
+error rate goes over budget it is marked degraded for a cooldown period and
+its agents are routed to the next faster tier until it recovers.
+
+Agents can also be assigned the pseudo-tier "fastest", which resolves to the
+tier with the lowest observed median latency.
+
+Config (JSON, merged over the defaults):
+    MODEL_TIERS='{"fast": {"provider": "groq", "model": "llama-3.1-8b-instant"}}'
+    AGENT_TIERS='{"narrative_agent": "quality"}'
+    MODEL_TIER_ORDER=quality,fast        # slowest/most capable first
+"""
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+import logging
+import os
+import time
+
+from models.serialization import loads
+
+logger = logging.getLogger(__name__)
+
+FASTEST = "fastest"
+
+DEFAULT_TIERS: Dict[str, Dict[str, Any]] = {
+    "quality": {
+        "provider": "gemini",
+        "model": "gemini-2.0-flash",
+        "input_cost_per_million": 0.10,
+        "output_cost_per_million": 0.40,
+        "latency_budget_seconds": 45.0,
+        "error_budget": 0.25,
+    },
+    "fast": {
+        "provider": "groq",
+        "model": "gemma2-9b-it",
+        "input_cost_per_million": 0.20,
+        "output_cost_per_million": 0.20,
+        "latency_budget_seconds": 20.0,
+        "error_budget": 0.25,
+    },
+}
+
+DEFAULT_TIER_ORDER = ["quality", "fast"]
+
+# Matches the models agents.py used to hard-code: the orchestrator on Gemini,
+# every specialist on Groq. The cheap, short-output specialists follow
+# whichever tier is measuring fastest.
+DEFAULT_AGENT_TIERS: Dict[str, str] = {
+    "orchestrator_agent": "quality",
+    "narrative_agent": "fast",
+    "npc_agent": "fast",
+    "worldbuilder_agent": "fast",
+    "threat_agent": "fast",
+    "quest_agent": "fast",
+    "emotion_agent": "fast",
+    "item_agent": "fast",
+    "lore_agent": "fast",
+    "dialogue_agent": "fast",
+    "event_agent": FASTEST,
+    "structure_agent": FASTEST,
+    "choice_agent": FASTEST,
+}
+
+
+class TierStats:
+    """Cumulative usage for one tier plus a short window used for budget checks."""
+
+    def __init__(self, window: int = 50, min_samples: int = 5):
+        self.recent: Deque[Tuple[float, bool]] = deque(maxlen=window)
+        self.min_samples = min_samples
+        self.calls = 0
+        self.errors = 0
+        self.input_tokens = 0
+        self.cached_tokens = 0
+        self.output_tokens = 0
+        self.cost_usd = 0.0
+        self.degraded_until = 0.0
+        self.downgrades = 0
+
+    def record(self, seconds: float, ok: bool) -> None:
+        self.calls += 1
+        if not ok:
+            self.errors += 1
+        self.recent.append((seconds, ok))
+
+    def latency_percentile(self, pct: float) -> Optional[float]:
+        latencies = sorted(seconds for seconds, ok in self.recent if ok)
+        if len(latencies) < self.min_samples:
+            return None
+        return latencies[min(len(latencies) - 1, int(round(pct / 100 * (len(latencies) - 1))))]
+
+    def recent_error_rate(self) -> Optional[float]:
+        if len(self.recent) < self.min_samples:
+            return None
+        return sum(1 for _, ok in self.recent if not ok) / len(self.recent)
+
+
+class ModelRouter:
+    def __init__(self, tiers: Dict[str, Dict[str, Any]], agent_tiers: Dict[str, str],
+                 order: Optional[List[str]] = None, model_factory: Optional[Callable[[Dict[str, Any]], Any]] = None,
+                 cooldown_seconds: float = 120.0, window: int = 50, min_samples: int = 5,
+                 clock: Callable[[], float] = time.monotonic):
+        self.tiers = tiers
+        self.agent_tiers = agent_tiers
+        self.order = [tier for tier in (order or list(tiers)) if tier in tiers]
+        unknown = {tier for tier in agent_tiers.values() if tier != FASTEST and tier not in tiers}
+        if unknown:
+            raise ValueError(f"AGENT_TIERS references unknown tiers: {sorted(unknown)}")
+        self.model_factory = model_factory
+        self.cooldown_seconds = cooldown_seconds
+        self.clock = clock
+        self.stats_by_tier = {tier: TierStats(window=window, min_samples=min_samples) for tier in self.tiers}
+        self.unavailable: Dict[str, str] = {}
+        self._models: Dict[str, Any] = {}
+
+    @classmethod
+    def from_env(cls, model_factory: Optional[Callable[[Dict[str, Any]], Any]] = None) -> "ModelRouter":
+        tiers = {name: dict(spec) for name, spec in DEFAULT_TIERS.items()}
+        for name, spec in loads(os.getenv("MODEL_TIERS") or "{}").items():
+            tiers[name] = {**tiers.get(name, {}), **spec}
+        agent_tiers = {**DEFAULT_AGENT_TIERS, **loads(os.getenv("AGENT_TIERS") or "{}")}
+        order_env = os.getenv("MODEL_TIER_ORDER")
+        order = [tier.strip() for tier in order_env.split(",")] if order_env else DEFAULT_TIER_ORDER
+        order += [tier for tier in tiers if tier not in order]
+        return cls(
+            tiers, agent_tiers, order=order, model_factory=model_factory,
+            cooldown_seconds=float(os.getenv("TIER_DOWNGRADE_COOLDOWN_SECONDS", "120")),
+        )
+
+    def model(self, tier: str) -> Any:
+        """Backend model object for a tier, built once by model_factory."""
+        if tier not in self._models:
+            if self.model_factory is None:
+                raise RuntimeError("ModelRouter has no model_factory")
+            self._models[tier] = self.model_factory(self.tiers[tier])
+        return self._models[tier]
+
+    def model_for(self, agent_name: str) -> Any:
+        return self.model(self.tier_for(agent_name))
+
+    def is_degraded(self, tier: str) -> bool:
+        stats = self.stats_by_tier[tier]
+        now = self.clock()
+        if stats.degraded_until:
+            if now < stats.degraded_until:
+                return True
+            # Cooldown over: start a fresh window so the tier gets another chance
+            stats.degraded_until = 0.0
+            stats.recent.clear()
+            logger.info(f"Model tier {tier} restored after cooldown")
+            return False
+
+        over_budget, p95, error_rate = self._over_budget(tier)
+        if over_budget:
+            stats.degraded_until = now + self.cooldown_seconds
+            stats.downgrades += 1
+            logger.warning(f"Model tier {tier} over budget (p95={p95}, error_rate={error_rate}); downgrading")
+            return True
+        return False
+
+    def peek_degraded(self, tier: str) -> bool:
+        """What is_degraded would answer now, without starting or ending a cooldown (for stats)."""
+        stats = self.stats_by_tier[tier]
+        if stats.degraded_until:
+            # An expired cooldown restores the tier with a fresh window
+            return self.clock() < stats.degraded_until
+        return self._over_budget(tier)[0]
+
+    def _over_budget(self, tier: str) -> Tuple[bool, Optional[float], Optional[float]]:
+        stats = self.stats_by_tier[tier]
+        budget = self.tiers[tier]
+        p95 = stats.latency_percentile(95)
+        error_rate = stats.recent_error_rate()
+        over_latency = p95 is not None and p95 > budget.get("latency_budget_seconds", float("inf"))
+        over_errors = error_rate is not None and error_rate > budget.get("error_budget", 1.0)
+        return over_latency or over_errors, p95, error_rate
+
+    def disable(self, tier: str, reason: str) -> None:
+        """Take a tier out of routing entirely, e.g. when its provider has no API key."""
+        self.unavailable[tier] = reason
+        logger.warning(f"Model tier {tier} unavailable: {reason}")
+
+    @property
+    def available_order(self) -> List[str]:
+        return [tier for tier in self.order if tier not in self.unavailable]
+
+    def fastest_tier(self, degraded: Optional[Callable[[str], bool]] = None) -> str:
+        """Tier with the lowest observed median latency; the last available in order until there is data."""
+        degraded = degraded or self.is_degraded
+        measured = [
+            (stats.latency_percentile(50), tier) for tier, stats in self.stats_by_tier.items()
+            if tier not in self.unavailable and stats.latency_percentile(50) is not None and not degraded(tier)
+        ]
+        if measured:
+            return min(measured)[1]
+        return (self.available_order or self.order)[-1]
+
+    def configured_tier(self, agent_name: str, degraded: Optional[Callable[[str], bool]] = None) -> str:
+        tier = self.agent_tiers.get(agent_name, self.order[-1])
+        return self.fastest_tier(degraded) if tier == FASTEST else tier
+
+    def tier_for(self, agent_name: str, degraded: Optional[Callable[[str], bool]] = None) -> str:
+        """
+        Configured tier for an agent, moved down the order past any degraded or unavailable tiers.
+        `degraded` replaces is_degraded, e.g. peek_degraded to route without side effects.
+        """
+        degraded = degraded or self.is_degraded
+        tier = self.configured_tier(agent_name, degraded)
+        available = self.available_order
+        if not available:
+            return tier
+        below = [candidate for candidate in self.order[self.order.index(tier):] if candidate in available]
+        for candidate in below:
+            if not degraded(candidate):
+                return candidate
+        # Nothing healthy at or below the configured tier: fall back to the
+        # fastest available one, or the nearest one above it
+        return below[-1] if below else available[-1]
+
+    def lightest_tier(self) -> str:
+        """Last available tier in the downgrade order, for sessions that are out of budget."""
+        available = self.available_order
+        return available[-1] if available else self.order[-1]
+
+    def tiers_for(self, agent_name: str, lightest_first: bool = False) -> List[str]:
+        """Available tiers in the order they should be tried for an agent (routed tier first)."""
+        available = self.available_order
+        if not available:
+            return []
+        if lightest_first:
+            return list(reversed(available))
+        routed = self.tier_for(agent_name)
+        index = available.index(routed)
+        return available[index:] + list(reversed(available[:index]))
+
+    def cost(self, tier: str, input_tokens: int = 0, output_tokens: int = 0, cached_tokens: int = 0) -> float:
+        """USD cost of one call on a tier"""
+        spec = self.tiers[tier]
+        input_price = spec.get("input_cost_per_million", 0.0)
+        # Cached prompt tokens are billed at a discount (25% of input on Gemini)
+        cached_price = spec.get("cached_input_cost_per_million", input_price / 4)
+        return (
+            (input_tokens - cached_tokens) * input_price
+            + cached_tokens * cached_price
+            + output_tokens * spec.get("output_cost_per_million", 0.0)
+        ) / 1_000_000
+
+    def record(self, tier: str, seconds: float, ok: bool = True,
+               input_tokens: int = 0, output_tokens: int = 0, cached_tokens: int = 0) -> float:
+        """Feed one call into the tier's stats; returns its cost"""
+        stats = self.stats_by_tier[tier]
+        stats.record(seconds, ok)
+        stats.input_tokens += input_tokens
+        stats.cached_tokens += cached_tokens
+        stats.output_tokens += output_tokens
+        cost = self.cost(tier, input_tokens, output_tokens, cached_tokens)
+        stats.cost_usd += cost
+        return cost
+
+    def stats(self) -> Dict[str, Any]:
+        tiers = {}
+        for tier in self.order:
+            stats = self.stats_by_tier[tier]
+            tiers[tier] = {
+                "provider": self.tiers[tier].get("provider"),
+                "model": self.tiers[tier].get("model"),
+                "calls": stats.calls,
+                "errors": stats.errors,
+                "recent_error_rate": stats.recent_error_rate(),
+                "p50_seconds": stats.latency_percentile(50),
+                "p95_seconds": stats.latency_percentile(95),
+                "input_tokens": stats.input_tokens,
+                "cached_tokens": stats.cached_tokens,
+                "output_tokens": stats.output_tokens,
+                "cost_usd": round(stats.cost_usd, 6),
+                "unavailable": self.unavailable.get(tier),
+                "degraded": bool(stats.degraded_until) and self.clock() < stats.degraded_until,
+                "downgrades": stats.downgrades,
+            }
+        return {
+            "order": self.order,
+            "tiers": tiers,
+            # Read-only: polling stats must not start or end a tier's cooldown
+            "routes": {agent: self.tier_for(agent, degraded=self.peek_degraded) for agent in sorted(self.agent_tiers)},
+        }
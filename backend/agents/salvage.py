@@ -0,0 +1,163 @@
+# salvage.py
+"""
+Field-level salvage of partially valid orchestrator output.
+
+A turn is only thrown away when nothing in it can be used. Otherwise every
+top-level SceneResponse field that decodes and validates on its own is kept,
+and the caller fills the rest (regenerating cheap fields such as `options`
+from a single specialist, carrying the others forward from the last scene).
+"""
+import copy
+import json
+import re
+from typing import Annotated, Any, Dict, List, Optional, Tuple
+
+from pydantic import TypeAdapter, ValidationError
+
+from agents.data_validate_game import fix_json_common_errors, parse_json_block, validate_and_fix_response
+from models.schemas import SceneResponse
+
+_decoder = json.JSONDecoder()
+_KEY_PATTERN = re.compile(r'"([A-Za-z_][A-Za-z0-9_]*)"\s*:\s*')
+_FENCED_PATTERN = re.compile(r'```json\s*(.*?)(?:```|$)', re.DOTALL)
+
+SCENE_FIELDS = {
+    name: TypeAdapter(Annotated[tuple([field.annotation] + list(field.metadata))] if field.metadata else field.annotation)
+    for name, field in SceneResponse.model_fields.items()
+    if field.is_required()
+}
+
+# Optional fields the model may add; kept when valid, never salvaged when missing
+OPTIONAL_FIELDS = {
+    "world_info_delta": TypeAdapter(SceneResponse.model_fields["world_info_delta"].annotation),
+}
+
+
+def _line_indent(text: str, index: int) -> Optional[int]:
+    line_start = text.rfind("\n", 0, index) + 1
+    prefix = text[line_start:index]
+    return len(prefix) if not prefix.strip() else None
+
+
+def _decode_value(text: str, start: int, stop: int) -> Tuple[Any, int]:
+    try:
+        return _decoder.raw_decode(text, start)
+    except json.JSONDecodeError:
+        segment = text[start:stop].rstrip().rstrip(",").rstrip()
+        if stop == len(text):
+            segment = segment.rstrip("`").rstrip().rstrip("}").rstrip()
+        value = json.loads(fix_json_common_errors(segment))
+        return value, stop
+
+
+def extract_top_level_fields(raw_output: str) -> Dict[str, Any]:
+    """Recover every top-level SceneResponse field that still decodes on its own."""
+    fenced = _FENCED_PATTERN.search(raw_output)
+    text = fenced.group(1) if fenced else raw_output
+    start = text.find("{")
+    if start < 0:
+        return {}
+
+    keys = [
+        m for m in _KEY_PATTERN.finditer(text, start + 1)
+        if m.group(1) in SCENE_FIELDS or m.group(1) in OPTIONAL_FIELDS
+    ]
+    top_indent = _line_indent(text, keys[0].start()) if keys else None
+
+    fields: Dict[str, Any] = {}
+    position = start + 1
+    for i, match in enumerate(keys):
+        if match.start() < position:
+            continue  # nested inside a value that already decoded
+        if top_indent is not None and _line_indent(text, match.start()) != top_indent:
+            continue
+        stop = keys[i + 1].start() if i + 1 < len(keys) else len(text)
+        try:
+            value, end = _decode_value(text, match.end(), stop)
+        except (json.JSONDecodeError, ValueError):
+            continue
+        fields.setdefault(match.group(1), value)
+        position = end
+    return fields
+
+
+def _fix_field(name: str, value: Any) -> Any:
+    """Run validate_and_fix_response against a single field."""
+    try:
+        return validate_and_fix_response({name: copy.deepcopy(value)})[name]
+    except Exception:
+        return value
+
+
+def validate_field(name: str, value: Any) -> Tuple[bool, Any]:
+    """Fix and validate one SceneResponse field; returns (ok, fixed_value)."""
+    fixed = _fix_field(name, value)
+    try:
+        SCENE_FIELDS[name].validate_python(fixed)
+        return True, fixed
+    except ValidationError:
+        return False, fixed
+
+
+def salvage_scene_fields(raw_output: str) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    Split model output into usable fields and broken ones.
+
+    Returns (valid_fields, broken_field_names). Missing fields count as
+    broken. Raises ValueError when nothing at all could be recovered.
+    """
+    try:
+        candidate = parse_json_block(raw_output)
+        if not isinstance(candidate, dict):
+            candidate = {}
+    except ValueError:
+        candidate = {}
+    if not candidate:
+        candidate = extract_top_level_fields(raw_output)
+    if not candidate:
+        raise ValueError("No salvageable JSON fields in response")
+
+    valid: Dict[str, Any] = {}
+    broken: List[str] = []
+    for name in SCENE_FIELDS:
+        if name in candidate:
+            ok, fixed = validate_field(name, candidate[name])
+            if ok:
+                valid[name] = fixed
+                continue
+        broken.append(name)
+    for name, adapter in OPTIONAL_FIELDS.items():
+        if candidate.get(name) is not None:
+            try:
+                adapter.validate_python(candidate[name])
+                valid[name] = candidate[name]
+            except ValidationError:
+                pass
+    return valid, broken
+
+
+def parse_regenerated_field(name: str, raw_output: str) -> Optional[Any]:
+    """Parse a single specialist's answer for one field; None if unusable."""
+    text = raw_output.strip()
+    fenced = re.search(r'```(?:json)?\s*(.*?)```', text, re.DOTALL)
+    if fenced:
+        text = fenced.group(1).strip()
+
+    if SCENE_FIELDS[name].json_schema().get("type") == "string":
+        value: Any = text.strip('"')
+    else:
+        json_start = min((i for i in (text.find("["), text.find("{")) if i >= 0), default=-1)
+        if json_start < 0:
+            return None
+        try:
+            value, _ = _decoder.raw_decode(text, json_start)
+        except json.JSONDecodeError:
+            try:
+                value = json.loads(fix_json_common_errors(text[json_start:]))
+            except json.JSONDecodeError:
+                return None
+        if isinstance(value, dict) and name in value:
+            value = value[name]
+
+    ok, fixed = validate_field(name, value)
+    return fixed if ok else None
@@ -0,0 +1,193 @@
+# scheduler.py
+"""
+Deadline-aware retries and hedged requests across LLM providers.
+
+A turn is tried on the primary provider first. If it has not answered by that
+provider's observed p95 latency, the same request is sent to the next
+provider and whichever finishes first wins; the other task is cancelled.
+Failed attempts are retried with jittered exponential backoff (tenacity)
+until the turn's deadline, rotating which provider goes first.
+"""
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Sequence, Tuple
+import asyncio
+import logging
+import os
+import time
+
+from tenacity import (
+    AsyncRetrying, retry_if_not_exception_type, stop_after_attempt, stop_after_delay, wait_random_exponential
+)
+
+logger = logging.getLogger(__name__)
+
+ProviderCall = Tuple[str, Callable[[], Awaitable[Any]]]
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+class LatencyTracker:
+    """Rolling latency window for one provider."""
+
+    def __init__(self, window: int = 200, min_samples: int = 10):
+        self.samples: Deque[float] = deque(maxlen=window)
+        self.min_samples = min_samples
+        self.successes = 0
+        self.failures = 0
+
+    def record(self, seconds: float, ok: bool = True) -> None:
+        if ok:
+            self.samples.append(seconds)
+            self.successes += 1
+        else:
+            self.failures += 1
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if len(self.samples) < self.min_samples:
+            return None
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.successes + self.failures
+        return {
+            "successes": self.successes,
+            "failures": self.failures,
+            "error_rate": round(self.failures / total, 4) if total else 0.0,
+            "p50_seconds": self.percentile(50),
+            "p95_seconds": self.percentile(95),
+        }
+
+
+class CallScheduler:
+    def __init__(self, deadline_seconds: float = 90.0, max_attempts: int = 3, hedge_enabled: bool = True,
+                 hedge_min_delay: float = 3.0, hedge_default_delay: float = 25.0,
+                 backoff_initial: float = 0.5, backoff_max: float = 8.0, latency_window: int = 200):
+        self.deadline_seconds = deadline_seconds
+        self.max_attempts = max_attempts
+        self.hedge_enabled = hedge_enabled
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_default_delay = hedge_default_delay
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.latency_window = latency_window
+        self.trackers: Dict[str, LatencyTracker] = {}
+        self.counters = {"runs": 0, "retries": 0, "hedges_started": 0, "hedge_wins": 0, "failovers": 0, "exhausted": 0}
+
+    @classmethod
+    def from_env(cls) -> "CallScheduler":
+        return cls(
+            deadline_seconds=float(os.getenv("TURN_DEADLINE_SECONDS", "90")),
+            max_attempts=int(os.getenv("TURN_MAX_ATTEMPTS", "3")),
+            hedge_enabled=os.getenv("HEDGE_ENABLED", "true").lower() == "true",
+            hedge_min_delay=float(os.getenv("HEDGE_MIN_DELAY_SECONDS", "3")),
+            hedge_default_delay=float(os.getenv("HEDGE_DEFAULT_DELAY_SECONDS", "25")),
+        )
+
+    def tracker(self, provider: str) -> LatencyTracker:
+        if provider not in self.trackers:
+            self.trackers[provider] = LatencyTracker(window=self.latency_window)
+        return self.trackers[provider]
+
+    def hedge_delay(self, provider: str) -> float:
+        """How long to wait on a provider before hedging: its p95, clamped."""
+        p95 = self.tracker(provider).percentile(95)
+        return max(self.hedge_min_delay, p95 if p95 is not None else self.hedge_default_delay)
+
+    async def _timed(self, name: str, factory: Callable[[], Awaitable[Any]]) -> Tuple[str, Any]:
+        started = time.monotonic()
+        try:
+            result = await factory()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self.tracker(name).record(time.monotonic() - started, ok=False)
+            raise
+        self.tracker(name).record(time.monotonic() - started)
+        return name, result
+
+    async def _hedged_attempt(self, providers: Sequence[ProviderCall], deadline: float) -> Tuple[str, Any]:
+        pending_providers = list(providers)
+        running: Dict[asyncio.Task, str] = {}
+        last_error: Optional[BaseException] = None
+
+        def launch() -> None:
+            name, factory = pending_providers.pop(0)
+            running[asyncio.create_task(self._timed(name, factory))] = name
+
+        launch()
+        primary = next(iter(running.values()))
+        hedged = False
+        try:
+            while running:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise DeadlineExceeded("Turn deadline exceeded")
+
+                can_hedge = self.hedge_enabled and pending_providers
+                timeout = min(remaining, self.hedge_delay(primary)) if can_hedge else remaining
+                done, _ = await asyncio.wait(running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    if can_hedge:
+                        self.counters["hedges_started"] += 1
+                        logger.info(f"Hedging {primary} after {timeout:.1f}s with {pending_providers[0][0]}")
+                        hedged = True
+                        launch()
+                    continue
+
+                for task in done:
+                    name = running.pop(task)
+                    if task.exception() is None:
+                        if hedged and name != primary:
+                            self.counters["hedge_wins"] += 1
+                        return task.result()
+                    last_error = task.exception()
+                    logger.warning(f"Provider {name} failed: {last_error!r}")
+
+                # Everything launched so far failed: fail over immediately if we can
+                if not running and pending_providers:
+                    self.counters["failovers"] += 1
+                    launch()
+        finally:
+            for task in running:
+                task.cancel()
+
+        raise last_error or RuntimeError("No provider produced a result")
+
+    async def run(self, providers: Sequence[ProviderCall]) -> Tuple[str, Any]:
+        """Run one logical call; returns (provider_name, result) or raises the last error."""
+        if not providers:
+            raise ValueError("No providers configured")
+        self.counters["runs"] += 1
+        deadline = time.monotonic() + self.deadline_seconds
+        attempt_number = 0
+
+        try:
+            async for attempt in AsyncRetrying(
+                stop=stop_after_attempt(self.max_attempts) | stop_after_delay(self.deadline_seconds),
+                wait=wait_random_exponential(multiplier=self.backoff_initial, max=self.backoff_max),
+                # tenacity catches BaseException; a cancelled turn must stop, not retry
+                retry=retry_if_not_exception_type((DeadlineExceeded, asyncio.CancelledError)),
+                reraise=True,
+            ):
+                with attempt:
+                    if attempt_number:
+                        self.counters["retries"] += 1
+                    # Rotate the primary on retries so a failing provider is not always first
+                    offset = attempt_number % len(providers)
+                    ordered: List[ProviderCall] = list(providers[offset:]) + list(providers[:offset])
+                    attempt_number += 1
+                    return await self._hedged_attempt(ordered, deadline)
+        except Exception:
+            self.counters["exhausted"] += 1
+            raise
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.counters,
+            "providers": {name: tracker.stats() for name, tracker in self.trackers.items()},
+        }
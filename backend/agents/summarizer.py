@@ -0,0 +1,239 @@
+# summarizer.py
+"""
+Bounded history windows with a rolling summary.
+
+Each snapshot list that grows every scene (history, player choices,
+discovered secrets, story beats, and the game_state event/secret/objective
+lists) is kept to a fixed window. Entries pushed out of a window are not
+lost. They are queued for the session's rolling summary, which a background
+task folds them into at PRIORITY_BACKGROUND, off the request path. The
+next turns' context then carries "the story so far" as one bounded
+paragraph instead of an ever-longer list. Payload and prompt size stay flat
+from scene 1 to 50 and beyond.
+
+The summary is stored as one memory row per session ("<session>::summary").
+Without a model (FAKE_LLM, or the call fails) it is folded extractively,
+keeping the most recent text within the size cap.
+"""
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+import asyncio
+import hashlib
+import json
+import logging
+import os
+
+from models.serialization import dumps_str, loads
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WINDOWS = {
+    "history": 20,
+    "player_choices_history": 20,
+    "discovered_secrets": 30,
+    "major_story_beats": 20,
+    "major_events": 20,
+    "revealed_secrets": 30,
+    "completed_objectives": 50,
+    "failed_objectives": 50,
+}
+
+# Digests of entries already queued, so a client re-sending an older, longer list does not fold them twice
+SEEN_KEPT = 500
+
+Summarize = Callable[[str, str], Awaitable[Optional[str]]]
+
+
+def summary_user_id(session_id: str) -> str:
+    """Memory user id holding a session's rolling summary, kept apart from its scene snapshots"""
+    return f"{session_id}::summary"
+
+
+def load_windows() -> Dict[str, int]:
+    """Window sizes, with HISTORY_WINDOWS (JSON) merged over the defaults"""
+    windows = dict(DEFAULT_WINDOWS)
+    windows.update({name: int(size) for name, size in json.loads(os.getenv("HISTORY_WINDOWS", "{}")).items()})
+    return windows
+
+
+def window(items: List[Any], size: int) -> Tuple[List[Any], List[Any]]:
+    """(kept, evicted): the newest `size` items and everything older"""
+    if size <= 0 or len(items) <= size:
+        return list(items), []
+    return list(items[-size:]), list(items[:-size])
+
+
+class RollingSummary:
+    def __init__(self, summarize: Optional[Summarize] = None, memory: Optional[Callable[[], Any]] = None,
+                 windows: Optional[Dict[str, int]] = None, context_items: int = 10,
+                 max_chars: int = 1500, batch_size: int = 10, cache_size: int = 1000):
+        self.summarize = summarize
+        self.memory = memory
+        self.windows = dict(DEFAULT_WINDOWS) if windows is None else windows
+        # How many of a window's newest entries the prompt lists; older ones are covered by the summary
+        self.context_items = context_items
+        self.max_chars = max_chars
+        self.batch_size = batch_size
+        self.cache_size = max(1, cache_size)
+        self._states: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._stats = {"evicted": 0, "folds": 0, "model_folds": 0, "extractive_folds": 0, "errors": 0}
+
+    @classmethod
+    def from_env(cls, summarize: Optional[Summarize] = None,
+                 memory: Optional[Callable[[], Any]] = None) -> "RollingSummary":
+        return cls(
+            summarize=summarize,
+            memory=memory,
+            windows=load_windows(),
+            context_items=int(os.getenv("CONTEXT_LIST_WINDOW", "10")),
+            max_chars=int(os.getenv("ROLLING_SUMMARY_MAX_CHARS", "1500")),
+            batch_size=int(os.getenv("ROLLING_SUMMARY_BATCH", "10")),
+        )
+
+    def _state(self, session_id: str) -> Dict[str, Any]:
+        if session_id in self._states:
+            self._states.move_to_end(session_id)
+            return self._states[session_id]
+        state = None
+        memory_instance = self.memory() if self.memory else None
+        if memory_instance is not None:
+            user_id = summary_user_id(session_id)
+            try:
+                row = memory_instance.get_user_memory(memory_id=user_id, user_id=user_id)
+                state = loads(row.memory) if row is not None else None
+            except Exception as e:
+                logger.error(f"Error loading rolling summary for session {session_id}: {e}")
+        if state is None:
+            state = {"session_id": session_id, "summary": "", "folded": 0, "pending": [], "seen": []}
+        self._states[session_id] = state
+        while len(self._states) > self.cache_size:
+            oldest = next(iter(self._states))
+            if oldest in self._tasks:
+                break
+            self._states.pop(oldest)
+        return state
+
+    def window(self, name: str, items: List[Any]) -> Tuple[List[Any], List[Any]]:
+        return window(items, self.windows.get(name, 0))
+
+    def recent(self, items: List[Any]) -> List[Any]:
+        """The newest entries of a list, as shown in the prompt"""
+        return list(items[-self.context_items:]) if self.context_items > 0 else list(items)
+
+    def summary(self, session_id: str) -> str:
+        """The session's current summary; may lag the newest evictions by one fold"""
+        return self._state(session_id)["summary"]
+
+    def evict(self, session_id: str, entries: List[str]) -> None:
+        """Queue entries that fell out of a window and make sure a fold is scheduled"""
+        state = self._state(session_id)
+        seen = set(state.setdefault("seen", []))
+        fresh = []
+        for entry in entries:
+            digest = hashlib.blake2b(str(entry).encode(), digest_size=8).hexdigest() if entry else None
+            if digest and digest not in seen:
+                seen.add(digest)
+                state["seen"].append(digest)
+                fresh.append(entry)
+        if not fresh:
+            return
+        del state["seen"][:-SEEN_KEPT]
+        self._stats["evicted"] += len(fresh)
+        state["pending"].extend(fresh)
+        task = self._tasks.get(session_id)
+        if task is None or task.done():
+            self._tasks[session_id] = asyncio.create_task(self._fold_all(session_id))
+
+    async def _fold_all(self, session_id: str) -> None:
+        state = self._state(session_id)
+        try:
+            while state["pending"]:
+                batch = state["pending"][:self.batch_size]
+                state["summary"] = await self._fold(session_id, state["summary"], batch)
+                del state["pending"][:len(batch)]
+                state["folded"] += len(batch)
+                self._stats["folds"] += 1
+                self._save(state)
+        except asyncio.CancelledError:
+            # Cancelled by drain(): keep what is left queued. Cancelled by clear(): the state is gone, save nothing
+            if self._states.get(session_id) is state:
+                self._save(state)
+            raise
+        finally:
+            if self._tasks.get(session_id) is asyncio.current_task():
+                self._tasks.pop(session_id)
+
+    async def _fold(self, session_id: str, summary: str, batch: List[str]) -> str:
+        if self.summarize is not None:
+            prompt = (
+                "Rewrite the story summary below so it also covers the new events. Keep names, "
+                "allegiances, secrets and unresolved threads; drop moment-to-moment detail. Return "
+                f"ONLY the summary as plain prose, at most {self.max_chars} characters.\n\n"
+                f"SUMMARY SO FAR:\n{summary or 'None yet.'}\n\nNEW EVENTS:\n" + "\n".join(f"- {entry}" for entry in batch)
+            )
+            try:
+                folded = await self.summarize(prompt, session_id)
+                if folded and folded.strip():
+                    self._stats["model_folds"] += 1
+                    return folded.strip()[:self.max_chars]
+            except Exception as e:
+                self._stats["errors"] += 1
+                logger.warning(f"Rolling summary for session {session_id} fell back to extractive: {e}")
+        self._stats["extractive_folds"] += 1
+        text = " ".join([summary] + batch).strip() if summary else " ".join(batch)
+        return text if len(text) <= self.max_chars else "..." + text[-(self.max_chars - 3):]
+
+    def _save(self, state: Dict[str, Any]) -> None:
+        from agno.memory.v2.schema import UserMemory
+
+        memory_instance = self.memory() if self.memory else None
+        if memory_instance is None:
+            return
+        # A fixed memory_id makes every save an upsert of the session's single row
+        user_id = summary_user_id(state["session_id"])
+        try:
+            memory_instance.add_user_memory(
+                user_id=user_id,
+                memory=UserMemory(memory=dumps_str(state), memory_id=user_id),
+                refresh_from_db=False
+            )
+        except Exception as e:
+            logger.error(f"Error saving rolling summary for session {state['session_id']}: {e}")
+
+    async def drain(self, timeout: Optional[float] = None) -> None:
+        """Wait for scheduled folds (shutdown, benchmarks); anything left pending is saved for next time"""
+        tasks = list(self._tasks.values())
+        if not tasks:
+            return
+        done, pending = await asyncio.wait(tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    def forget(self, session_id: str) -> None:
+        """Drop the resident summary (another worker wrote the session) unless a fold here is still running"""
+        if session_id not in self._tasks:
+            self._states.pop(session_id, None)
+
+    def clear(self, memory_instance, session_id: str) -> None:
+        task = self._tasks.pop(session_id, None)
+        if task is not None:
+            task.cancel()
+        self._states.pop(session_id, None)
+        user_id = summary_user_id(session_id)
+        try:
+            if memory_instance.get_user_memory(memory_id=user_id, user_id=user_id) is not None:
+                memory_instance.delete_user_memory(memory_id=user_id, user_id=user_id, refresh_from_db=False)
+        except Exception as e:
+            logger.error(f"Error clearing rolling summary for session {session_id}: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "windows": self.windows,
+            "context_items": self.context_items,
+            "cached_sessions": len(self._states),
+            "running_folds": len(self._tasks),
+            "pending_entries": sum(len(state["pending"]) for state in self._states.values()),
+            **self._stats,
+        }
@@ -0,0 +1,227 @@
+# usage.py
+"""
+Per-turn, per-agent token, latency and cost accounting with session budgets.
+
+Every provider call is recorded against the agent that made it and the
+session's open turn. When a turn ends its calls are folded into the
+session's running totals, which are stored as one memory row per session
+("<session>::usage") next to its scene snapshots, so budgets survive
+restarts. A session past SESSION_BUDGET_SOFT_RATIO of its token or cost
+budget gets the lite specialist plan. A session that has used all of it
+is also moved to the lightest model tier.
+"""
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Optional
+import logging
+import os
+import time
+
+from models.serialization import dumps_str, loads
+
+logger = logging.getLogger(__name__)
+
+BUDGET_OK = "ok"
+BUDGET_LITE = "lite"
+BUDGET_EXHAUSTED = "exhausted"
+
+USAGE_KEYS = ("calls", "errors", "input_tokens", "output_tokens", "cached_tokens", "cost_usd", "seconds")
+
+
+def usage_user_id(session_id: str) -> str:
+    """Memory user id holding a session's usage, kept apart from its scene snapshots"""
+    return f"{session_id}::usage"
+
+
+def _empty() -> Dict[str, Any]:
+    return {key: 0 for key in USAGE_KEYS}
+
+
+def _add(bucket: Dict[str, Any], call: Dict[str, Any]) -> None:
+    bucket["calls"] += 1
+    bucket["errors"] += 0 if call["ok"] else 1
+    for key in ("input_tokens", "output_tokens", "cached_tokens", "cost_usd", "seconds"):
+        bucket[key] += call[key]
+
+
+def _rounded(bucket: Dict[str, Any]) -> Dict[str, Any]:
+    return {**bucket, "cost_usd": round(bucket["cost_usd"], 6), "seconds": round(bucket["seconds"], 3)}
+
+
+class UsageLedger:
+    def __init__(self, session_token_budget: int = 0, session_cost_budget_usd: float = 0.0,
+                 soft_ratio: float = 0.8, turns_kept: int = 50, cache_size: int = 1000):
+        self.session_token_budget = session_token_budget
+        self.session_cost_budget_usd = session_cost_budget_usd
+        self.soft_ratio = soft_ratio
+        self.turns_kept = turns_kept
+        self.cache_size = max(1, cache_size)
+        self._sessions: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._open_turns: Dict[str, Dict[str, Any]] = {}
+        self._agents: Dict[str, Dict[str, Any]] = {}
+        self._budget_turns = {BUDGET_LITE: 0, BUDGET_EXHAUSTED: 0}
+
+    @classmethod
+    def from_env(cls) -> "UsageLedger":
+        return cls(
+            session_token_budget=int(os.getenv("SESSION_TOKEN_BUDGET", "0")),
+            session_cost_budget_usd=float(os.getenv("SESSION_COST_BUDGET_USD", "0")),
+            soft_ratio=float(os.getenv("SESSION_BUDGET_SOFT_RATIO", "0.8")),
+            turns_kept=int(os.getenv("USAGE_TURNS_KEPT", "50")),
+        )
+
+    def _session(self, memory_instance, session_id: str) -> Dict[str, Any]:
+        if session_id in self._sessions:
+            self._sessions.move_to_end(session_id)
+            return self._sessions[session_id]
+        usage = None
+        if memory_instance is not None:
+            user_id = usage_user_id(session_id)
+            try:
+                row = memory_instance.get_user_memory(memory_id=user_id, user_id=user_id)
+                usage = loads(row.memory) if row is not None else None
+            except Exception as e:
+                logger.error(f"Error loading usage for session {session_id}: {e}")
+        if usage is None:
+            usage = {"session_id": session_id, "totals": _empty(), "agents": {}, "turns": []}
+        self._sessions[session_id] = usage
+        while len(self._sessions) > self.cache_size:
+            self._sessions.popitem(last=False)
+        return usage
+
+    def budget_state(self, session_id: str) -> str:
+        """How much of its budget a session has used; unknown sessions are within budget"""
+        usage = self._sessions.get(session_id)
+        if usage is None:
+            return BUDGET_OK
+        totals = usage["totals"]
+        used = 0.0
+        if self.session_token_budget > 0:
+            used = max(used, (totals["input_tokens"] + totals["output_tokens"]) / self.session_token_budget)
+        if self.session_cost_budget_usd > 0:
+            used = max(used, totals["cost_usd"] / self.session_cost_budget_usd)
+        if used >= 1.0:
+            return BUDGET_EXHAUSTED
+        if used >= self.soft_ratio:
+            return BUDGET_LITE
+        return BUDGET_OK
+
+    def begin_turn(self, memory_instance, session_id: str, scene: int) -> str:
+        """Open a turn for the session and return its budget state"""
+        self._session(memory_instance, session_id)
+        budget = self.budget_state(session_id)
+        if budget != BUDGET_OK:
+            self._budget_turns[budget] += 1
+            logger.info(f"Session {session_id} is over its {budget} budget threshold")
+        self._open_turns[session_id] = {
+            "scene": scene,
+            "started_at": datetime.now().isoformat(),
+            "budget": budget,
+            "calls": [],
+            "_started": time.monotonic(),
+        }
+        return budget
+
+    def record(self, session_id: Optional[str], agent: str, tier: str, input_tokens: int = 0,
+               output_tokens: int = 0, cached_tokens: int = 0, seconds: float = 0.0,
+               cost_usd: float = 0.0, ok: bool = True) -> None:
+        call = {
+            "agent": agent, "tier": tier, "ok": ok, "input_tokens": input_tokens,
+            "output_tokens": output_tokens, "cached_tokens": cached_tokens,
+            "seconds": round(seconds, 3), "cost_usd": cost_usd,
+        }
+        _add(self._agents.setdefault(agent, _empty()), call)
+        turn = self._open_turns.get(session_id) if session_id else None
+        if turn is not None:
+            turn["calls"].append(call)
+
+    def end_turn(self, memory_instance, session_id: str) -> Optional[Dict[str, Any]]:
+        """Close the session's turn, fold it into the session totals and persist them; returns the turn summary"""
+        from agno.memory.v2.schema import UserMemory
+
+        turn = self._open_turns.pop(session_id, None)
+        if turn is None:
+            return None
+        usage = self._session(memory_instance, session_id)
+        totals, by_agent = _empty(), {}
+        for call in turn["calls"]:
+            _add(totals, call)
+            _add(by_agent.setdefault(call["agent"], _empty()), call)
+            _add(usage["totals"], call)
+            _add(usage["agents"].setdefault(call["agent"], _empty()), call)
+        summary = {
+            "scene": turn["scene"],
+            "started_at": turn["started_at"],
+            "wall_seconds": round(time.monotonic() - turn["_started"], 3),
+            "budget": turn["budget"],
+            "totals": _rounded(totals),
+            "agents": {agent: _rounded(bucket) for agent, bucket in by_agent.items()},
+        }
+        usage["turns"] = (usage["turns"] + [summary])[-self.turns_kept:]
+        if memory_instance is not None:
+            # A fixed memory_id makes every save an upsert of the session's single row
+            user_id = usage_user_id(session_id)
+            try:
+                memory_instance.add_user_memory(
+                    user_id=user_id,
+                    memory=UserMemory(memory=dumps_str(usage), memory_id=user_id),
+                    refresh_from_db=False
+                )
+            except Exception as e:
+                logger.error(f"Error saving usage for session {session_id}: {e}")
+        return summary
+
+    def session_usage(self, memory_instance, session_id: str) -> Dict[str, Any]:
+        """Totals, per-agent totals and recent turns for one session"""
+        usage = self._session(memory_instance, session_id)
+        return {
+            "session_id": session_id,
+            "budget": self.budget_state(session_id),
+            "totals": _rounded(usage["totals"]),
+            "agents": {agent: _rounded(bucket) for agent, bucket in usage["agents"].items()},
+            "turns": usage["turns"],
+        }
+
+    def aggregate(self, top: int = 10) -> Dict[str, Any]:
+        """Per-agent totals since startup (with per-call averages) and the costliest cached sessions"""
+        agents = {}
+        for agent, bucket in sorted(self._agents.items(), key=lambda item: item[1]["cost_usd"], reverse=True):
+            calls = bucket["calls"] or 1
+            agents[agent] = {
+                **_rounded(bucket),
+                "avg_seconds": round(bucket["seconds"] / calls, 3),
+                "avg_output_tokens": round(bucket["output_tokens"] / calls, 1),
+            }
+        sessions = sorted(self._sessions.values(), key=lambda usage: usage["totals"]["cost_usd"], reverse=True)
+        return {
+            "agents": agents,
+            "top_sessions": [
+                {"session_id": usage["session_id"], "budget": self.budget_state(usage["session_id"]),
+                 **_rounded(usage["totals"])}
+                for usage in sessions[:top]
+            ],
+        }
+
+    def forget(self, session_id: str) -> None:
+        """Drop the resident totals (another worker wrote the session); the next turn re-reads them"""
+        if session_id not in self._open_turns:
+            self._sessions.pop(session_id, None)
+
+    def clear(self, memory_instance, session_id: str) -> None:
+        self._sessions.pop(session_id, None)
+        self._open_turns.pop(session_id, None)
+        user_id = usage_user_id(session_id)
+        try:
+            if memory_instance.get_user_memory(memory_id=user_id, user_id=user_id) is not None:
+                memory_instance.delete_user_memory(memory_id=user_id, user_id=user_id, refresh_from_db=False)
+        except Exception as e:
+            logger.error(f"Error clearing usage for session {session_id}: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "session_token_budget": self.session_token_budget,
+            "session_cost_budget_usd": self.session_cost_budget_usd,
+            "cached_sessions": len(self._sessions),
+            "open_turns": len(self._open_turns),
+            "budget_turns": self._budget_turns,
+        }
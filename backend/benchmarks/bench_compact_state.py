@@ -0,0 +1,121 @@
+# bench_compact_state.py
+"""
+Resident bytes per session and conversion cost of the compact game state.
+
+Builds N sessions' latest memory snapshots from synthetic scenes, parses
+each from JSON the way the session cache receives them (so no strings are
+shared by accident), and measures the game_state, inventory and
+current_scene characters held three ways:
+
+  dicts    parsed JSON, as the session cache held them before
+  models   GameState / Item / Character Pydantic models
+  compact  models/compact.py slotted records
+
+Sizes are deep sizes across all sessions with every object counted once, so
+interned strings and shared key tuples are credited once. Run from backend/:
+
+    python -m benchmarks.bench_compact_state --sessions 1000 --scene 30
+"""
+import argparse
+import json
+import sys
+import time
+from array import array
+
+from benchmarks.synthetic_scenes import synthetic_scene
+from models.compact import CompactCharacter, CompactGameState, CompactItem, CompactSnapshot
+from models.schemas import Character, GameState, Item
+from models.serialization import dumps, loads
+
+
+def deep_size(objects, seen: set) -> int:
+    """Bytes reachable from objects, skipping anything already in seen"""
+    total, stack = 0, list(objects)
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, type):
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+        elif isinstance(obj, (str, bytes, int, float, bool, array)) or obj is None:
+            continue
+        else:
+            if hasattr(obj, "__dict__"):
+                stack.append(obj.__dict__)
+            for klass in type(obj).__mro__:
+                for name in getattr(klass, "__slots__", ()):
+                    if hasattr(obj, name):
+                        stack.append(getattr(obj, name))
+    return total
+
+
+def _snapshot(scene: dict, session: int) -> dict:
+    return {
+        "session_id": f"session_{session}",
+        "game_state": scene["game_state"],
+        "inventory": scene["current_inventory"],
+        "current_scene": {"narration_text": scene["narration_text"], "characters": scene["characters"]},
+    }
+
+
+def _timed(fn, items) -> float:
+    started = time.perf_counter()
+    for item in items:
+        fn(item)
+    return (time.perf_counter() - started) / len(items) * 1e6
+
+
+def run(sessions: int, scene: int) -> dict:
+    raw = [dumps(_snapshot(synthetic_scene(scene, seed=i), i)) for i in range(sessions)]
+    snapshots = [loads(blob) for blob in raw]
+
+    dicts = [(s["game_state"], s["inventory"], s["current_scene"]["characters"]) for s in snapshots]
+    models = [
+        (GameState(**gs), [Item(**i) for i in inv], [Character(**c) for c in chars])
+        for gs, inv, chars in dicts
+    ]
+    compact = [
+        (CompactGameState.from_dict(gs), [CompactItem.from_dict(i) for i in inv],
+         [CompactCharacter.from_dict(c) for c in chars])
+        for gs, inv, chars in dicts
+    ]
+    dict_bytes = deep_size(dicts, set())
+    model_bytes = deep_size(models, set())
+    compact_bytes = deep_size(compact, set())
+
+    packed = [CompactSnapshot(s) for s in snapshots]
+    assert all(p.to_dict() == s for p, s in zip(packed, snapshots)), "compact round trip changed a snapshot"
+    game_states = [gs for gs, _, _ in dicts]
+    game_state_models = [gs for gs, _, _ in models]
+    compact_states = [gs for gs, _, _ in compact]
+
+    return {
+        "sessions": sessions,
+        "scene": scene,
+        "bytes_per_session": {
+            "dicts": dict_bytes // sessions,
+            "models": model_bytes // sessions,
+            "compact": compact_bytes // sessions,
+        },
+        "compact_vs_dicts": round(compact_bytes / dict_bytes, 3),
+        "conversion_us_per_session": {
+            "snapshot_from_dict": round(_timed(CompactSnapshot, snapshots), 1),
+            "snapshot_to_dict": round(_timed(CompactSnapshot.to_dict, packed), 1),
+            "game_state_from_model": round(_timed(CompactGameState.from_model, game_state_models), 1),
+            "game_state_to_model": round(_timed(CompactGameState.to_model, compact_states), 1),
+            "game_state_validate_dict": round(_timed(lambda gs: GameState(**gs), game_states), 1),
+        },
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=1000)
+    parser.add_argument("--scene", type=int, default=30)
+    args = parser.parse_args()
+    print(json.dumps(run(args.sessions, args.scene), indent=2))
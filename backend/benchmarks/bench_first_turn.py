@@ -0,0 +1,132 @@
+# bench_first_turn.py
+"""
+First-call and steady-state latency with and without pooled, pre-warmed clients.
+
+Runs against a local TLS server that charges a fixed connection setup cost
+(standing in for DNS + TCP + TLS round trips to the provider) and a fixed
+per-request cost. Modes:
+
+  per_call_client  a new httpx.AsyncClient per call (what agno's Groq model did)
+  pooled_cold      one HttpPool-configured client, no warm-up
+  pooled_warm      one HttpPool-configured client, warmed with HttpPool.warm_up
+
+Run from backend/:
+
+    python -m benchmarks.bench_first_turn --calls 20 --setup-ms 150 --request-ms 20
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import ssl
+import statistics
+import tempfile
+import time
+
+import httpx
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.x509.oid import NameOID
+
+from agents.http_pool import HttpPool
+
+
+def _self_signed_cert(directory: str):
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "localhost")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name).issuer_name(name).public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now).not_valid_after(now + datetime.timedelta(days=1))
+        .add_extension(x509.SubjectAlternativeName([x509.DNSName("localhost")]), critical=False)
+        .sign(key, hashes.SHA256())
+    )
+    cert_path, key_path = os.path.join(directory, "cert.pem"), os.path.join(directory, "key.pem")
+    with open(cert_path, "wb") as f:
+        f.write(cert.public_bytes(serialization.Encoding.PEM))
+    with open(key_path, "wb") as f:
+        f.write(key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                  serialization.NoEncryption()))
+    return cert_path, key_path
+
+
+async def _serve(cert_path: str, key_path: str, setup: float, request: float):
+    context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    context.load_cert_chain(cert_path, key_path)
+    stats = {"connections": 0}
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        stats["connections"] += 1
+        await asyncio.sleep(setup)
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                if not head:
+                    break
+                await asyncio.sleep(request)
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\nConnection: keep-alive\r\n\r\nok")
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0, ssl=context)
+    return server, server.sockets[0].getsockname()[1], stats
+
+
+async def _run(mode: str, calls: int, idle: float, url: str, verify: ssl.SSLContext, pool: HttpPool) -> dict:
+    client = None if mode == "per_call_client" else httpx.AsyncClient(**pool.client_args(), verify=verify)
+    if mode == "pooled_warm":
+        await pool.warm_up([("local", lambda: client.get(url))])
+
+    latencies = []
+    for index in range(calls):
+        if index and idle:
+            await asyncio.sleep(idle)
+        started = time.perf_counter()
+        if client is None:
+            async with httpx.AsyncClient(verify=verify) as one_off:
+                await one_off.get(url)
+        else:
+            await client.get(url)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    if client is not None:
+        await client.aclose()
+    return {
+        "mode": mode,
+        "first_call_ms": round(latencies[0], 1),
+        "steady_p50_ms": round(statistics.median(latencies[1:]), 1) if calls > 1 else None,
+        "total_ms": round(sum(latencies), 1),
+    }
+
+
+async def main(args) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        cert_path, key_path = _self_signed_cert(directory)
+        server, port, stats = await _serve(cert_path, key_path, args.setup_ms / 1000, args.request_ms / 1000)
+        verify = ssl.create_default_context(cafile=cert_path)
+        pool = HttpPool(warm_connections=1, keepalive_seconds=args.keepalive_seconds)
+        url = f"https://localhost:{port}/"
+        async with server:
+            for mode in ("per_call_client", "pooled_cold", "pooled_warm"):
+                before = stats["connections"]
+                result = await _run(mode, args.calls, args.idle, url, verify, pool)
+                result["connections_opened"] = stats["connections"] - before
+                print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=20)
+    parser.add_argument("--setup-ms", type=float, default=150.0, help="Simulated DNS+TCP+TLS setup per connection")
+    parser.add_argument("--request-ms", type=float, default=20.0)
+    parser.add_argument("--idle", type=float, default=0.0, help="Seconds between calls")
+    parser.add_argument("--keepalive-seconds", type=float, default=120.0)
+    args = parser.parse_args()
+    asyncio.run(main(args))
@@ -0,0 +1,78 @@
+# bench_hedging.py
+"""
+Tail latency and error rate of orchestrator calls with and without hedging.
+
+Uses FakeProvider with a slow tail and injected failures (timings scaled down
+~100x from real turns). "single" is the old behaviour: one attempt on the
+primary provider; "hedged" is CallScheduler with retries and a hedge to the
+second provider after the primary's p95. Run from backend/:
+
+    python -m benchmarks.bench_hedging --calls 400
+"""
+import argparse
+import asyncio
+import json
+import logging
+import statistics
+import time
+
+from agents.fake_providers import FakeProvider
+from agents.scheduler import CallScheduler
+
+
+def _providers(seed: int):
+    primary = FakeProvider("primary", latency=0.08, jitter=0.04, failure_rate=0.05,
+                           tail_rate=0.08, tail_latency=0.6, respond=lambda p: "ok", seed=seed)
+    secondary = FakeProvider("secondary", latency=0.12, jitter=0.04, failure_rate=0.03,
+                             tail_rate=0.02, tail_latency=0.6, respond=lambda p: "ok", seed=seed + 1)
+    return primary, secondary
+
+
+async def _run(mode: str, calls: int, concurrency: int, seed: int) -> dict:
+    primary, secondary = _providers(seed)
+    if mode == "single":
+        scheduler = CallScheduler(deadline_seconds=2.0, max_attempts=1, hedge_enabled=False)
+        providers = [(primary.name, lambda: primary("turn"))]
+    else:
+        scheduler = CallScheduler(deadline_seconds=2.0, max_attempts=3, hedge_min_delay=0.05,
+                                  hedge_default_delay=0.2, backoff_initial=0.01, backoff_max=0.05)
+        providers = [(primary.name, lambda: primary("turn")), (secondary.name, lambda: secondary("turn"))]
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, errors = [], 0
+
+    async def one():
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await scheduler.run(providers)
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*[one() for _ in range(calls)])
+    ordered = sorted(latencies)
+    pct = lambda p: round(ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))] * 1000, 1)
+    return {
+        "mode": mode,
+        "p50_ms": pct(50),
+        "p95_ms": pct(95),
+        "p99_ms": pct(99),
+        "mean_ms": round(statistics.mean(latencies) * 1000, 1),
+        "error_rate": round(errors / calls, 4),
+        "provider_calls": primary.calls + secondary.calls,
+        "cancelled_losers": primary.cancelled + secondary.cancelled,
+        "scheduler": {k: v for k, v in scheduler.counters.items()},
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+    logging.getLogger("agents.scheduler").setLevel(logging.ERROR)
+    for mode in ("single", "hedged"):
+        print(json.dumps(asyncio.run(_run(mode, args.calls, args.concurrency, args.seed))))
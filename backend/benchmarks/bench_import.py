@@ -0,0 +1,63 @@
+# bench_import.py
+"""
+Import and startup cost of the backend, each sample in a fresh interpreter.
+
+  import_routes   `import routes.game` (what every worker and test pays)
+  import_main     `import main` (app object, no lifespan)
+  build_registry  agent_registry.build() after import: models, agents, memory
+
+Run from backend/:
+
+    python -m benchmarks.bench_import --runs 5
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+SNIPPETS = {
+    "import_routes": "import routes.game",
+    "import_main": "import main",
+    "build_registry": None,
+}
+
+TEMPLATE = """
+import sys, time
+sys.path.insert(0, '.')
+started = time.perf_counter()
+{body}
+elapsed = time.perf_counter() - started
+heavy = sorted(m for m in ('agno.agent', 'google.genai', 'groq', 'sqlalchemy') if m in sys.modules)
+print(elapsed, ','.join(heavy))
+"""
+
+BUILD = """import routes.game
+from agents.agents import agent_registry
+started = time.perf_counter()
+agent_registry.build()"""
+
+
+def _sample(name: str) -> tuple:
+    body = BUILD if name == "build_registry" else SNIPPETS[name]
+    output = subprocess.run(
+        [sys.executable, "-c", TEMPLATE.format(body=body)],
+        capture_output=True, text=True, check=True,
+    ).stdout.strip().splitlines()[-1]
+    seconds, heavy = output.split(" ", 1) if " " in output else (output, "")
+    return float(seconds), heavy
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+    for name in SNIPPETS:
+        samples = [_sample(name) for _ in range(args.runs)]
+        times = [seconds * 1000 for seconds, _ in samples]
+        print(json.dumps({
+            "step": name,
+            "median_ms": round(statistics.median(times), 1),
+            "min_ms": round(min(times), 1),
+            "heavy_modules_loaded": samples[-1][1].split(",") if samples[-1][1] else [],
+        }))
@@ -0,0 +1,149 @@
+# bench_overload.py
+"""
+Load test for admission control: the same overload with and without it.
+
+Starts `uvicorn main:app` with FAKE_LLM=true and slow, capacity-limited fake
+providers (FAKE_LLM_CAPACITY calls at a time per provider, so latency grows
+with load like a rate-limited API). Admission thresholds are scaled down to
+match. --sessions sessions open their games a few at a time, then all of
+them play --turns turns at once. Clients give up after --client-timeout
+seconds, as a proxy would, and those turns are counted as timed out. A 503
+answer (shed) is retried after its Retry-After.
+
+Run from backend/:
+
+    python -m benchmarks.bench_overload --sessions 40 --turns 3
+
+With admission on, expect lite turns past the soft limits, quick 503s past
+the hard limits, and few or no client timeouts. With it off, every turn
+waits for the full plan and the slowest time out.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.simulate import ADMIN_HEADERS, ADMIN_TOKEN, PlaythroughClient, _free_port, _wait_ready
+
+OVERLOAD_ENV = {
+    "FAKE_LLM_LATENCY_SECONDS": "1.0",
+    "FAKE_LLM_JITTER_SECONDS": "0.2",
+    "FAKE_LLM_CAPACITY": "4",
+    "ADMISSION_SOFT_IN_FLIGHT": "6",
+    "ADMISSION_HARD_IN_FLIGHT": "16",
+    "ADMISSION_SOFT_LATENCY_SECONDS": "2",
+    "ADMISSION_HARD_LATENCY_SECONDS": "6",
+    "ADMISSION_RETRY_AFTER_SECONDS": "1",
+    "TURN_DEADLINE_SECONDS": "30",
+    "HEDGE_MIN_DELAY_SECONDS": "3",
+}
+
+
+def _pct(values: list, pct: float):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))], 2)
+
+
+async def _open(client: httpx.AsyncClient, base: str, player: PlaythroughClient, slots: asyncio.Semaphore) -> None:
+    async with slots:
+        await client.post(f"{base}/game/init", json={"session_id": player.session_id, "action": "new"})
+        response = await client.post(f"{base}/game/interact", json=player.build_agent_input(**player.next_choice()))
+        response.raise_for_status()
+        player.apply_scene(response.json())
+
+
+async def _play(client: httpx.AsyncClient, base: str, player: PlaythroughClient, turns: int, timeout: float,
+                outcome: dict) -> None:
+    for _ in range(turns):
+        body = player.build_agent_input(**player.next_choice())
+        started = time.perf_counter()
+        while True:
+            try:
+                response = await client.post(f"{base}/game/interact", json=body, timeout=timeout)
+            except httpx.TimeoutException:
+                outcome["timed_out"] += 1
+                break
+            if response.status_code == 503:
+                outcome["shed"] += 1
+                await asyncio.sleep(float(response.headers.get("retry-after", "1")))
+                continue
+            response.raise_for_status()
+            outcome["latencies"].append(time.perf_counter() - started)
+            player.apply_scene(response.json())
+            break
+
+
+async def _measure(base: str, sessions: int, turns: int, timeout: float) -> dict:
+    players = [PlaythroughClient(f"overload_{i}", "Sunken Archipelago") for i in range(sessions)]
+    outcome = {"latencies": [], "shed": 0, "timed_out": 0}
+    limits = httpx.Limits(max_connections=sessions + 4)
+    async with httpx.AsyncClient(timeout=120, limits=limits) as client:
+        slots = asyncio.Semaphore(4)
+        await asyncio.gather(*(_open(client, base, player, slots) for player in players))
+        before = (await client.get(f"{base}/admin/metrics", headers=ADMIN_HEADERS)).json()["admission"]
+        started = time.perf_counter()
+        await asyncio.gather(*(_play(client, base, player, turns, timeout, outcome) for player in players))
+        elapsed = time.perf_counter() - started
+        after = (await client.get(f"{base}/admin/metrics", headers=ADMIN_HEADERS)).json()["admission"]
+    latencies = outcome["latencies"]
+    return {
+        "turns_attempted": sessions * turns,
+        "turns_completed": len(latencies),
+        "timed_out": outcome["timed_out"],
+        "shed_responses": outcome["shed"],
+        "full_turns": after["full"] - before["full"],
+        "lite_turns": after["lite"] - before["lite"],
+        "seconds": round(elapsed, 1),
+        "latency_s_p50": _pct(latencies, 50),
+        "latency_s_p95": _pct(latencies, 95),
+        "latency_s_max": _pct(latencies, 100),
+        "mean_latency_s": round(statistics.mean(latencies), 2) if latencies else None,
+        "peak_in_flight": after["peak_in_flight"],
+        "provider_p95_seconds": after["provider_p95_seconds"],
+    }
+
+
+def run(admission: bool, sessions: int, turns: int, timeout: float) -> dict:
+    scratch = tempfile.mkdtemp()
+    port = _free_port()
+    env = {
+        **os.environ,
+        **OVERLOAD_ENV,
+        "FAKE_LLM": "true",
+        "ADMISSION_ENABLED": "true" if admission else "false",
+        "MEMORY_DB_FILE": os.path.join(scratch, "memory.db"),
+        "DEBUG_CAPTURE_PATH": os.path.join(scratch, "debug_output.json"),
+        "CASSETTE_MODE": "off",
+        "ADMIN_TOKEN": ADMIN_TOKEN,
+    }
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        base = f"http://127.0.0.1:{port}"
+        asyncio.run(_wait_ready(base))
+        result = asyncio.run(_measure(base, sessions, turns, timeout))
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    return {"admission": admission, **result}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=40)
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--client-timeout", type=float, default=8.0)
+    args = parser.parse_args()
+    for admission in (False, True):
+        print(json.dumps(run(admission, args.sessions, args.turns, args.client_timeout)))
@@ -0,0 +1,75 @@
+# bench_serialization.py
+"""
+Serialization cost of a realistic 50-scene session.
+
+Plays one session in-process with the simulator (benchmarks/simulate.py),
+with the model call replaced by synthetic scenes, then loads it back through
+`/game/init`. Everything except the LLM is real: validation, memory
+snapshots, SQLite writes and response encoding. Run from backend/:
+
+    python -m benchmarks.bench_serialization --scenes 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.simulate import Simulation
+from benchmarks.synthetic_scenes import synthetic_scene
+
+BASE = "http://bench"
+
+
+async def run(scenes: int, seed: int) -> dict:
+    from agno.memory.v2.db.sqlite import SqliteMemoryDb
+    from agno.memory.v2.memory import Memory
+
+    import main
+    from routes import game
+
+    db_file = os.path.join(tempfile.mkdtemp(), "bench_memory.db")
+    scene_counter = {"n": 0}
+
+    async def fake_turn(game_context, session_id, *args, **kwargs):
+        scene_counter["n"] += 1
+        return "```json\n" + json.dumps(synthetic_scene(scene_counter["n"], seed=seed)) + "\n```"
+
+    async with main.app.router.lifespan_context(main.app):
+        game.agent_registry.use_memory(Memory(db=SqliteMemoryDb(table_name="game_memory", db_file=db_file)))
+        game.process_game_turn = fake_turn
+        transport = httpx.ASGITransport(app=main.app)
+        simulation = Simulation(BASE, 1, scenes, "The Drowned Coast", seed, scenes, 0.0, False, db_file, None,
+                                transport=transport)
+        played = await simulation.run()
+
+        load_ms = []
+        async with httpx.AsyncClient(transport=transport, base_url=BASE) as client:
+            for _ in range(5):
+                start = time.perf_counter()
+                loaded = await client.post("/game/init", json={"session_id": "sim_0", "action": "load"})
+                load_ms.append((time.perf_counter() - start) * 1000)
+
+    turn_ms = [turn["latency"] * 1000 for scene in sorted(simulation.turns) for turn in simulation.turns[scene]]
+    return {
+        "scenes": scenes,
+        "turn_ms_mean": round(statistics.mean(turn_ms), 2),
+        "turn_ms_p95": played["by_scene"][0]["latency_ms_p95"],
+        "turn_ms_last10_mean": round(statistics.mean(turn_ms[-10:]), 2),
+        "response_kb_mean": played["by_scene"][0]["response_kb"],
+        "load_ms_mean": round(statistics.mean(load_ms), 2),
+        "load_response_kb": round(len(loaded.content) / 1024, 1),
+        "db_kb": round(os.path.getsize(db_file) / 1024, 1),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenes", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.scenes, args.seed)), indent=2))
@@ -0,0 +1,128 @@
+# bench_workers.py
+"""
+Throughput of the game backend from 1 to N uvicorn workers.
+
+For each worker count this starts `uvicorn main:app --workers N` with
+FAKE_LLM=true, SESSION_STORE=sqlite and a scratch memory DB (WAL), then
+plays --sessions concurrent sessions for --turns turns each over HTTP. It
+reports turns/s and latency, and checks two things in the memory DB:
+- every session has exactly one snapshot per turn, so no write was lost
+  across workers
+- two simultaneous turns for the same session were serialized by the
+  session lock
+
+Run from backend/:
+
+    python -m benchmarks.bench_workers --workers 1 2 4 --sessions 32 --turns 5
+
+Scaling needs as many free cores as workers; the fake providers' simulated
+latency (FAKE_LLM_LATENCY_SECONDS) overlaps within a worker already, so
+gains come from the CPU-bound part of each turn (context building, parsing,
+validation, serialization, SQLite).
+"""
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.simulate import ADMIN_HEADERS, ADMIN_TOKEN, PlaythroughClient, _free_port, _wait_ready
+
+
+async def _play(client: httpx.AsyncClient, base: str, session_id: str, turns: int, latencies: list) -> None:
+    player = PlaythroughClient(session_id, "Sunken Archipelago")
+    await client.post(f"{base}/game/init", json={"session_id": session_id, "action": "new"})
+    for _ in range(turns):
+        started = time.perf_counter()
+        response = await client.post(f"{base}/game/interact", json=player.build_agent_input(**player.next_choice()))
+        response.raise_for_status()
+        latencies.append((time.perf_counter() - started) * 1000)
+        player.apply_scene(response.json())
+
+
+async def _contend(client: httpx.AsyncClient, base: str, session_id: str) -> list:
+    """Two turns for one session at once; the lock makes the second wait for the first"""
+    player = PlaythroughClient(session_id, "Sunken Archipelago")
+    await client.post(f"{base}/game/init", json={"session_id": session_id, "action": "new"})
+    body = player.build_agent_input(**player.next_choice())
+    responses = await asyncio.gather(*(client.post(f"{base}/game/interact", json=body) for _ in range(2)))
+    return [response.status_code for response in responses]
+
+
+def _rows_per_session(db_file: str) -> dict:
+    with sqlite3.connect(db_file) as db:
+        return dict(db.execute("SELECT user_id, COUNT(*) FROM game_memory WHERE user_id NOT LIKE '%::%' GROUP BY user_id"))
+
+
+async def _measure(base: str, sessions: int, turns: int) -> dict:
+    latencies: list = []
+    limits = httpx.Limits(max_connections=sessions + 4)
+    async with httpx.AsyncClient(timeout=120, limits=limits) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(_play(client, base, f"bench_{i}", turns, latencies) for i in range(sessions)))
+        elapsed = time.perf_counter() - started
+        contention = await _contend(client, base, "bench_contended")
+        metrics = (await client.get(f"{base}/admin/metrics", headers=ADMIN_HEADERS)).json()
+    latencies.sort()
+    return {
+        "turns": len(latencies),
+        "seconds": round(elapsed, 2),
+        "turns_per_second": round(len(latencies) / elapsed, 2),
+        "latency_ms_p50": round(statistics.median(latencies), 1),
+        "latency_ms_p95": round(latencies[max(0, int(len(latencies) * 0.95) - 1)], 1),
+        "contended_turns": contention,
+        "session_store": metrics.get("session_store"),
+    }
+
+
+def run(workers: int, sessions: int, turns: int) -> dict:
+    scratch = tempfile.mkdtemp()
+    db_file = os.path.join(scratch, "memory.db")
+    port = _free_port()
+    env = {
+        **os.environ,
+        "FAKE_LLM": "true",
+        "SESSION_STORE": "sqlite",
+        "SESSION_STORE_URL": os.path.join(scratch, "session_store.db"),
+        "MEMORY_DB_FILE": db_file,
+        "DEBUG_CAPTURE_PATH": os.path.join(scratch, "debug_output.json"),
+        "CASSETTE_MODE": "off",
+        "ADMIN_TOKEN": ADMIN_TOKEN,
+    }
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--workers", str(workers),
+         "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        base = f"http://127.0.0.1:{port}"
+        asyncio.run(_wait_ready(base))
+        result = asyncio.run(_measure(base, sessions, turns))
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    rows = _rows_per_session(db_file)
+    result["workers"] = workers
+    result["lost_writes"] = sum(turns - rows.get(f"bench_{i}", 0) for i in range(sessions))
+    result["contended_rows"] = rows.get("bench_contended", 0)
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--sessions", type=int, default=32)
+    parser.add_argument("--turns", type=int, default=5)
+    args = parser.parse_args()
+    results = [run(n, args.sessions, args.turns) for n in args.workers]
+    base = results[0]["turns_per_second"]
+    for result in results:
+        result["speedup"] = round(result["turns_per_second"] / base, 2)
+    print(json.dumps(results, indent=2))
@@ -0,0 +1,76 @@
+# replay_cassette.py
+"""
+Replay a recorded cassette through `/game/interact` without any provider.
+
+Record with CASSETTE_MODE=record (CASSETTE_PATH picks the file). This
+script then posts every recorded request again, in order, against a
+scratch memory database. Each agent call is answered from the cassette, so
+everything after the model (context building, parsing, salvage, validation,
+memory snapshots, response encoding) runs on the recorded traffic shape. Run
+from backend/:
+
+    python -m benchmarks.replay_cassette data/cassettes/cassette.jsonl
+    python -m benchmarks.replay_cassette data/cassettes/cassette.jsonl --profile 25
+"""
+import argparse
+import cProfile
+import json
+import os
+import pstats
+import statistics
+import tempfile
+import time
+
+
+def run(path: str, profile: int = 0) -> dict:
+    os.environ["CASSETTE_MODE"] = "replay"
+    os.environ["CASSETTE_PATH"] = path
+    os.environ.setdefault("ADMIN_TOKEN", "replay")
+
+    from agno.memory.v2.db.sqlite import SqliteMemoryDb
+    from agno.memory.v2.memory import Memory
+    from fastapi.testclient import TestClient
+
+    import main
+    from agents.cassette import read_cassette
+    from routes import game
+
+    db_file = os.path.join(tempfile.mkdtemp(), "replay_memory.db")
+    game.agent_registry.use_memory(Memory(db=SqliteMemoryDb(table_name="game_memory", db_file=db_file)))
+    requests = [entry for entry in read_cassette(path) if entry["kind"] == "request"]
+
+    turn_ms, response_bytes, salvaged = [], [], 0
+    profiler = cProfile.Profile() if profile else None
+    with TestClient(main.app) as client:
+        for entry in requests:
+            if profiler:
+                profiler.enable()
+            start = time.perf_counter()
+            response = client.post("/game/interact", json=entry["body"])
+            turn_ms.append((time.perf_counter() - start) * 1000)
+            if profiler:
+                profiler.disable()
+            response_bytes.append(len(response.content))
+            salvaged += bool(response.json().get("salvaged_fields"))
+        stats = client.get("/admin/metrics", headers={"X-Admin-Token": os.environ["ADMIN_TOKEN"]}).json()["cassette"]
+
+    if profiler:
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(profile)
+
+    return {
+        "turns": len(requests),
+        "turn_ms_mean": round(statistics.mean(turn_ms), 2) if turn_ms else None,
+        "turn_ms_p95": round(sorted(turn_ms)[max(0, int(len(turn_ms) * 0.95) - 1)], 2) if turn_ms else None,
+        "response_kb_mean": round(statistics.mean(response_bytes) / 1024, 1) if response_bytes else None,
+        "turns_with_salvage": salvaged,
+        "db_kb": round(os.path.getsize(db_file) / 1024, 1),
+        "cassette": stats,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="Cassette JSONL recorded with CASSETTE_MODE=record")
+    parser.add_argument("--profile", type=int, default=0, help="Print the top N functions by cumulative time")
+    args = parser.parse_args()
+    print(json.dumps(run(args.path, args.profile), indent=2))
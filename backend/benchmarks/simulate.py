@@ -0,0 +1,573 @@
+# simulate.py
+"""
+Headless playthrough simulator: long sessions under concurrent load.
+
+Starts --sessions games with /game/init and plays them at the same time to
+scene --scenes. Each turn picks from the scene's options, interactive
+elements and characters, and each AgentInput is built the way
+useGameLogic.ts builds it (PlaythroughClient). Turns carry an
+Idempotency-Key like the frontend's. With --async-jobs they are submitted
+with `Prefer: respond-async` and long-polled, and resubmitted when a poll
+reaches a worker without the job (404). 503s are retried after their
+Retry-After.
+
+By default this starts its own `uvicorn main:app --workers N` with
+FAKE_LLM=true and a scratch memory DB, so it runs fully offline against the
+stub providers. With --url it drives a server that is already running
+(set ADMIN_TOKEN to that server's token for its metrics). Pass --db and
+--pid as well to get DB and RSS figures for that server.
+
+Reported per bucket of --bucket scenes:
+- turn latency p50/p95/max
+- request bytes, response bytes and bytes on the wire (compressed)
+- memory DB size (file + WAL) and server RSS (all worker processes), read
+  when the last session reaches the bucket's final scene
+
+Run from backend/:
+
+    python -m benchmarks.simulate --sessions 8 --scenes 50
+    python -m benchmarks.simulate --sessions 32 --scenes 50 --workers 2 --json sim.json
+"""
+import argparse
+import asyncio
+import copy
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from models.serialization import dumps
+
+
+# /admin/* is closed without ADMIN_TOKEN; servers started here get this one
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN") or uuid.uuid4().hex
+ADMIN_HEADERS = {"X-Admin-Token": ADMIN_TOKEN}
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def _wait_ready(base: str, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get(f"{base}/game/health")).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError("server did not start")
+
+
+def _pct(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))]
+
+
+def db_bytes(path: Optional[str]) -> Optional[int]:
+    """Memory DB size including its WAL, which holds recent writes until a checkpoint"""
+    if not path or not os.path.exists(path):
+        return None
+    return sum(os.path.getsize(path + suffix) for suffix in ("", "-wal") if os.path.exists(path + suffix))
+
+
+def rss_bytes(pid: Optional[int]) -> Optional[int]:
+    """Resident memory of a process and its children (uvicorn workers); Linux /proc only"""
+    if not pid or not os.path.isdir("/proc"):
+        return None
+    parents: Dict[int, int] = {}
+    rss: Dict[int, int] = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/status") as status:
+                fields = dict(line.split(":", 1) for line in status if ":" in line)
+        except OSError:
+            continue
+        parents[int(entry)] = int(fields.get("PPid", "0").strip())
+        if "VmRSS" in fields:
+            rss[int(entry)] = int(fields["VmRSS"].split()[0]) * 1024
+    tree, frontier = {pid}, [pid]
+    while frontier:
+        parent = frontier.pop()
+        children = [child for child, ppid in parents.items() if ppid == parent and child not in tree]
+        tree.update(children)
+        frontier.extend(children)
+    return sum(rss.get(process, 0) for process in tree) if pid in rss else None
+
+
+def default_world_info(world: str) -> Dict[str, Any]:
+    return {
+        "name": world,
+        "theme": "adventure",
+        "description": "A mysterious world awaits exploration",
+        "key_locations": [],
+        "dominant_factions": [],
+        "major_threats": [],
+        "cultural_notes": [],
+        "historical_timeline": [],
+    }
+
+
+def default_location_details() -> Dict[str, Any]:
+    return {"exits": [], "hidden_areas": [], "resource_nodes": [], "safety_level": 5}
+
+
+def default_game_state() -> Dict[str, Any]:
+    return {
+        "relationships": {},
+        "revealed_secrets": [],
+        "completed_objectives": [],
+        "failed_objectives": [],
+        "active_objectives": [],
+        "location_flags": {},
+        "story_flags": {},
+        "reputation": {},
+        "major_events": [],
+        "environmental_conditions": {
+            "weather": "clear", "visibility": "normal", "temperature": "comfortable", "hazard_level": 0
+        },
+        "resource_availability": {
+            "food": "moderate", "water": "moderate", "medical_supplies": "scarce",
+            "shelter_materials": "moderate", "fuel": "scarce", "tools": "moderate"
+        },
+    }
+
+
+class PlaythroughClient:
+    """Mirror of the browser-side game state for one session."""
+
+    def __init__(self, session_id: str, world: str, seed: int = 0):
+        self.session_id = session_id
+        self.world = world
+        self.rng = random.Random(seed)
+        self.memory: Optional[Dict[str, Any]] = None
+        self.scene: Optional[Dict[str, Any]] = None
+        self.progress: Dict[str, Any] = {
+            "scenes_completed": 0,
+            "play_time_minutes": 0,
+            "story_escalation_level": 1,
+            "tension_level": 1,
+            "major_story_beats": [],
+            "active_themes": [],
+            "world_knowledge": {},
+            "faction_standings": {},
+            "player_preferences": {},
+            "preferred_interaction_types": [],
+        }
+
+    def load(self, latest_memory_data: Dict[str, Any]) -> None:
+        """Adopt the `latest_memory_data` returned by `/game/init` (load)."""
+        self.memory = latest_memory_data
+        self.progress["scenes_completed"] = latest_memory_data.get("scenes_completed", 0)
+        self.progress["play_time_minutes"] = latest_memory_data.get("play_time_minutes", 0)
+
+    def _current_scene_context(self) -> Dict[str, Any]:
+        memory = self.memory
+        if memory and memory.get("current_scene"):
+            current = memory["current_scene"]
+            return {
+                "scene_tag": memory.get("scene_tag") or "start",
+                "location": memory.get("location") or "starting_area",
+                "world": memory.get("world") or self.world,
+                "narration_text": current.get("narration_text") or "You find yourself in a new situation...",
+                "dialogue": current.get("dialogue") or [],
+                "characters": current.get("characters") or [],
+                "narrative_options": current.get("options") or [],
+                "interactive_elements": current.get("interactive_elements") or [],
+                "environmental_discoveries": current.get("environmental_discoveries") or [],
+                "mood_atmosphere": current.get("mood_atmosphere") or "neutral",
+                "threat_updates": current.get("threat_updates") or [],
+                "ambient_events": current.get("ambient_events") or [],
+                "relationship_changes": current.get("relationship_changes") or {},
+                "new_secrets": current.get("new_secrets") or [],
+                "new_objectives": (memory.get("game_state") or {}).get("active_objectives") or [],
+                "completed_objectives_this_scene": (memory.get("game_state") or {}).get("completed_objectives") or [],
+                "discovered_lore": current.get("discovered_lore") or [],
+                "world_info": current.get("world_info") or default_world_info(self.world),
+                "location_details": current.get("location_details") or default_location_details(),
+            }
+        return {
+            "scene_tag": "start",
+            "location": "starting_area",
+            "world": self.world,
+            "narration_text": "You find yourself in a new situation...",
+            "dialogue": [],
+            "characters": [],
+            "narrative_options": [],
+            "interactive_elements": [],
+            "environmental_discoveries": [],
+            "mood_atmosphere": "neutral",
+            "threat_updates": [],
+            "ambient_events": [],
+            "relationship_changes": {},
+            "new_secrets": [],
+            "new_objectives": [],
+            "completed_objectives_this_scene": [],
+            "discovered_lore": [],
+            "world_info": default_world_info(self.world),
+            "location_details": default_location_details(),
+        }
+
+    def next_choice(self) -> Dict[str, Any]:
+        """Pick the next action from the scene's options or interactive elements."""
+        if not self.scene:
+            return {"choice_text": f"Start Game in {self.world}", "interaction_type": "narrative_choice"}
+        elements = self.scene.get("interactive_elements") or []
+        characters = self.scene.get("characters") or []
+        roll = self.rng.random()
+        if elements and roll < 0.2:
+            element = self.rng.choice(elements)
+            action = self.rng.choice(element.get("options") or [f"Examine {element['name']}"])
+            return {"choice_text": action, "interaction_type": "environmental_interaction",
+                    "element_id": element["id"], "element_type": "interactive_element"}
+        if characters and roll < 0.3:
+            character = self.rng.choice(characters)
+            return {"choice_text": f"Talk to {character['name']}", "interaction_type": "character_interaction",
+                    "element_id": character["id"], "element_type": "character"}
+        options = self.scene.get("options") or ["Continue"]
+        index = self.rng.randrange(len(options))
+        return {"choice_text": options[index], "interaction_type": "narrative_choice", "choice_index": index}
+
+    def build_agent_input(
+        self,
+        choice_text: str,
+        interaction_type: str,
+        element_id: Optional[str] = None,
+        element_type: Optional[str] = None,
+        choice_index: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """Build the request body exactly as handleChoice in useGameLogic.ts does."""
+        memory = self.memory or {}
+        scenes_completed = self.progress["scenes_completed"] + 1
+        progress = {**self.progress, "scenes_completed": scenes_completed}
+        current_scene = self._current_scene_context()
+        game_state = memory.get("game_state") or default_game_state()
+        inventory = memory.get("inventory") or []
+        scene = self.scene or {}
+        characters = scene.get("characters") or current_scene["characters"]
+        threats = scene.get("threat_updates") or current_scene["threat_updates"]
+        resources = game_state.get("resource_availability") or {}
+
+        return {
+            "session_id": self.session_id,
+            "scenes_completed": scenes_completed,
+            "user_interaction": {
+                "interaction_type": interaction_type,
+                "choice_text": choice_text,
+                "choice_index": choice_index,
+                "element_id": element_id,
+                "element_type": element_type,
+                "interaction_context": {
+                    "timestamp": datetime.now().isoformat(),
+                    "scene_context": scene.get("scene_tag") or memory.get("scene_tag") or "start",
+                    "location_context": scene.get("location") or memory.get("location") or "starting_area",
+                    "characters_present": [c["id"] for c in characters],
+                    "available_items": [i["name"] for i in (scene.get("current_inventory") or inventory)],
+                    "active_threats": [t for t in threats if t.get("immediate_danger")],
+                    "mood_when_chosen": scene.get("mood_atmosphere") or current_scene["mood_atmosphere"],
+                    "tension_level": self.progress["tension_level"],
+                },
+            },
+            "player_choice": choice_text,
+            "current_location": memory.get("location") or "starting_area",
+            "current_world": memory.get("world") or self.world,
+            "scene_tag": memory.get("scene_tag") or "start",
+            "present_characters": [c["id"] for c in current_scene["characters"]],
+            "current_scene": current_scene,
+            "current_inventory": inventory,
+            "game_state": game_state,
+            "game_progress": progress,
+            "recent_history": memory.get("history") or [],
+            "agent_hints": {
+                "player_seems_to_prefer": memory.get("player_preferences") or {},
+                "story_pacing_hint": "escalate_toward_climax" if scenes_completed > 50 else "build_tension",
+                "interaction_pattern": interaction_type,
+                "last_major_choice": (memory.get("player_choices_history") or [None])[-1],
+                "world_theme": (memory.get("world_info") or {}).get("theme", "survival"),
+                "player_resource_status": resources or {"food": "unknown", "water": "unknown"},
+            },
+            "emergency_flags": {
+                "low_health": False,
+                "high_threat": any(t.get("immediate_danger") and t.get("escalation_level", 0) > 7
+                                   for t in current_scene["threat_updates"]),
+                "story_climax_approaching": scenes_completed > 80,
+                "player_stuck": False,
+                "critical_resources_low": resources.get("food") == "critical" or resources.get("water") == "critical",
+            },
+        }
+
+    def apply_scene(self, scene: Dict[str, Any]) -> None:
+        """Fold a SceneResponse into client state like useGameMemory/useGameLogic do."""
+        previous = self.memory or {
+            "history": [],
+            "scenes_completed": 0,
+            "play_time_minutes": 0,
+            "discovered_locations": [],
+            "met_characters": [],
+            "lore_collection": [],
+            "world_info": default_world_info(self.world),
+        }
+        lore_seen: Dict[str, Any] = {}
+        for lore in (previous.get("lore_collection") or []) + (scene.get("discovered_lore") or []):
+            lore_seen.setdefault(repr(sorted(lore.items())), lore)
+
+        self.memory = {
+            **previous,
+            "session_id": self.session_id,
+            "last_updated": datetime.now().isoformat(),
+            "scene_tag": scene["scene_tag"],
+            "location": scene["location"],
+            "world": scene["world"],
+            "inventory": scene["current_inventory"],
+            "game_state": scene["game_state"],
+            "history": [h for h in (previous.get("history") or []) + [scene["history_entry"]] if h][-20:],
+            "current_scene": {
+                key: scene[key] for key in (
+                    "narration_text", "dialogue", "characters", "options", "mood_atmosphere",
+                    "relationship_changes", "new_secrets", "interactive_elements",
+                    "environmental_discoveries", "threat_updates", "ambient_events",
+                    "discovered_lore", "world_info", "location_details",
+                )
+            },
+            "scenes_completed": (previous.get("scenes_completed") or 0) + 1,
+            "discovered_locations": sorted(set((previous.get("discovered_locations") or []) + [scene["location"]])),
+            "met_characters": sorted(set((previous.get("met_characters") or []) + [c["id"] for c in scene["characters"]])),
+            "lore_collection": list(lore_seen.values()),
+            "world_info": scene.get("world_info") or previous.get("world_info"),
+        }
+        story_flags = (scene.get("game_state") or {}).get("story_flags") or {}
+        self.progress = {
+            **self.progress,
+            "scenes_completed": self.progress["scenes_completed"] + 1,
+            "story_escalation_level": story_flags.get("story_escalation_level") or self.progress["story_escalation_level"],
+            "tension_level": story_flags.get("tension_level") or self.progress["tension_level"],
+            "major_story_beats": list((scene.get("game_state") or {}).get("major_events") or []),
+            "active_themes": list(story_flags.get("active_themes") or []),
+            "faction_standings": (scene.get("game_state") or {}).get("reputation") or self.progress["faction_standings"],
+        }
+        self.scene = copy.deepcopy(scene)
+
+
+class Simulation:
+    def __init__(self, base: str, sessions: int, scenes: int, world: str, seed: int, bucket: int,
+                 think_seconds: float, async_jobs: bool, db_file: Optional[str], server_pid: Optional[int],
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.base = base
+        self.sessions = sessions
+        self.scenes = scenes
+        self.world = world
+        self.seed = seed
+        self.bucket = max(1, bucket)
+        self.think_seconds = think_seconds
+        self.async_jobs = async_jobs
+        self.db_file = db_file
+        self.server_pid = server_pid
+        # httpx.ASGITransport(app=main.app) plays against the app in-process instead of over HTTP
+        self.transport = transport
+        self.turns: Dict[int, List[dict]] = defaultdict(list)
+        self.reached: Dict[int, int] = defaultdict(int)
+        self.milestones: Dict[int, dict] = {}
+        self.counters = {"shed": 0, "errors": 0, "replayed": 0, "fallback_scenes": 0, "resubmitted": 0}
+        self.peak_rss = 0
+
+    def _milestone(self, scene: int) -> None:
+        self.reached[scene] += 1
+        if self.reached[scene] == self.sessions and (scene % self.bucket == 0 or scene == self.scenes):
+            rss = rss_bytes(self.server_pid)
+            self.peak_rss = max(self.peak_rss, rss or 0)
+            self.milestones[scene] = {"db_bytes": db_bytes(self.db_file), "rss_bytes": rss}
+
+    async def _turn(self, client: httpx.AsyncClient, body: dict) -> httpx.Response:
+        headers = {"Idempotency-Key": uuid.uuid4().hex}
+        if self.async_jobs:
+            headers["Prefer"] = "respond-async"
+        while True:
+            response = await client.post(f"{self.base}/game/interact", json=body, headers=headers)
+            if response.status_code == 503:
+                self.counters["shed"] += 1
+                await asyncio.sleep(float(response.headers.get("retry-after", "1")))
+                continue
+            while response.status_code == 202:
+                status_url = response.json()["status_url"]
+                response = await client.get(f"{self.base}{status_url}", params={"wait": 20})
+            if response.status_code == 404 and self.async_jobs:
+                # Polled on a worker that does not hold the job: resubmit under the same key, as the frontend does
+                self.counters["resubmitted"] += 1
+                continue
+            return response
+
+    async def _play(self, client: httpx.AsyncClient, index: int) -> None:
+        player = PlaythroughClient(f"sim_{index}", self.world, seed=self.seed + index)
+        await client.post(f"{self.base}/game/init", json={"session_id": player.session_id, "action": "new"})
+        for scene in range(1, self.scenes + 1):
+            body = player.build_agent_input(**player.next_choice())
+            request_bytes = len(dumps(body))
+            started = time.perf_counter()
+            response = await self._turn(client, body)
+            latency = time.perf_counter() - started
+            if response.status_code != 200:
+                self.counters["errors"] += 1
+                self._milestone(scene)
+                continue
+            scene_data = response.json()
+            self.counters["replayed"] += response.headers.get("idempotent-replayed") == "true"
+            self.counters["fallback_scenes"] += scene_data["scene_tag"].startswith("fallback_")
+            self.turns[scene].append({
+                "latency": latency,
+                "request_bytes": request_bytes,
+                "response_bytes": len(response.content),
+                "wire_bytes": response.num_bytes_downloaded,
+            })
+            player.apply_scene(scene_data)
+            self._milestone(scene)
+            if self.think_seconds:
+                await asyncio.sleep(self.think_seconds)
+
+    async def _sample_rss(self) -> None:
+        while True:
+            self.peak_rss = max(self.peak_rss, rss_bytes(self.server_pid) or 0)
+            await asyncio.sleep(1.0)
+
+    async def run(self) -> dict:
+        start = {"db_bytes": db_bytes(self.db_file), "rss_bytes": rss_bytes(self.server_pid)}
+        limits = httpx.Limits(max_connections=self.sessions + 4)
+        sampler = asyncio.create_task(self._sample_rss())
+        started = time.perf_counter()
+        try:
+            async with httpx.AsyncClient(timeout=300, limits=limits, transport=self.transport) as client:
+                await asyncio.gather(*(self._play(client, i) for i in range(self.sessions)))
+                metrics = (await client.get(f"{self.base}/admin/metrics", headers=ADMIN_HEADERS)).json()
+        finally:
+            sampler.cancel()
+        elapsed = time.perf_counter() - started
+        return self.report(start, elapsed, metrics)
+
+    def report(self, start: dict, elapsed: float, metrics: dict) -> dict:
+        buckets = []
+        for first in range(1, self.scenes + 1, self.bucket):
+            last = min(first + self.bucket - 1, self.scenes)
+            turns = [turn for scene in range(first, last + 1) for turn in self.turns[scene]]
+            latencies = [turn["latency"] * 1000 for turn in turns]
+            milestone = self.milestones.get(last, {})
+            buckets.append({
+                "scenes": f"{first}-{last}",
+                "turns": len(turns),
+                "latency_ms_p50": round(_pct(latencies, 50), 1) if turns else None,
+                "latency_ms_p95": round(_pct(latencies, 95), 1) if turns else None,
+                "latency_ms_max": round(max(latencies), 1) if turns else None,
+                "request_kb": round(statistics.mean(t["request_bytes"] for t in turns) / 1024, 1) if turns else None,
+                "response_kb": round(statistics.mean(t["response_bytes"] for t in turns) / 1024, 1) if turns else None,
+                "wire_kb": round(statistics.mean(t["wire_bytes"] for t in turns) / 1024, 1) if turns else None,
+                "db_mb": _mb(milestone.get("db_bytes")),
+                "rss_mb": _mb(milestone.get("rss_bytes")),
+            })
+        completed = sum(len(turns) for turns in self.turns.values())
+        end_db = db_bytes(self.db_file)
+        return {
+            "sessions": self.sessions,
+            "scenes": self.scenes,
+            "turns_completed": completed,
+            "seconds": round(elapsed, 1),
+            "turns_per_second": round(completed / elapsed, 2) if elapsed else None,
+            **self.counters,
+            "db_mb_start": _mb(start["db_bytes"]),
+            "db_mb_end": _mb(end_db),
+            "db_kb_per_turn": (round((end_db - (start["db_bytes"] or 0)) / completed / 1024, 1)
+                               if end_db is not None and completed else None),
+            "rss_mb_start": _mb(start["rss_bytes"]),
+            "rss_mb_peak": _mb(self.peak_rss or None),
+            "by_scene": buckets,
+            "server": {key: metrics.get(key) for key in ("admission", "session_cache", "rolling_summary", "compression")},
+        }
+
+
+def _mb(value: Optional[int]) -> Optional[float]:
+    return round(value / 1024 / 1024, 2) if value is not None else None
+
+
+def print_report(result: dict) -> None:
+    summary = {key: value for key, value in result.items() if key not in ("by_scene", "server")}
+    print(json.dumps(summary))
+    columns = ["scenes", "turns", "latency_ms_p50", "latency_ms_p95", "latency_ms_max",
+               "request_kb", "response_kb", "wire_kb", "db_mb", "rss_mb"]
+    print(" ".join(f"{column:>14}" for column in columns))
+    for row in result["by_scene"]:
+        print(" ".join(f"{'-' if row[column] is None else row[column]:>14}" for column in columns))
+
+
+def start_server(workers: int, scratch: str) -> tuple:
+    """uvicorn with the stub providers and a scratch memory DB; returns (process, base URL, DB path)"""
+    port = _free_port()
+    db_file = os.path.join(scratch, "memory.db")
+    env = {
+        **os.environ,
+        "FAKE_LLM": "true",
+        "MEMORY_DB_FILE": db_file,
+        "SESSION_STORE": "sqlite" if workers > 1 else "local",
+        "SESSION_STORE_URL": os.path.join(scratch, "session_store.db"),
+        "DEBUG_CAPTURE_PATH": os.path.join(scratch, "debug_output.json"),
+        "CASSETTE_MODE": "off",
+        "ADMIN_TOKEN": ADMIN_TOKEN,
+    }
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--workers", str(workers),
+         "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    return server, f"http://127.0.0.1:{port}", db_file
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=8)
+    parser.add_argument("--scenes", type=int, default=50)
+    parser.add_argument("--world", default="Sunken Archipelago")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--bucket", type=int, default=5, help="scenes per report row")
+    parser.add_argument("--think-seconds", type=float, default=0.0, help="pause between a session's turns")
+    parser.add_argument("--async-jobs", action="store_true", help="submit turns as jobs and long-poll them")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--url", help="drive a running server instead of starting one")
+    parser.add_argument("--db", help="memory DB of the --url server, for DB growth")
+    parser.add_argument("--pid", type=int, help="process id of the --url server, for RSS")
+    parser.add_argument("--json", help="also write the full report here")
+    args = parser.parse_args()
+
+    server = None
+    if args.url:
+        base, db_file, pid = args.url.rstrip("/"), args.db, args.pid
+    else:
+        server, base, db_file = start_server(args.workers, tempfile.mkdtemp())
+        pid = server.pid
+    try:
+        asyncio.run(_wait_ready(base))
+        simulation = Simulation(base, args.sessions, args.scenes, args.world, args.seed, args.bucket,
+                                args.think_seconds, args.async_jobs, db_file, pid)
+        result = asyncio.run(simulation.run())
+    finally:
+        if server:
+            server.terminate()
+            server.wait(timeout=30)
+    print_report(result)
+    if args.json:
+        with open(args.json, "w") as output:
+            json.dump(result, output, indent=2)
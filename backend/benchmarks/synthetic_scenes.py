@@ -0,0 +1,225 @@
+# synthetic_scenes.py
+"""
+Deterministic SceneResponse-shaped payloads for benchmarks and offline runs.
+
+Scenes grow the way real sessions do: more characters, relationships, lore and
+objectives as scenes_completed increases, so serialization and memory costs
+measured against them track what a long playthrough actually stores.
+"""
+import random
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+WORDS = (
+    "ash storm ember tide ruin gate shadow signal harbor ridge lantern relic "
+    "vault engine fever raider compass spire marsh iron beacon hollow cipher "
+    "ward oath drift furnace orchard canyon spore static mirror tether"
+).split()
+
+LORE_CATEGORIES = ['history', 'character', 'location', 'faction', 'event', 'artifact']
+FACTIONS = ["Ember Syndicate", "Tidewatch", "Hollow Choir", "Iron Compact", "Free Drifters"]
+ITEM_TYPES = ["survival", "tool", "weapon", "information", "plot"]
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    text = " ".join(rng.choice(WORDS) for _ in range(words))
+    return text.capitalize() + "."
+
+
+def _paragraph(rng: random.Random, chars: int) -> str:
+    parts: List[str] = []
+    while sum(len(p) + 1 for p in parts) < chars:
+        parts.append(_sentence(rng, rng.randint(8, 16)))
+    return " ".join(parts)[:chars]
+
+
+def synthetic_world_info(world: str, rng: random.Random) -> Dict[str, Any]:
+    return {
+        "name": world,
+        "theme": "survival",
+        "description": _paragraph(rng, 400),
+        "key_locations": [f"{rng.choice(WORDS).title()} {rng.choice(WORDS).title()}" for _ in range(8)],
+        "dominant_factions": list(FACTIONS),
+        "major_threats": [f"The {rng.choice(WORDS).title()} Plague" for _ in range(4)],
+        "cultural_notes": [_sentence(rng, 12) for _ in range(6)],
+        "historical_timeline": [
+            {f"Era {i}": [_sentence(rng, 10) for _ in range(3)]} for i in range(1, 5)
+        ],
+    }
+
+
+def synthetic_scene(
+    scene_number: int,
+    world: str = "The Drowned Coast",
+    seed: int = 7,
+    rng: Optional[random.Random] = None,
+) -> Dict[str, Any]:
+    """Return a SceneResponse-shaped dict for the given scene number."""
+    rng = rng or random.Random(f"{seed}:{scene_number}")
+    n = max(scene_number, 1)
+    character_count = min(3 + n // 10, 8)
+    characters = [
+        {
+            "id": f"npc_{i}",
+            "name": f"{rng.choice(WORDS).title()} {rng.choice(WORDS).title()}",
+            "avatar": f"npc_{i}.png",
+            "interactable": True,
+            "relationship_level": rng.randint(-10, 10),
+            "current_mood": rng.choice(["wary", "hopeful", "grim", "furious", "calm"]),
+            "trust_level": rng.randint(-10, 10),
+            "memories": [_sentence(rng, 10) for _ in range(min(2 + n // 8, 8))],
+            "personal_objectives": [_sentence(rng, 8) for _ in range(2)],
+            "knowledge_flags": {f"knows_{rng.choice(WORDS)}": rng.random() > 0.5 for _ in range(4)},
+            "backstory": _paragraph(rng, 300),
+            "faction": rng.choice(FACTIONS),
+            "skills": [rng.choice(WORDS) for _ in range(3)],
+            "equipment": [rng.choice(WORDS) for _ in range(2)],
+        }
+        for i in range(character_count)
+    ]
+    objectives = [
+        {
+            "id": f"quest_{n}_{i}",
+            "description": _sentence(rng, 14),
+            "quest_type": rng.choice(["main", "side", "rescue", "moral"]),
+            "completed": False,
+            "involves_npcs": [c["id"] for c in characters[:2]],
+            "progress": rng.randint(0, 100),
+            "escalation_level": rng.randint(1, 10),
+            "rewards": [rng.choice(WORDS)],
+            "time_limit": None,
+        }
+        for i in range(3)
+    ]
+    inventory = [
+        {
+            "name": f"{rng.choice(WORDS)}_{i}",
+            "quantity": rng.randint(1, 5),
+            "description": _sentence(rng, 12),
+            "durability": rng.randint(0, 100),
+            "item_type": rng.choice(ITEM_TYPES),
+            "properties": {"weight": rng.randint(1, 10), "origin": rng.choice(WORDS)},
+        }
+        for i in range(min(4 + n // 5, 14))
+    ]
+    discovered_at = (datetime(2025, 1, 1) + timedelta(minutes=n)).isoformat()
+    lore = [
+        {
+            "id": f"lore_{n}_{i}",
+            "title": f"The {rng.choice(WORDS).title()} {rng.choice(WORDS).title()}",
+            "content": _paragraph(rng, 350),
+            "category": rng.choice(LORE_CATEGORIES),
+            "discovered_at": discovered_at,
+            "related_entries": [f"lore_{max(n - 1, 1)}_{j}" for j in range(2)],
+            "importance_level": rng.randint(1, 10),
+        }
+        for i in range(2)
+    ]
+    location = f"{rng.choice(WORDS).title()} {rng.choice(['Docks', 'Ruins', 'Tower', 'Market', 'Caves'])}"
+    return {
+        "scene_tag": f"scene_{n}_{location.lower().replace(' ', '_')}",
+        "location": location,
+        "world": world,
+        "narration_text": _paragraph(rng, 1600),
+        "dialogue": [
+            {
+                "speaker": rng.choice(characters)["name"],
+                "text": _sentence(rng, 20),
+                "emotion": rng.choice(["urgent", "bitter", "tender", "afraid"]),
+                "is_internal_thought": False,
+                "audible_to": ["Sinbad"],
+            }
+            for _ in range(6)
+        ],
+        "characters": characters,
+        "options": [_sentence(rng, 9) for _ in range(4)],
+        "game_state": {
+            "relationships": {c["id"]: c["relationship_level"] for c in characters},
+            "revealed_secrets": [_sentence(rng, 8) for _ in range(min(n // 3, 12))],
+            "completed_objectives": [f"quest_{k}_0" for k in range(1, min(n, 15))],
+            "failed_objectives": [],
+            "active_objectives": objectives,
+            "location_flags": {f"{rng.choice(WORDS)}_open": rng.random() > 0.5 for _ in range(4)},
+            "story_flags": {
+                "story_escalation_level": min(1 + n // 5, 10),
+                "tension_level": min(1 + n // 6, 10),
+                "active_themes": ["betrayal", "survival"],
+                **{f"flag_{k}": rng.choice(WORDS) for k in range(min(4 + n // 4, 16))},
+            },
+            "reputation": {faction: rng.choice(["hostile", "neutral", "friendly"]) for faction in FACTIONS},
+            "major_events": [_sentence(rng, 10) for _ in range(min(n // 2, 20))],
+            "environmental_conditions": {
+                "weather": rng.choice(["storm", "fog", "clear"]),
+                "visibility": "poor",
+                "temperature": "cold",
+                "hazard_level": rng.randint(0, 10),
+            },
+            "resource_availability": {
+                "food": "scarce",
+                "water": "moderate",
+                "medical_supplies": "critical",
+                "shelter_materials": "moderate",
+                "fuel": "scarce",
+                "tools": "moderate",
+            },
+        },
+        "inventory_changes": {"added_items": inventory[-1:], "removed_items": [], "modified_items": []},
+        "current_inventory": inventory,
+        "mood_atmosphere": rng.choice(["tense", "desperate", "eerie", "hopeful"]),
+        "history_entry": _paragraph(rng, 220),
+        "relationship_changes": {c["id"]: rng.randint(-2, 2) for c in characters[:2]},
+        "new_secrets": [_sentence(rng, 9)],
+        "new_objectives": objectives[:1],
+        "completed_objectives_this_scene": [],
+        "interactive_elements": [
+            {
+                "id": f"element_{n}_{i}",
+                "name": f"{rng.choice(WORDS).title()} {rng.choice(['Hatch', 'Console', 'Shrine'])}",
+                "description": _sentence(rng, 16),
+                "interaction_types": ["examine", "use"],
+                "requires_items": [],
+                "unlocks_options": [_sentence(rng, 6)],
+                "options": [_sentence(rng, 6) for _ in range(2)],
+                "potential_outcomes": {"success": _sentence(rng, 8), "failure": _sentence(rng, 8)},
+                "side_quest_trigger": None,
+            }
+            for i in range(3)
+        ],
+        "environmental_discoveries": [
+            {
+                "name": rng.choice(WORDS).title(),
+                "description": _sentence(rng, 14),
+                "significance": _sentence(rng, 8),
+                "unlocks_content": [rng.choice(WORDS)],
+            }
+            for _ in range(2)
+        ],
+        "threat_updates": [
+            {
+                "threat_id": f"threat_{i}",
+                "threat_name": f"{rng.choice(WORDS).title()} Stalker",
+                "escalation_level": rng.randint(1, 10),
+                "immediate_danger": rng.random() > 0.5,
+                "resolution_methods": ["fight", "flee", "hide"],
+                "affects_npcs": [characters[0]["id"]],
+            }
+            for i in range(2)
+        ],
+        "ambient_events": [
+            {
+                "event_type": "environmental",
+                "description": _sentence(rng, 12),
+                "affects_mood": True,
+                "creates_opportunities": [rng.choice(WORDS)],
+            }
+            for _ in range(2)
+        ],
+        "discovered_lore": lore,
+        "world_info": synthetic_world_info(world, random.Random(f"{seed}:{world}")),
+        "location_details": {
+            "exits": [f"{rng.choice(WORDS)}_path" for _ in range(3)],
+            "hidden_areas": [f"{rng.choice(WORDS)}_cellar"],
+            "resource_nodes": [f"{rng.choice(WORDS)}_well"],
+            "safety_level": rng.randint(1, 10),
+        },
+    }
@@ -1,6 +1,38 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from routes import game
+from routes import game, admin
+from agents.agents import agent_registry, prompt_cache, rolling_summary, warm_up_providers
+from agents.http_pool import http_pool
+from models.serialization import FastJSONResponse
+from routes.compression import CompressionMiddleware
+from routes.session_store import session_store
+from routes.turn_jobs import turn_jobs
+import asyncio
+import os
 
-app = FastAPI(title="Sinbad RPG Backend")
 
-app.include_router(game.router,prefix='/game')
\ No newline at end of file
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Models, agents and memory are built here rather than at import; a tier
+    # whose provider key is missing is left out (degraded mode)
+    await asyncio.to_thread(agent_registry.build)
+    if os.getenv("FAKE_LLM", "false").lower() != "true":
+        # Open provider connections and upload the static agent prompts before
+        # the first turn; the refresh loop keeps the caches alive
+        await warm_up_providers()
+        await prompt_cache.start()
+    turn_jobs.start()
+    yield
+    # Queued turns that have not started fail with 503; clients resubmit them
+    await turn_jobs.stop()
+    # Let in-flight history summaries finish; unfolded entries stay queued in the summary row
+    await rolling_summary.drain(timeout=10)
+    await prompt_cache.stop()
+    await http_pool.aclose()
+    await session_store.close()
+
+
+app = FastAPI(title="Sinbad RPG Backend", default_response_class=FastJSONResponse, lifespan=lifespan)
+app.add_middleware(CompressionMiddleware, **CompressionMiddleware.env_settings())
+app.include_router(game.router,prefix='/game')
+app.include_router(admin.router,prefix='/admin')
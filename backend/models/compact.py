@@ -0,0 +1,271 @@
+# compact.py
+"""
+Compact in-memory representation of resident session state.
+
+The session cache keeps thousands of sessions' latest snapshots resident.
+As nested dicts (or full Pydantic models) every GameState, Character, Item
+and QuestObjective costs a dict per object. The same relationship ids,
+story_flags keys, faction names, moods and item types are also stored as
+separate strings in every session.
+
+The records here use `__slots__`. Ids, keys and short labels are interned,
+and key sets are shared between sessions. Relationship levels and boolean
+flag maps are packed into arrays. Conversion is exact in both directions:
+from_dict/to_dict for the dicts stored in memory rows, and
+from_model/to_model for the `models/schemas.py` wire models. Anything that
+does not fit the expected shape raises ValueError, and callers keep the plain
+dict instead.
+"""
+from array import array
+from typing import Any, Dict, Optional, Tuple, Type
+import sys
+
+from pydantic import BaseModel
+
+from models.schemas import (
+    Character, EnvironmentalConditions, GameState, Item, QuestObjective, ResourceAvailability
+)
+
+_KEYSETS: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+_KEYSETS_MAX = 10000
+
+
+def _intern(value: Any) -> Any:
+    return sys.intern(value) if type(value) is str else value
+
+
+def _keys(keys) -> Tuple[str, ...]:
+    """Interned key tuple, shared between every table with the same keys"""
+    keyset = tuple(sys.intern(key) for key in keys)
+    shared = _KEYSETS.get(keyset)
+    if shared is None:
+        if len(_KEYSETS) < _KEYSETS_MAX:
+            _KEYSETS[keyset] = keyset
+        return keyset
+    return shared
+
+
+class LevelTable:
+    """Dict[str, int] as a shared key tuple and an int8 array (wider if a value needs it)"""
+    __slots__ = ("keys", "values")
+
+    def __init__(self, data: Dict[str, int]):
+        if any(type(value) is not int for value in data.values()):
+            raise ValueError("LevelTable values must be ints")
+        self.keys = _keys(data)
+        try:
+            self.values = array("b", data.values())
+        except OverflowError:
+            self.values = array("q", data.values())
+
+    def to_dict(self) -> Dict[str, int]:
+        return dict(zip(self.keys, self.values))
+
+
+class FlagTable:
+    """Dict[str, bool] as a shared key tuple and a byte array"""
+    __slots__ = ("keys", "values")
+
+    def __init__(self, data: Dict[str, bool]):
+        if any(type(value) is not bool for value in data.values()):
+            raise ValueError("FlagTable values must be bools")
+        self.keys = _keys(data)
+        self.values = array("b", data.values())
+
+    def to_dict(self) -> Dict[str, bool]:
+        return {key: bool(value) for key, value in zip(self.keys, self.values)}
+
+
+class LabelTable:
+    """Dict[str, Any] as a shared key tuple and a tuple of values, string values interned"""
+    __slots__ = ("keys", "values")
+
+    def __init__(self, data: Dict[str, Any]):
+        self.keys = _keys(data)
+        self.values = tuple(_intern(value) for value in data.values())
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(zip(self.keys, self.values))
+
+
+# Field kinds: how a wire value is packed and unpacked
+LABEL = "label"        # short, repeated string: interned
+TEXT = "text"          # free text or scalar: kept as-is
+LABELS = "labels"      # List[str] of repeated strings: tuple of interned strings
+TEXTS = "texts"        # List[str] of free text: tuple
+LEVELS = "levels"      # Dict[str, int]
+FLAGS = "flags"        # Dict[str, bool]
+MAP = "map"            # Dict[str, Any]
+ANY = "any"            # kept as-is
+
+_TABLES = {LEVELS: LevelTable, FLAGS: FlagTable, MAP: LabelTable}
+
+
+def _pack(kind: Any, value: Any) -> Any:
+    if value is None:
+        return None
+    if kind == LABEL:
+        return _intern(value)
+    if kind in (TEXT, ANY):
+        return value
+    if kind == LABELS:
+        if type(value) is not list:
+            raise ValueError("expected a list")
+        return tuple(_intern(item) for item in value)
+    if kind == TEXTS:
+        if type(value) is not list:
+            raise ValueError("expected a list")
+        return tuple(value)
+    if kind in _TABLES:
+        if type(value) is not dict:
+            raise ValueError("expected a dict")
+        return _TABLES[kind](value)
+    record, many = kind
+    if many:
+        if type(value) is not list:
+            raise ValueError("expected a list")
+        return tuple(record.from_any(item) for item in value)
+    return record.from_any(value)
+
+
+def _unpack(kind: Any, value: Any) -> Any:
+    if value is None or kind in (LABEL, TEXT, ANY):
+        return value
+    if kind in (LABELS, TEXTS):
+        return list(value)
+    if kind in _TABLES:
+        return value.to_dict()
+    record, many = kind
+    return [item.to_dict() for item in value] if many else value.to_dict()
+
+
+def _unpack_model(kind: Any, value: Any) -> Any:
+    if value is None or kind in (LABEL, TEXT, ANY, LABELS, TEXTS) or kind in _TABLES:
+        return _unpack(kind, value)
+    record, many = kind
+    return [item.to_model() for item in value] if many else value.to_model()
+
+
+class CompactRecord:
+    """Base for slotted records; subclasses list (field, kind) pairs in wire-model order."""
+    __slots__ = ()
+    model: Type[BaseModel]
+    fields: Tuple[Tuple[str, Any], ...] = ()
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "CompactRecord":
+        if type(data) is not dict or len(data) != len(cls.fields):
+            raise ValueError(f"{cls.__name__}: unexpected shape")
+        record = cls.__new__(cls)
+        for name, kind in cls.fields:
+            if name not in data:
+                raise ValueError(f"{cls.__name__}: missing {name}")
+            setattr(record, name, _pack(kind, data[name]))
+        return record
+
+    @classmethod
+    def from_model(cls, model: BaseModel) -> "CompactRecord":
+        record = cls.__new__(cls)
+        for name, kind in cls.fields:
+            setattr(record, name, _pack(kind, getattr(model, name)))
+        return record
+
+    @classmethod
+    def from_any(cls, value: Any) -> "CompactRecord":
+        return cls.from_model(value) if isinstance(value, BaseModel) else cls.from_dict(value)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: _unpack(kind, getattr(self, name)) for name, kind in self.fields}
+
+    def to_model(self) -> BaseModel:
+        # Values came from validated data, so skip re-validation
+        return self.model.model_construct(
+            **{name: _unpack_model(kind, getattr(self, name)) for name, kind in self.fields}
+        )
+
+
+def _slots(fields) -> Tuple[str, ...]:
+    return tuple(name for name, _ in fields)
+
+
+class CompactItem(CompactRecord):
+    model = Item
+    fields = (("name", LABEL), ("quantity", TEXT), ("description", TEXT), ("durability", TEXT),
+              ("item_type", LABEL), ("properties", MAP))
+    __slots__ = _slots(fields)
+
+
+class CompactQuestObjective(CompactRecord):
+    model = QuestObjective
+    fields = (("id", LABEL), ("description", TEXT), ("quest_type", LABEL), ("completed", TEXT),
+              ("involves_npcs", LABELS), ("progress", TEXT), ("escalation_level", TEXT), ("rewards", LABELS),
+              ("time_limit", LABEL))
+    __slots__ = _slots(fields)
+
+
+class CompactCharacter(CompactRecord):
+    model = Character
+    fields = (("id", LABEL), ("name", LABEL), ("avatar", LABEL), ("interactable", TEXT),
+              ("relationship_level", TEXT), ("current_mood", LABEL), ("trust_level", TEXT), ("memories", TEXTS),
+              ("personal_objectives", TEXTS), ("knowledge_flags", FLAGS), ("backstory", TEXT),
+              ("faction", LABEL), ("skills", LABELS), ("equipment", LABELS))
+    __slots__ = _slots(fields)
+
+
+class CompactEnvironmentalConditions(CompactRecord):
+    model = EnvironmentalConditions
+    fields = (("weather", LABEL), ("visibility", LABEL), ("temperature", LABEL), ("hazard_level", TEXT))
+    __slots__ = _slots(fields)
+
+
+class CompactResourceAvailability(CompactRecord):
+    model = ResourceAvailability
+    fields = (("food", LABEL), ("water", LABEL), ("medical_supplies", LABEL), ("shelter_materials", LABEL),
+              ("fuel", LABEL), ("tools", LABEL))
+    __slots__ = _slots(fields)
+
+
+class CompactGameState(CompactRecord):
+    model = GameState
+    fields = (("relationships", LEVELS), ("revealed_secrets", TEXTS), ("completed_objectives", LABELS),
+              ("failed_objectives", LABELS), ("active_objectives", (CompactQuestObjective, True)),
+              ("location_flags", FLAGS), ("story_flags", MAP), ("reputation", MAP), ("major_events", TEXTS),
+              ("environmental_conditions", (CompactEnvironmentalConditions, False)),
+              ("resource_availability", (CompactResourceAvailability, False)))
+    __slots__ = _slots(fields)
+
+
+class CompactSnapshot:
+    """
+    A memory snapshot (create_memory_data output) with its game_state,
+    inventory and current_scene characters held as compact records; every
+    other key is kept as-is. to_dict() gives back an equal dict.
+    """
+    __slots__ = ("data", "game_state", "inventory", "characters")
+
+    def __init__(self, data: Dict[str, Any]):
+        scene = data.get("current_scene")
+        if type(scene) is not dict or "characters" not in scene:
+            raise ValueError("CompactSnapshot: snapshot has no current_scene characters")
+        self.game_state = CompactGameState.from_dict(data["game_state"])
+        self.inventory = tuple(CompactItem.from_dict(item) for item in data["inventory"])
+        self.characters = tuple(CompactCharacter.from_dict(character) for character in scene["characters"])
+        self.data = {
+            key: (None if key in ("game_state", "inventory") else value) for key, value in data.items()
+        }
+        self.data["current_scene"] = {**scene, "characters": None}
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = dict(self.data)
+        data["game_state"] = self.game_state.to_dict()
+        data["inventory"] = [item.to_dict() for item in self.inventory]
+        data["current_scene"] = {**data["current_scene"], "characters": [c.to_dict() for c in self.characters]}
+        return data
+
+
+def compact_snapshot(data: Dict[str, Any]) -> Optional[CompactSnapshot]:
+    """CompactSnapshot for a snapshot dict, or None when it does not have the expected shape"""
+    try:
+        return CompactSnapshot(data)
+    except (ValueError, KeyError, TypeError):
+        return None
@@ -0,0 +1,164 @@
+# json_patch.py
+"""
+Minimal RFC 6902 JSON Patch: diff two JSON documents and apply a patch.
+
+`make_patch` emits only "add", "remove" and "replace" operations. Objects
+are diffed key by key. Lists of equal length are diffed element by element.
+A list that only grew at the end gets "add" ops at "/-", and any other list
+change replaces the whole list. A container whose operations would encode
+larger than replacing it whole is replaced.
+`apply_patch` covers all six operations, so clients and benchmarks can check
+a patch against the full snapshot.
+"""
+from copy import deepcopy
+from typing import Any, Dict, List
+
+from models.serialization import dumps
+
+Patch = List[Dict[str, Any]]
+
+
+class JsonPatchError(ValueError):
+    pass
+
+
+def _escape(token: Any) -> str:
+    return str(token).replace("~", "~0").replace("/", "~1")
+
+
+def _unescape(token: str) -> str:
+    return token.replace("~1", "/").replace("~0", "~")
+
+
+def _same(old: Any, new: Any) -> bool:
+    # JSON distinguishes true from 1; Python's == does not, at any depth
+    if type(old) is not type(new):
+        return False
+    if type(old) is dict:
+        return old.keys() == new.keys() and all(_same(value, new[key]) for key, value in old.items())
+    if type(old) is list:
+        return len(old) == len(new) and all(_same(a, b) for a, b in zip(old, new))
+    return old == new
+
+
+def _diff(old: Any, new: Any, path: str, ops: Patch) -> None:
+    if _same(old, new):
+        return
+    replace = {"op": "replace", "path": path, "value": new}
+    child_ops: Patch = []
+    if type(old) is dict and type(new) is dict:
+        for key in old:
+            if key not in new:
+                child_ops.append({"op": "remove", "path": f"{path}/{_escape(key)}"})
+        for key, value in new.items():
+            if key in old:
+                _diff(old[key], value, f"{path}/{_escape(key)}", child_ops)
+            else:
+                child_ops.append({"op": "add", "path": f"{path}/{_escape(key)}", "value": value})
+    elif type(old) is list and type(new) is list and len(old) == len(new):
+        for index, (before, after) in enumerate(zip(old, new)):
+            _diff(before, after, f"{path}/{index}", child_ops)
+    elif type(old) is list and type(new) is list and len(new) > len(old) and all(_same(a, b) for a, b in zip(old, new)):
+        child_ops.extend({"op": "add", "path": f"{path}/-", "value": value} for value in new[len(old):])
+    else:
+        ops.append(replace)
+        return
+    # A container that changed almost everywhere is cheaper to send whole
+    if len(child_ops) > 1 and len(dumps(child_ops)) >= len(dumps(replace)):
+        ops.append(replace)
+    else:
+        ops.extend(child_ops)
+
+
+def make_patch(old: Any, new: Any) -> Patch:
+    """RFC 6902 operations that turn `old` into `new`"""
+    ops: Patch = []
+    _diff(old, new, "", ops)
+    return ops
+
+
+def _parent(doc: Any, path: str):
+    if not path.startswith("/"):
+        raise JsonPatchError(f"invalid pointer {path!r}")
+    tokens = [_unescape(token) for token in path[1:].split("/")]
+    target = doc
+    for token in tokens[:-1]:
+        try:
+            target = target[int(token)] if type(target) is list else target[token]
+        except (KeyError, IndexError, ValueError, TypeError):
+            raise JsonPatchError(f"path {path!r} does not exist")
+    return target, tokens[-1]
+
+
+def _index(target: list, token: str, allow_end: bool) -> int:
+    if token == "-" and allow_end:
+        return len(target)
+    if not token.isdigit() or (len(token) > 1 and token[0] == "0"):
+        raise JsonPatchError(f"invalid list index {token!r}")
+    index = int(token)
+    if index > len(target) or (index == len(target) and not allow_end):
+        raise JsonPatchError(f"list index {index} out of range")
+    return index
+
+
+def _get(doc: Any, path: str) -> Any:
+    if path == "":
+        return doc
+    target, token = _parent(doc, path)
+    try:
+        return target[_index(target, token, False)] if type(target) is list else target[token]
+    except (KeyError, TypeError):
+        raise JsonPatchError(f"path {path!r} does not exist")
+
+
+def _remove(doc: Any, path: str) -> Any:
+    target, token = _parent(doc, path)
+    if type(target) is list:
+        return target.pop(_index(target, token, False))
+    if type(target) is not dict or token not in target:
+        raise JsonPatchError(f"path {path!r} does not exist")
+    return target.pop(token)
+
+
+def _add(doc: Any, path: str, value: Any) -> Any:
+    if path == "":
+        return value
+    target, token = _parent(doc, path)
+    if type(target) is list:
+        target.insert(_index(target, token, True), value)
+    elif type(target) is dict:
+        target[token] = value
+    else:
+        raise JsonPatchError(f"path {path!r} has no container")
+    return doc
+
+
+def apply_patch(doc: Any, patch: Patch) -> Any:
+    """Apply a patch to a copy of `doc` and return it; raises JsonPatchError if any operation fails"""
+    doc = deepcopy(doc)
+    for op in patch:
+        kind, path = op.get("op"), op.get("path")
+        if not isinstance(path, str):
+            raise JsonPatchError(f"operation without a path: {op}")
+        if kind == "add":
+            doc = _add(doc, path, deepcopy(op["value"]))
+        elif kind == "remove":
+            _remove(doc, path)
+        elif kind == "replace":
+            _get(doc, path)
+            if path == "":
+                doc = deepcopy(op["value"])
+            else:
+                _remove(doc, path)
+                doc = _add(doc, path, deepcopy(op["value"]))
+        elif kind == "move":
+            value = _remove(doc, op["from"])
+            doc = _add(doc, path, value)
+        elif kind == "copy":
+            doc = _add(doc, path, deepcopy(_get(doc, op["from"])))
+        elif kind == "test":
+            if not _same(_get(doc, path), op["value"]):
+                raise JsonPatchError(f"test failed at {path!r}")
+        else:
+            raise JsonPatchError(f"unknown operation {kind!r}")
+    return doc
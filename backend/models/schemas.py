@@ -141,6 +141,29 @@ class WorldInfo(BaseModel):
     cultural_notes: List[str]
     historical_timeline: List[Dict[str, List[str]]]
 
+class WorldInfoDelta(BaseModel):
+    """Explicit change to a session's world bible; anything omitted stays as it is"""
+    name: Optional[str] = None
+    theme: Optional[str] = None
+    description: Optional[str] = None
+    add_key_locations: List[str] = Field(default_factory=list)
+    remove_key_locations: List[str] = Field(default_factory=list)
+    add_dominant_factions: List[str] = Field(default_factory=list)
+    remove_dominant_factions: List[str] = Field(default_factory=list)
+    add_major_threats: List[str] = Field(default_factory=list)
+    remove_major_threats: List[str] = Field(default_factory=list)
+    add_cultural_notes: List[str] = Field(default_factory=list)
+    add_historical_events: List[Dict[str, List[str]]] = Field(default_factory=list)
+    reason: Optional[str] = None
+
+class WorldBible(BaseModel):
+    """The session's world, stored once and versioned instead of regenerated every scene"""
+    session_id: str
+    version: int = 1
+    world_info: WorldInfo
+    updated_at: str  # ISO datetime string
+    changelog: List[Dict[str, Any]] = Field(default_factory=list)  # {version, scene, reason}
+
 # Enhanced input models
 class UserInteraction(BaseModel):
     """Captures the type and details of user interaction"""
@@ -240,6 +263,8 @@ class SceneResponse(BaseModel):
     discovered_lore: List[LoreEntry]
     world_info: WorldInfo
     location_details: LocationDetails
+    world_info_delta: Optional[WorldInfoDelta] = None  # applied to the world bible, if the world changed
+    salvaged_fields: Dict[str, str] = Field(default_factory=dict)  # field -> how it was repaired
     
     class Config:
         extra = "ignore"
@@ -259,7 +284,7 @@ class CurrentScene(BaseModel):
     threat_updates: List[ThreatUpdate]
     ambient_events: List[AmbientEvent]
     discovered_lore: List[LoreEntry]
-    world_info: WorldInfo
+    world_info: Optional[WorldInfo] = None  # lives in the world bible; filled back in on load
     location_details: LocationDetails
 
 class GameMemory(BaseModel):
@@ -287,5 +312,7 @@ class GameMemory(BaseModel):
     triggered_events: List[str]
     player_preferences: Dict[str, Any]
     resume_context: Dict[str, Any]
-    lore_collection: List[LoreEntry]
-    world_info: WorldInfo
\ No newline at end of file
+    lore_collection: Optional[List[LoreEntry]] = None  # lives in the lore store; filled back in on load
+    lore_entry_count: Optional[int] = None
+    world_info: Optional[WorldInfo] = None  # lives in the world bible; filled back in on load
+    world_bible_version: Optional[int] = None
\ No newline at end of file
@@ -0,0 +1,49 @@
+# serialization.py
+"""
+Central JSON encoding/decoding for responses and stored memory blobs.
+
+Everything that crosses the wire or lands in the memory DB goes through
+`dumps`/`loads` here so there is one fast encoder (orjson) and one place to
+change options. Pydantic models should be dumped once per turn and the
+resulting dicts reused; `dumps` still accepts stray models via `_default`.
+"""
+from typing import Any
+
+import orjson
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(obj: Any, indent: bool = False) -> bytes:
+    """Serialize to UTF-8 JSON bytes."""
+    option = _OPTIONS | orjson.OPT_INDENT_2 if indent else _OPTIONS
+    return orjson.dumps(obj, default=_default, option=option)
+
+
+def dumps_str(obj: Any, indent: bool = False) -> str:
+    """Serialize to a JSON string (for storage layers that want text)."""
+    return dumps(obj, indent=indent).decode("utf-8")
+
+
+def loads(data: Any) -> Any:
+    """Parse JSON from bytes or str."""
+    return orjson.loads(data)
+
+
+class FastJSONResponse(Response):
+    """JSONResponse replacement that encodes with orjson."""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
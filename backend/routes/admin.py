@@ -0,0 +1,118 @@
+# admin.py
+from fastapi import APIRouter, Depends, Header, HTTPException
+from typing import Optional
+import os
+
+from agents.agents import (
+    agent_registry, call_scheduler, cassette, model_router, prompt_cache, rate_limiter, rolling_summary, turn_counters,
+    usage_ledger
+)
+from agents.planner import planner_stats
+from agents.http_pool import http_pool
+from routes.compression import BROTLI_AVAILABLE, compression_stats
+from routes.debug_capture import debug_capture
+from routes.lore_store import lore_store
+from routes.scene_versions import scene_versions
+from routes.session_cache import session_cache
+from routes.session_store import session_store
+from routes.idempotency import turn_deduplicator
+from routes.world_bootstrap import world_bootstrap
+from routes.turn_jobs import turn_jobs
+from routes.admission import admission
+from routes.world_bible import world_bibles
+
+
+def require_admin(x_admin_token: Optional[str] = Header(default=None)):
+    """Gate admin routes behind ADMIN_TOKEN; without one configured they do not exist."""
+    expected = os.getenv("ADMIN_TOKEN")
+    if not expected:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if x_admin_token != expected:
+        raise HTTPException(status_code=403, detail="Admin token required.")
+
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+
+@router.get("/debug/captures")
+async def get_debug_captures(limit: Optional[int] = None, session_id: Optional[str] = None):
+    """
+    Recent sampled model outputs and parsed turns, newest first
+    """
+    return {
+        "status": "success",
+        "stats": debug_capture.stats(),
+        "captures": debug_capture.entries(limit=limit, session_id=session_id),
+    }
+
+
+@router.post("/debug/captures/flush")
+async def flush_debug_captures():
+    """
+    Write the capture buffer to DEBUG_CAPTURE_PATH
+    """
+    result = await debug_capture.flush()
+    return {"status": "flushed", **result}
+
+
+@router.delete("/debug/captures")
+async def clear_debug_captures():
+    """
+    Drop all buffered captures
+    """
+    return {"status": "cleared", "count": debug_capture.clear()}
+
+
+@router.post("/prompt-cache/refresh")
+async def refresh_prompt_cache():
+    """
+    Create missing prompt caches and extend the TTL of expiring ones
+    """
+    return {"status": "refreshed", **(await prompt_cache.refresh())}
+
+
+@router.get("/usage")
+async def get_usage(top: int = 10):
+    """
+    Token, latency and cost totals per agent since startup, and the costliest sessions
+    """
+    return {"status": "success", **usage_ledger.stats(), **usage_ledger.aggregate(top=top)}
+
+
+@router.get("/usage/{session_id}")
+async def get_session_usage(session_id: str):
+    """
+    One session's totals, per-agent totals and per-turn breakdown
+    """
+    return {"status": "success", **usage_ledger.session_usage(agent_registry.memory, session_id)}
+
+
+@router.get("/metrics")
+async def get_metrics():
+    """
+    Turn outcomes, per-provider latency/error stats and per-tier model usage
+    """
+    return {
+        "turns": turn_counters,
+        "registry": agent_registry.status(),
+        "llm_calls": call_scheduler.stats(),
+        "model_tiers": model_router.stats(),
+        "prompt_cache": prompt_cache.stats(),
+        "rate_limits": rate_limiter.stats(),
+        "http_pool": http_pool.stats(),
+        "planner": planner_stats,
+        "usage": usage_ledger.stats(),
+        "session_cache": session_cache.stats(),
+        "world_bible": world_bibles.stats(),
+        "lore": lore_store.stats(),
+        "rolling_summary": rolling_summary.stats(),
+        "scene_patches": scene_versions.stats(),
+        "session_store": session_store.stats(),
+        "idempotency": turn_deduplicator.stats(),
+        "world_bootstrap": world_bootstrap.stats(),
+        "turn_jobs": turn_jobs.stats(),
+        "admission": admission.stats(),
+        "compression": {"brotli_available": BROTLI_AVAILABLE, "apps": compression_stats},
+        "debug_capture": debug_capture.stats(),
+        "cassette": cassette.stats(),
+    }
@@ -0,0 +1,107 @@
+# admission.py
+"""
+Admission control for /game/interact.
+
+When providers slow down, every turn still waited for the full orchestrator.
+Turns piled up until all of them timed out. Each turn is now admitted at one
+of three levels. The signals are the number of turns in flight in this
+worker (plus queued turn jobs) and the orchestrator providers' measured p95
+latency (the fastest provider's, since the scheduler hedges to it).
+
+  full  below the soft limits: the normal plan
+  lite  past ADMISSION_SOFT_IN_FLIGHT or ADMISSION_SOFT_LATENCY_SECONDS: the
+        lite plan (narration and choices only, the rest of the previous
+        scene carried forward)
+  shed  past ADMISSION_HARD_IN_FLIGHT or ADMISSION_HARD_LATENCY_SECONDS:
+        answered at once with a fallback scene, 503 and Retry-After, without
+        calling a provider
+
+Latency samples only come from admitted turns. So while latency alone is
+past the hard limit, one turn at a time is still admitted (as lite) to
+measure whether the providers have recovered.
+"""
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+import os
+
+from agents.agents import call_scheduler
+
+FULL, LITE, SHED = "full", "lite", "shed"
+
+
+class AdmissionController:
+    def __init__(self, latency: Callable[[], Optional[float]] = lambda: None,
+                 soft_in_flight: int = 8, hard_in_flight: int = 32,
+                 soft_latency_seconds: float = 20.0, hard_latency_seconds: float = 60.0,
+                 retry_after_seconds: int = 10, enabled: bool = True):
+        self.latency = latency
+        self.soft_in_flight = soft_in_flight
+        self.hard_in_flight = hard_in_flight
+        self.soft_latency_seconds = soft_latency_seconds
+        self.hard_latency_seconds = hard_latency_seconds
+        self.retry_after_seconds = retry_after_seconds
+        self.enabled = enabled
+        self.in_flight = 0
+        self._stats = {FULL: 0, LITE: 0, SHED: 0, "peak_in_flight": 0}
+
+    @classmethod
+    def from_env(cls, latency: Callable[[], Optional[float]] = lambda: None) -> "AdmissionController":
+        return cls(
+            latency=latency,
+            soft_in_flight=int(os.getenv("ADMISSION_SOFT_IN_FLIGHT", "8")),
+            hard_in_flight=int(os.getenv("ADMISSION_HARD_IN_FLIGHT", "32")),
+            soft_latency_seconds=float(os.getenv("ADMISSION_SOFT_LATENCY_SECONDS", "20")),
+            hard_latency_seconds=float(os.getenv("ADMISSION_HARD_LATENCY_SECONDS", "60")),
+            retry_after_seconds=int(os.getenv("ADMISSION_RETRY_AFTER_SECONDS", "10")),
+            enabled=os.getenv("ADMISSION_ENABLED", "true").lower() == "true",
+        )
+
+    def level(self, queued: int = 0) -> str:
+        """Admission level for a new turn; `queued` is load waiting outside this controller (turn jobs)"""
+        if not self.enabled:
+            return FULL
+        load = self.in_flight + queued
+        latency = self.latency()
+        if load >= self.hard_in_flight:
+            return SHED
+        if latency is not None and latency >= self.hard_latency_seconds:
+            return SHED if load else LITE
+        if load >= self.soft_in_flight or (latency is not None and latency >= self.soft_latency_seconds):
+            return LITE
+        return FULL
+
+    def record(self, level: str) -> None:
+        self._stats[level] += 1
+
+    @contextmanager
+    def track(self) -> Iterator[None]:
+        """Count a turn as in flight for the block"""
+        self.in_flight += 1
+        self._stats["peak_in_flight"] = max(self._stats["peak_in_flight"], self.in_flight)
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        latency = self.latency()
+        return {
+            "enabled": self.enabled,
+            "in_flight": self.in_flight,
+            "provider_p95_seconds": round(latency, 3) if latency is not None else None,
+            "soft_in_flight": self.soft_in_flight,
+            "hard_in_flight": self.hard_in_flight,
+            "soft_latency_seconds": self.soft_latency_seconds,
+            "hard_latency_seconds": self.hard_latency_seconds,
+            **self._stats,
+        }
+
+
+def provider_latency() -> Optional[float]:
+    """p95 orchestrator latency of the fastest provider with enough samples"""
+    latencies = [tracker.percentile(95) for tracker in call_scheduler.trackers.values()]
+    latencies = [latency for latency in latencies if latency is not None]
+    return min(latencies) if latencies else None
+
+
+admission = AdmissionController.from_env(latency=provider_latency)
@@ -0,0 +1,147 @@
+# compression.py
+"""
+Negotiated response compression.
+
+/game/init load and /game/memory/{session_id} return every stored snapshot
+blob, tens to hundreds of KB of repetitive JSON. This ASGI middleware
+compresses JSON and text bodies at or above COMPRESSION_MIN_BYTES. It uses
+brotli when the client accepts it and the optional `brotli` package is
+installed, and gzip otherwise. Bodies at or above COMPRESSION_OFFLOAD_BYTES
+are compressed in a worker thread so a large load does not stall the event
+loop. Small bodies, streamed bodies, bodies that are already encoded, and
+304s pass through untouched.
+"""
+from importlib.util import find_spec
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import gzip
+import os
+
+BROTLI_AVAILABLE = find_spec("brotli") is not None
+
+COMPRESSIBLE_TYPES = ("application/json", "application/json-patch+json", "text/")
+
+# Per-middleware counters for /admin/metrics (one entry per app the middleware wraps)
+compression_stats: List[Dict[str, int]] = []
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    """Accept-Encoding as {coding: q}; codings with q=0 are refused"""
+    codings = {}
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        codings[name.strip().lower()] = q
+    return codings
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4,
+                 enabled: bool = True, offload_size: int = 65536):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.offload_size = offload_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.enabled = enabled
+        self.stats = {"compressed": 0, "gzip": 0, "br": 0, "skipped_small": 0, "offloaded": 0,
+                      "bytes_in": 0, "bytes_out": 0}
+        compression_stats.append(self.stats)
+
+    @staticmethod
+    def env_settings() -> Dict[str, Any]:
+        """Keyword arguments for app.add_middleware, which builds the middleware itself"""
+        return {
+            "minimum_size": int(os.getenv("COMPRESSION_MIN_BYTES", "1024")),
+            "gzip_level": int(os.getenv("COMPRESSION_GZIP_LEVEL", "6")),
+            "brotli_quality": int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4")),
+            "enabled": os.getenv("COMPRESSION_ENABLED", "true").lower() == "true",
+            "offload_size": int(os.getenv("COMPRESSION_OFFLOAD_BYTES", "65536")),
+        }
+
+    def choose(self, accept_encoding: str) -> Optional[str]:
+        codings = parse_accept_encoding(accept_encoding)
+        wildcard = codings.get("*", 0.0)
+        candidates = (["br"] if BROTLI_AVAILABLE else []) + ["gzip"]
+        best, best_q = None, 0.0
+        for coding in candidates:
+            q = codings.get(coding, wildcard)
+            if q > best_q:
+                best, best_q = coding, q
+        return best
+
+    def compress(self, coding: str, body: bytes) -> bytes:
+        if coding == "br":
+            import brotli
+
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.enabled:
+            await self.app(scope, receive, send)
+            return
+        accept = ""
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept = value.decode("latin-1")
+                break
+        coding = self.choose(accept) if accept else None
+        if coding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[dict] = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start, passthrough
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+            body = message.get("body", b"")
+            headers: List[Tuple[bytes, bytes]] = list(start["headers"])
+            names = {name.lower(): value for name, value in headers}
+            content_type = names.get(b"content-type", b"").decode("latin-1")
+            if (message.get("more_body", False) or start["status"] in (204, 304) or b"content-encoding" in names
+                    or not content_type.startswith(COMPRESSIBLE_TYPES) or len(body) < self.minimum_size):
+                # Streamed, empty, already encoded, not JSON/text or too small: leave it alone
+                if len(body) < self.minimum_size:
+                    self.stats["skipped_small"] += 1
+                passthrough = True
+                await send(start)
+                await send(message)
+                return
+            if len(body) >= self.offload_size:
+                # zlib and brotli release the GIL, so other requests keep running meanwhile
+                self.stats["offloaded"] += 1
+                compressed = await asyncio.to_thread(self.compress, coding, body)
+            else:
+                compressed = self.compress(coding, body)
+            self.stats["compressed"] += 1
+            self.stats[coding] += 1
+            self.stats["bytes_in"] += len(body)
+            self.stats["bytes_out"] += len(compressed)
+            headers = [(name, value) for name, value in headers if name.lower() != b"content-length"]
+            headers += [(b"content-encoding", coding.encode()), (b"content-length", str(len(compressed)).encode())]
+            vary = names.get(b"vary")
+            if vary is None:
+                headers.append((b"vary", b"Accept-Encoding"))
+            elif b"accept-encoding" not in vary.lower():
+                headers = [(name, value + b", Accept-Encoding" if name.lower() == b"vary" else value)
+                           for name, value in headers]
+            await send({**start, "headers": headers})
+            await send({**message, "body": compressed})
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,104 @@
+# debug_capture.py
+"""
+Sampled in-memory capture of raw model output and parsed turns.
+
+Replaces rewriting debug_output.json on every request: turns are sampled into
+a bounded ring buffer (failures are always kept), read back through the admin
+router and written to disk only when someone asks for a flush.
+"""
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional
+import asyncio
+import logging
+import os
+import random
+
+from models.serialization import dumps
+
+logger = logging.getLogger(__name__)
+
+
+class DebugCapture:
+    def __init__(self, sample_rate: float = 0.1, max_entries: int = 50, max_chars: int = 20000,
+                 path: str = "debug_output.json"):
+        self.sample_rate = max(0.0, min(1.0, sample_rate))
+        self.max_chars = max_chars
+        self.path = path
+        self._buffer: Deque[Dict[str, Any]] = deque(maxlen=max(1, max_entries))
+        self._seen = 0
+        self._captured = 0
+        self._flush_lock = asyncio.Lock()
+
+    @classmethod
+    def from_env(cls) -> "DebugCapture":
+        return cls(
+            sample_rate=float(os.getenv("DEBUG_CAPTURE_SAMPLE_RATE", "0.1")),
+            max_entries=int(os.getenv("DEBUG_CAPTURE_SIZE", "50")),
+            max_chars=int(os.getenv("DEBUG_CAPTURE_MAX_CHARS", "20000")),
+            path=os.getenv("DEBUG_CAPTURE_PATH", "debug_output.json"),
+        )
+
+    def _truncate(self, text: Optional[str]) -> Optional[str]:
+        if text is None or len(text) <= self.max_chars:
+            return text
+        return text[:self.max_chars] + f"... [truncated {len(text) - self.max_chars} chars]"
+
+    def record(self, session_id: str, raw_output: Optional[str], parsed: Optional[Dict[str, Any]] = None,
+               error: Optional[str] = None, force: bool = False, **extra: Any) -> bool:
+        """Capture one turn if it is sampled. Turns with an error (or force=True) are always captured."""
+        self._seen += 1
+        if not force and error is None and random.random() >= self.sample_rate:
+            return False
+
+        self._buffer.append({
+            "captured_at": datetime.now().isoformat(),
+            "session_id": session_id,
+            "raw_output": self._truncate(raw_output),
+            "parsed": parsed,
+            "error": error,
+            **extra,
+        })
+        self._captured += 1
+        return True
+
+    def entries(self, limit: Optional[int] = None, session_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Most recent captures first."""
+        items = [e for e in reversed(self._buffer) if session_id is None or e["session_id"] == session_id]
+        return items[:limit] if limit else items
+
+    def clear(self) -> int:
+        count = len(self._buffer)
+        self._buffer.clear()
+        return count
+
+    async def flush(self, path: Optional[str] = None) -> Dict[str, Any]:
+        """Write the current buffer to disk off the event loop."""
+        path = path or self.path
+        snapshot = list(self._buffer)
+        payload = dumps(snapshot, indent=True)
+
+        async with self._flush_lock:
+            await asyncio.to_thread(_atomic_write, path, payload)
+
+        logger.info(f"Flushed {len(snapshot)} debug captures to {path}")
+        return {"path": path, "count": len(snapshot), "bytes": len(payload)}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "sample_rate": self.sample_rate,
+            "max_entries": self._buffer.maxlen,
+            "buffered": len(self._buffer),
+            "turns_seen": self._seen,
+            "turns_captured": self._captured,
+        }
+
+
+def _atomic_write(path: str, payload: bytes) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(payload)
+    os.replace(tmp_path, path)
+
+
+debug_capture = DebugCapture.from_env()
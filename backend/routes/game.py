@@ -1,34 +1,65 @@
 # routes.py
-from fastapi import APIRouter, HTTPException, Request
-from agents.agents import process_game_turn, memory
-from models.schemas import SceneResponse, AgentInput, UserInteraction, GameState, EnvironmentalConditions, ResourceAvailability, InventoryChanges, WorldInfo, CurrentSceneContext, GameProgressContext, LoreEntry, QuestObjective, Character, DialogueLine, InteractiveElement, EnvironmentalDiscovery, ThreatUpdate, AmbientEvent # Import all necessary Pydantic models
-from agents.data_validate_game import parse_json_block, validate_and_fix_response
+from fastapi import APIRouter, Header, HTTPException, Request
+from fastapi.responses import Response
+from agents.agents import process_game_turn, TurnFailed, regenerate_scene_field, agent_registry, usage_ledger, cassette, rolling_summary
+from agents.usage import BUDGET_OK
+from models.schemas import SceneResponse, AgentInput, UserInteraction, GameState, EnvironmentalConditions, ResourceAvailability, InventoryChanges, WorldInfo, WorldBible, WorldInfoDelta, CurrentSceneContext, GameProgressContext, LoreEntry, QuestObjective, Character, DialogueLine, InteractiveElement, EnvironmentalDiscovery, ThreatUpdate, AmbientEvent # Import all necessary Pydantic models
+from agents.data_validate_game import validate_and_fix_response
+from agents.salvage import salvage_scene_fields, parse_regenerated_field
+from agents.planner import plan_turn, TurnPlan
 from routes.memory_service import (
     add_game_memory, 
     get_user_memories, 
     clear_user_memories, 
-    get_memory_summary
+    get_memory_summary,
+    get_latest_game_state,
+    has_user_memories,
+    get_session_validator
 )
+from models.serialization import FastJSONResponse
+from routes.debug_capture import debug_capture
+from routes.world_bible import world_bibles, compact_world_bible
+from routes.lore_store import lore_store, compact_lore, LoreIndex
+from routes.scene_versions import scene_versions
+from routes.session_cache import session_cache
+from routes.session_store import session_store, SessionBusy
+from routes.idempotency import turn_deduplicator, IdempotencyConflict
+from routes.world_bootstrap import world_bootstrap
+from routes.turn_jobs import turn_jobs, QueueFull
+from routes.admission import admission, FULL, LITE, SHED
+import asyncio
 import logging
-import json
+from typing import Optional
 from datetime import datetime
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-def create_memory_data(input_data: AgentInput, scene_response: SceneResponse) -> dict:
-    """Create memory data dictionary from input and scene response"""
+def create_memory_data(input_data: AgentInput, scene_response: SceneResponse, scene_data: dict = None,
+                       world_bible_version: int = None, lore_entry_count: int = None,
+                       turn_usage: dict = None, evicted: list = None) -> dict:
+    """Create memory data dictionary from input and scene response.
+
+    `scene_data` is the already dumped scene_response; pass it in so each
+    submodel is dumped once per turn and shared with the HTTP response.
+    world_info and the lore collection are not stored here; they live in the
+    session's world bible and lore store. Growing lists are kept to their
+    rolling_summary windows; history and story beats that fall out are
+    appended to `evicted` for the session's rolling summary.
+    """
+    if evicted is None:
+        evicted = []
+    if scene_data is None:
+        scene_data = scene_response.model_dump()
     
     # Calculate updated inventory
-    updated_inventory = [item.model_dump() for item in scene_response.current_inventory]
+    updated_inventory = scene_data["current_inventory"]
     
     # Create history entry
     history_entry = f"[{scene_response.location}] {scene_response.history_entry}"
-    updated_history = (input_data.recent_history if input_data.recent_history else []) + [history_entry]
-    
-    # Keep only last 20 entries to prevent memory bloat
-    if len(updated_history) > 20:
-        updated_history = updated_history[-20:]
+    updated_history, dropped = rolling_summary.window(
+        "history", (input_data.recent_history if input_data.recent_history else []) + [history_entry])
+    evicted.extend(dropped)
     
     # Use play_time_minutes and scenes_completed directly from input_data.game_progress
     play_time_minutes = input_data.game_progress.play_time_minutes
@@ -41,18 +72,22 @@ def create_memory_data(input_data: AgentInput, scene_response: SceneResponse) ->
     discovered_locations = list(set(existing_discovered_locations + [scene_response.location]))
     met_characters = list(set(existing_met_characters + [char.id for char in scene_response.characters]))
     
-    # Player choices history
-    player_choices_history = input_data.game_progress.player_preferences.get('player_choices_history', []) + [{
+    # Player choices history (the history entries already tell the story, so dropped choices are not summarized)
+    player_choices_history, _ = rolling_summary.window("player_choices_history", input_data.game_progress.player_preferences.get('player_choices_history', []) + [{
         "scene_tag": scene_response.scene_tag,
         "location": scene_response.location,
         "choice": input_data.player_choice,
         "interaction_type": input_data.user_interaction.interaction_type,
         "timestamp": datetime.now().isoformat()
-    }]
+    }])
+
+    major_story_beats, dropped = rolling_summary.window("major_story_beats", input_data.game_progress.major_story_beats)
+    evicted.extend(f"Story beat: {beat}" for beat in dropped)
+
+    # Ordered de-duplication so the window keeps the newest secrets (revealed_secrets is summarized already)
+    discovered_secrets, _ = rolling_summary.window(
+        "discovered_secrets", list(dict.fromkeys(input_data.game_state.revealed_secrets + scene_response.new_secrets)))
 
-    # Lore collection
-    lore_collection = input_data.current_scene.discovered_lore + scene_response.discovered_lore
-    
     memory_data = {
         "session_id": input_data.session_id,
         "last_updated": datetime.now().isoformat(),
@@ -60,24 +95,23 @@ def create_memory_data(input_data: AgentInput, scene_response: SceneResponse) ->
         "location": scene_response.location,
         "world": scene_response.world,
         "inventory": updated_inventory,
-        "game_state": scene_response.game_state.model_dump(),
+        "game_state": scene_data["game_state"],
         "history": updated_history,
 
         "current_scene": {
             "narration_text": scene_response.narration_text,
-            "dialogue": [dialogue.model_dump() for dialogue in scene_response.dialogue],
-            "characters": [char.model_dump() for char in scene_response.characters],
+            "dialogue": scene_data["dialogue"],
+            "characters": scene_data["characters"],
             "options": scene_response.options,
             "mood_atmosphere": scene_response.mood_atmosphere,
             "relationship_changes": scene_response.relationship_changes,
             "new_secrets": scene_response.new_secrets,
-            "interactive_elements": [element.model_dump() for element in scene_response.interactive_elements],
-            "environmental_discoveries": [discovery.model_dump() for discovery in scene_response.environmental_discoveries],
-            "threat_updates": [threat.model_dump() for threat in scene_response.threat_updates],
-            "ambient_events": [event.model_dump() for event in scene_response.ambient_events],
-            "discovered_lore": [lore.model_dump() for lore in scene_response.discovered_lore],
-            "world_info": scene_response.world_info.model_dump(),
-            "location_details": scene_response.location_details.model_dump()  # Convert to dict
+            "interactive_elements": scene_data["interactive_elements"],
+            "environmental_discoveries": scene_data["environmental_discoveries"],
+            "threat_updates": scene_data["threat_updates"],
+            "ambient_events": scene_data["ambient_events"],
+            "discovered_lore": scene_data["discovered_lore"],
+            "location_details": scene_data["location_details"]
         },
 
         "play_time_minutes": play_time_minutes,
@@ -87,14 +121,14 @@ def create_memory_data(input_data: AgentInput, scene_response: SceneResponse) ->
         "met_characters": met_characters,
         "unlocked_features": input_data.game_progress.player_preferences.get('unlocked_features', []),
         
-        "major_story_beats": input_data.game_progress.major_story_beats,
+        "major_story_beats": major_story_beats,
         "active_side_quests": input_data.game_progress.player_preferences.get('active_side_quests', []),
         "player_choices_history": player_choices_history,
         
         "world_knowledge": input_data.game_progress.world_knowledge,
         "faction_standings": input_data.game_progress.faction_standings,
         
-        "discovered_secrets": list(set(input_data.game_state.revealed_secrets + scene_response.new_secrets)),
+        "discovered_secrets": discovered_secrets,
         "triggered_events": input_data.game_progress.player_preferences.get('triggered_events', []),
         
         "player_preferences": input_data.game_progress.player_preferences,
@@ -108,8 +142,9 @@ def create_memory_data(input_data: AgentInput, scene_response: SceneResponse) ->
             "tension_level": input_data.game_progress.tension_level,
             "story_escalation_level": input_data.game_progress.story_escalation_level
         },
-        "lore_collection": [lore.model_dump() for lore in lore_collection],
-        "world_info": scene_response.world_info.model_dump()
+        "lore_entry_count": lore_entry_count,
+        "turn_usage": turn_usage,
+        "world_bible_version": world_bible_version
     }
     
     return memory_data
@@ -135,17 +170,43 @@ def _get_interaction_specific_context(user_interaction: UserInteraction) -> str:
     
     return base_context
 
-def create_game_context(input_data: AgentInput) -> str:
+def _world_context(input_data: AgentInput, bible: WorldBible = None) -> str:
+    """World section of the game context: the compact bible once it exists"""
+    if bible is None:
+        world_info = input_data.current_scene.world_info
+        return f"World Information: {world_info.description} (Theme: {world_info.theme})"
+    return f"""WORLD BIBLE (server-owned, version {bible.version}):
+{compact_world_bible(bible)}
+World Rules: Do NOT return world_info; the server fills it from the world bible. Only when this scene changes the world (a new key location, faction or threat, one destroyed or defeated, a cultural or historical development), return world_info_delta with just the changes; otherwise omit it."""
+
+def _lore_context(input_data: AgentInput, lore: LoreIndex = None) -> str:
+    """Top-k lore for this interaction instead of every discovered entry"""
+    current_scene = input_data.current_scene
+    if lore is None:
+        return f"Discovered Lore: {[lore.title for lore in current_scene.discovered_lore]}"
+    query = [
+        input_data.user_interaction.choice_text,
+        input_data.user_interaction.element_id or "",
+        input_data.current_location,
+        *[char.name for char in current_scene.characters],
+        *[threat.threat_name for threat in current_scene.threat_updates],
+    ]
+    entries = lore.top_k(lore_store.top_k, query, [entry.id for entry in current_scene.discovered_lore])
+    return f"Relevant Lore: {compact_lore(lore, entries)}"
+
+def create_game_context(input_data: AgentInput, bible: WorldBible = None, lore: LoreIndex = None) -> str:
     """Create comprehensive game context string from enhanced AgentInput"""
     
     # Extract game state info safely
     game_state = input_data.game_state
     scenes_completed = input_data.game_progress.scenes_completed  # Fixed: use game_progress
     relationships = game_state.relationships
-    revealed_secrets = game_state.revealed_secrets
-    major_events = game_state.major_events
+    # Only the newest entries of each list; older ones are in the story so far
+    revealed_secrets = rolling_summary.recent(game_state.revealed_secrets)
+    major_events = rolling_summary.recent(game_state.major_events)
     active_objectives = game_state.active_objectives
-    completed_objectives = game_state.completed_objectives
+    completed_objectives = rolling_summary.recent(game_state.completed_objectives)
+    story_so_far = rolling_summary.summary(input_data.session_id)
     story_flags = game_state.story_flags
     reputation = game_state.reputation
     
@@ -192,8 +253,8 @@ Present Characters: {input_data.present_characters}
 Scene Characters: {scene_characters}
 Interactive Elements: {scene_interactive_elements}
 Active Threats: {scene_threats}
-Discovered Lore: {[lore.title for lore in current_scene.discovered_lore]}
-World Information: {current_scene.world_info.description} (Theme: {current_scene.world_info.theme})
+{_lore_context(input_data, lore)}
+{_world_context(input_data, bible)}
 Location Details: Exits: {current_scene.location_details.exits}, Safety: {current_scene.location_details.safety_level}/10
 
 PLAYER STATE:
@@ -216,13 +277,16 @@ STORY PROGRESSION:
 - Play Time: {game_progress.play_time_minutes} minutes
 - Story Escalation Level: {escalation_level}/10
 - Tension Level: {tension_level}/10
-- Major Story Beats: {game_progress.major_story_beats}
+- Major Story Beats: {rolling_summary.recent(game_progress.major_story_beats)}
 - Active Themes: {game_progress.active_themes}
 - World Knowledge: {game_progress.world_knowledge}
 - Faction Standings: {game_progress.faction_standings}
 - Player Preferences: {game_progress.player_preferences}
 - Preferred Interaction Types: {game_progress.preferred_interaction_types}
 
+STORY SO FAR:
+{story_so_far or "Nothing beyond the recent history yet"}
+
 RECENT HISTORY CONTEXT:
 {chr(10).join(input_data.recent_history) if input_data.recent_history else "This is the beginning of the adventure"}
 
@@ -260,14 +324,211 @@ Please coordinate your specialist agents to create a rich, interactive scene tha
     
     return game_context
 
+async def salvage_scene_response(input: AgentInput, raw_result_str: str, game_context: str,
+                                 plan: TurnPlan = None, server_fields: dict = None) -> tuple:
+    """
+    Build a valid scene dict from model output without discarding the whole turn.
+
+    Fields the turn plan skipped are carried forward from the previous scene,
+    and `server_fields` (world_info from the world bible) always win.
+    Well-formed top-level fields are kept as-is. Broken fields are regenerated
+    by their owning specialist when one exists, otherwise carried forward too.
+    Returns (result_dict, salvaged_fields) where salvaged_fields maps each
+    repaired field to how it was filled. Output with no valid field at all
+    is not a turn: that raises TurnFailed.
+    """
+    try:
+        result_dict, broken_fields = salvage_scene_fields(raw_result_str)
+    except ValueError as e:
+        raise TurnFailed(f"Nothing to salvage in the model output: {e}") from e
+    if not result_dict:
+        raise TurnFailed("No field in the model output was valid")
+
+    carried = create_carry_forward_response(input)
+    planned_carry = plan.carried_fields if plan else []
+    for field in planned_carry:
+        result_dict[field] = carried[field]
+    server_fields = server_fields or {}
+    result_dict.update(server_fields)
+    broken_fields = [field for field in broken_fields if field not in planned_carry and field not in server_fields]
+
+    salvaged_fields = {}
+    if not broken_fields:
+        return result_dict, salvaged_fields
+
+    logger.warning(f"Salvaging fields {broken_fields} for session {input.session_id}")
+
+    regenerated = await asyncio.gather(*[
+        regenerate_scene_field(field, game_context, result_dict, session_id=input.session_id) for field in broken_fields
+    ])
+
+    for field, raw_field in zip(broken_fields, regenerated):
+        value = parse_regenerated_field(field, raw_field) if raw_field else None
+        if value is not None:
+            result_dict[field] = value
+            salvaged_fields[field] = "regenerated"
+        elif field == "history_entry" and len(result_dict.get("narration_text", "")) >= 50:
+            result_dict[field] = result_dict["narration_text"][:300]
+            salvaged_fields[field] = "derived"
+        else:
+            result_dict[field] = carried[field]
+            salvaged_fields[field] = "carried_forward"
+
+    return result_dict, salvaged_fields
+
+
 @router.post("/interact", response_model=SceneResponse)
-async def interact(input: AgentInput):
+async def interact(input: AgentInput, x_scene_base_version: Optional[str] = Header(default=None),
+                   idempotency_key: Optional[str] = Header(default=None), prefer: Optional[str] = Header(default=None)):
     """
-    Main interaction endpoint for the RPG system
+    Main interaction endpoint for the RPG system.
+
+    Clients that send X-Scene-Base-Version (the X-Scene-Version of the last
+    scene they applied) get a JSON Patch against it when possible.
+
+    A repeat of a turn that is still running (double-click, client retry)
+    waits for it and gets the same scene. Clients that send an
+    Idempotency-Key also get the stored scene back after the turn completes.
+    Either way the repeat is marked with Idempotent-Replayed: true.
+
+    With `Prefer: respond-async` the turn is queued as a job: the answer is
+    202 with the job id, and the scene is collected from /game/jobs/{job_id}.
+    """
+    if admission.level(queued=turn_jobs.queue_depth) == SHED:
+        admission.record(SHED)
+        logger.warning(f"Shedding turn for session {input.session_id}: {admission.in_flight} turns in flight")
+        return overload_response(input)
+    if prefer and "respond-async" in prefer.lower():
+        try:
+            job = turn_jobs.submit(input.session_id, lambda: admitted_turn(input, idempotency_key))
+        except QueueFull as e:
+            raise HTTPException(status_code=503, detail=f"Too many queued turns: {e}", headers={"Retry-After": "5"})
+        logger.info(f"Queued turn job {job.job_id} for session {input.session_id}")
+        return job_response(job, status_code=202, headers={"Preference-Applied": "respond-async"})
+    scene_data, replayed = await admitted_turn(input, idempotency_key)
+    return scene_turn_response(input.session_id, scene_data, replayed, x_scene_base_version)
+
+
+@router.get("/jobs/{job_id}")
+async def get_turn_job(job_id: str, wait: float = 0, x_scene_base_version: Optional[str] = Header(default=None)):
+    """
+    A queued turn: 202 with its status while it waits or runs, the scene
+    (as /interact would return it) once done, or the turn's error status.
+    `wait` holds the request open for up to that many seconds (capped by
+    JOB_MAX_WAIT_SECONDS) until the job finishes.
     """
+    job = turn_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job.")
+    job = await turn_jobs.wait(job, wait)
+    if job.status == "failed":
+        raise HTTPException(status_code=job.error_status, detail=job.error_detail)
+    if job.status != "done":
+        return job_response(job, status_code=202, headers={"Retry-After": "1"})
+    scene_data, replayed = job.result
+    response = scene_turn_response(job.session_id, scene_data, replayed, x_scene_base_version)
+    response.headers["X-Job-Id"] = job.job_id
+    return response
+
+
+async def admitted_turn(input: AgentInput, idempotency_key: Optional[str]) -> tuple:
+    # Counted from admission, so a burst cannot slip past the limits while it waits for session locks
+    with admission.track():
+        return await play_turn(input, idempotency_key)
+
+
+async def play_turn(input: AgentInput, idempotency_key: Optional[str]) -> tuple:
+    """The turn's (scene_data, replayed), run once per idempotency key and one at a time per session"""
+    fingerprint = turn_deduplicator.fingerprint(input.game_progress.scenes_completed,
+                                                input.user_interaction.interaction_type, input.player_choice)
+    try:
+        return await turn_deduplicator.run(input.session_id, idempotency_key, fingerprint,
+                                           lambda: locked_turn(input, idempotency_key, fingerprint))
+    except IdempotencyConflict as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except SessionBusy as e:
+        raise HTTPException(status_code=409, detail=f"Another turn is still running: {e}")
+
+
+def scene_turn_response(session_id: str, scene_data: dict, replayed: bool, base_version: Optional[str]) -> Response:
+    response = scene_version_response(session_id, scene_data, base_version)
+    if replayed:
+        logger.info(f"Replayed turn for session {session_id}")
+        response.headers["Idempotent-Replayed"] = "true"
+    return response
+
+
+def job_response(job, status_code: int, headers: dict) -> FastJSONResponse:
+    status_url = f"/game/jobs/{job.job_id}"
+    return FastJSONResponse({
+        "job_id": job.job_id,
+        "status": job.status,
+        "queue_position": turn_jobs.position(job),
+        "status_url": status_url,
+    }, status_code=status_code, headers={"Location": status_url, **headers})
+
+
+async def locked_turn(input: AgentInput, idempotency_key: Optional[str], fingerprint: str):
+    """(scene_data, completed, recalled) for the turn: one per session at a time, across every worker sharing the session store"""
+    async with session_store.lock(input.session_id) as lease:
+        if lease.changed:
+            forget_session(input.session_id)
+            # Another worker may have played this very turn already (a retry or resubmitted job routed elsewhere)
+            scene_data = turn_deduplicator.recall(agent_registry.memory, input.session_id, idempotency_key, fingerprint)
+            if scene_data is not None:
+                return scene_data, True, True
+        # Admitted already; past the soft limits the turn runs the lite plan
+        level = LITE if admission.level(queued=turn_jobs.queue_depth) != FULL else FULL
+        admission.record(level)
+        try:
+            scene_data, completed = await run_turn(input, lite_load=level == LITE)
+            if completed:
+                turn_deduplicator.remember(agent_registry.memory, input.session_id, idempotency_key, fingerprint,
+                                           scene_data)
+            return scene_data, completed, False
+        finally:
+            await session_store.written(lease)
+
+
+def overload_response(input: AgentInput) -> Response:
+    """A quick stand-in scene (nothing stored, no provider call) while the server sheds load"""
+    scene = create_fallback_response(input)
+    scene.update({
+        "scene_tag": f"overloaded_{input.session_id}",
+        "narration_text": "The world holds its breath for a moment, as if waiting for something. Nothing has changed yet; try your choice again shortly.",
+        "options": [input.player_choice, "Look around carefully", "Take a moment to think"],
+        "mood_atmosphere": input.current_scene.mood_atmosphere or "uncertain",
+        "history_entry": "The server was too busy to play this turn; nothing in the story has changed yet.",
+        "characters": [character.model_dump() for character in input.current_scene.characters],
+        "game_state": input.game_state.model_dump(),
+        "world_info": input.current_scene.world_info.model_dump(),
+        "location_details": input.current_scene.location_details.model_dump(),
+    })
+    body = SceneResponse(**scene).model_dump()
+    return FastJSONResponse(body, status_code=503,
+                            headers={"Retry-After": str(admission.retry_after_seconds), "X-Load-Shed": "true"})
+
+
+async def run_turn(input: AgentInput, lite_load: bool = False):
+    """Play one turn; returns (scene_data, completed), where completed is False for a fallback scene"""
+    raw_result_str = None
+    await cassette.record_request(input.session_id, input.model_dump())
     try: 
+        # Sessions running out of budget get the lite plan (and, once it is spent, the lightest tier)
+        budget = usage_ledger.begin_turn(agent_registry.memory, input.session_id, input.game_progress.scenes_completed)
+        
+        # The world comes from the session's bible once the opening scene has created it
+        bible = load_world_bible(input)
+        opening = bible is None
+        
+        # Pick the specialists this interaction needs; the rest is carried forward
+        plan = plan_turn(input, force_full=opening, lite=budget != BUDGET_OK or lite_load,
+                         lite_reason="session budget" if budget != BUDGET_OK else "server load")
+        lore = lore_store.add(agent_registry.memory, input.session_id, input.current_scene.discovered_lore,
+                              input.game_progress.scenes_completed - 1)
+        
         # Build comprehensive game context
-        game_context = create_game_context(input)
+        game_context = create_game_context(input, bible, lore) + plan.prompt_section()
         
         logger.info(f"Processing interaction for session {input.session_id}")
         logger.info(f"Player choice: {input.player_choice}")
@@ -276,26 +537,45 @@ async def interact(input: AgentInput):
         print(f"Player choice: {input.player_choice}")
         print(f"Player scenes completed: {input.game_progress.scenes_completed}")  # Fixed
         
-        # Get response from coordinated game agents
-        raw_result_str = await process_game_turn(game_context, input.session_id) # process_game_turn now expects AgentInput and returns str
-        
-        # Parse the JSON string result
-        result_dict = parse_json_block(raw_result_str)
-        
-        # Validate and fix the response
-        result_dict = validate_and_fix_response(result_dict)
+        # Get response from coordinated game agents, then parse, validate and fix it, keeping every well-formed field
+        server_fields = {"world_info": bible.world_info.model_dump()} if bible else None
+
+        async def generate():
+            nonlocal raw_result_str
+            raw_result_str = await process_game_turn(game_context, input.session_id) # process_game_turn now expects AgentInput and returns str
+            return (raw_result_str, *await salvage_scene_response(input, raw_result_str, game_context, plan, server_fields))
+
+        if opening:
+            # Openings for the same world that run at the same time share one generation,
+            # unless its world_info had to be carried forward from the client
+            (raw_result_str, result_dict, salvaged_fields), _ = await world_bootstrap.run(
+                input.current_world, generate, shareable=lambda result: "world_info" not in result[2])
+        else:
+            raw_result_str, result_dict, salvaged_fields = await generate()
+        if opening and "world_info" in salvaged_fields:
+            # A world_info filled in for the model would become the session's world for good
+            raise TurnFailed("Opening scene has no world_info of its own")
+        bible = update_world_bible(input, bible, result_dict)
+        result_dict["world_info"] = bible.world_info.model_dump()
+        evicted = window_game_state(result_dict)
         
-        with open('debug_output.json', 'w') as f:
-            json.dump(result_dict, f, indent=2)
+        debug_capture.record(input.session_id, raw_result_str, parsed=result_dict,
+                             force=bool(salvaged_fields), salvaged_fields=salvaged_fields, plan=plan.to_dict())
         
-        # Create scene response Pydantic model
-        scene_response = SceneResponse(**result_dict)
+        # Create scene response Pydantic model and dump it once for memory + response
+        scene_response = SceneResponse(**result_dict, salvaged_fields=salvaged_fields)
+        scene_data = scene_response.model_dump()
        
         # Prepare memory data
-        memory_data = create_memory_data(input, scene_response)
+        lore = lore_store.add(agent_registry.memory, input.session_id, scene_response.discovered_lore,
+                              input.game_progress.scenes_completed)
+        turn_usage = usage_ledger.end_turn(agent_registry.memory, input.session_id)
+        memory_data = create_memory_data(input, scene_response, scene_data, bible.version, len(lore.entries),
+                                         turn_usage, evicted)
+        rolling_summary.evict(input.session_id, evicted)
         
         # Add memory using the service function
-        memory_success = add_game_memory(memory, input.session_id, memory_data)
+        memory_success = add_game_memory(agent_registry.memory, input.session_id, memory_data)
         
         if memory_success:
             logger.info(f"Successfully added memory for session {input.session_id}")
@@ -303,18 +583,30 @@ async def interact(input: AgentInput):
             logger.warning(f"Failed to add memory for session {input.session_id}")
         
         logger.info(f"Successfully processed interaction for session {input.session_id}")
-        return scene_response
+        return scene_data, True
         
+    except TurnFailed as e:
+        # No usable scene: no bible, lore or snapshot, and a retry with the same key runs the turn again
+        logger.error(f"Turn failed for session {input.session_id}: {e}")
+        debug_capture.record(input.session_id, raw_result_str, error=str(e))
+        return SceneResponse(**create_fallback_response(input)).model_dump(), False
+
     except ValueError as e:
         logger.error(f"JSON parsing error for session {input.session_id}: {e}", exc_info=True)
+        debug_capture.record(input.session_id, raw_result_str, error=str(e))
         raise HTTPException(status_code=500, detail=f"Response parsing error: {str(e)}")
         
     except Exception as e:
         logger.error(f"Unexpected error for session {input.session_id}: {e}", exc_info=True)
+        debug_capture.record(input.session_id, raw_result_str, error=repr(e))
         
         # Return a safe fallback response
         fallback_response_dict = create_fallback_response(input)
-        return SceneResponse(**fallback_response_dict)
+        return SceneResponse(**fallback_response_dict).model_dump(), False
+    
+    finally:
+        # No-op when the turn already closed normally
+        usage_ledger.end_turn(agent_registry.memory, input.session_id)
 
 
 @router.post("/init")
@@ -330,7 +622,7 @@ async def init_game(request: Request):
     
     if action == "new":
         # Clear memories using service function
-        clear_success = clear_user_memories(memory, session_id)
+        clear_success = await clear_session(session_id)
        
         if clear_success:
             print(f"world: {world}")
@@ -340,26 +632,30 @@ async def init_game(request: Request):
             return {"status": "error", "message": "Failed to clear previous game data."}
     
     elif action == "load":
-        # Check if user has memories
-        if not get_user_memories(memory, session_id):
-            return {"status": "no_memory", "message": "No saved game found."}
-        
+        if await session_store.check(session_id):
+            forget_session(session_id)
+
+        # Repeat loads of an unchanged session cost a 304
+        etag = session_etag("load", session_id)
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return not_modified(etag)
+
         # Get user memories using service function
-        user_memories = get_user_memories(memory, session_id)
+        user_memories = get_user_memories(agent_registry.memory, session_id)
         
         if user_memories:
-            # Get the latest memory for scene state
-            # Assuming user_memories is ordered by last_updated descending
-            latest_memory_record = user_memories[0] 
-            latest_memory_data = json.loads(latest_memory_record.to_dict()['memory'])
+            # Get the latest memory for scene state (copied: the parsed snapshot is shared with the session cache)
+            latest_memory_data = dict(get_latest_game_state(agent_registry.memory, session_id))
+            rehydrate_world_info(latest_memory_data, session_id)
+            rehydrate_lore_collection(latest_memory_data, session_id)
            
-            return {
+            return FastJSONResponse({
                 "status": "loaded",
                 "message": "Game loaded from memory.",
                 "memory_summary": [{"memory": m.memory, "last_updated": str(m.last_updated)} for m in user_memories],
                 "scene_state": latest_memory_data.get('world'), # This might need to be more specific to what frontend expects
                 "latest_memory_data": latest_memory_data # Return the full latest memory data
-            }
+            }, headers=etag_headers(etag))
         else:
             return {"status": "no_memory", "message": "No saved game found."}
     
@@ -374,24 +670,30 @@ async def health_check():
 
 
 @router.get("/memory/{session_id}")
-async def get_session_memory(session_id: str):
+async def get_session_memory(session_id: str, request: Request):
     """
     Get memory summary for a specific session
     """
     try:
-        if not get_user_memories(memory, session_id):
+        if await session_store.check(session_id):
+            forget_session(session_id)
+        etag = session_etag("memory", session_id)
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return not_modified(etag)
+        
+        if not get_user_memories(agent_registry.memory, session_id):
             return {"status": "no_memory", "message": "No memories found for this session."}
         
-        memory_summary = get_memory_summary(memory, session_id)[0]
-        user_memories = get_user_memories(memory, session_id)
+        memory_summary = get_memory_summary(agent_registry.memory, session_id)[0]
+        user_memories = get_user_memories(agent_registry.memory, session_id)
         
-        return {
+        return FastJSONResponse({
             "status": "success",
             "session_id": session_id,
             "memory_count": len(user_memories),
             "memory_summary": memory_summary,
             "memories": [{"memory": m.memory, "last_updated": str(m.last_updated)} for m in user_memories]
-        }
+        }, headers=etag_headers(etag))
         
     except Exception as e:
         logger.error(f"Error retrieving memory for session {session_id}: {e}", exc_info=True)
@@ -404,7 +706,7 @@ async def clear_session_memory(session_id: str):
     Clear all memories for a specific session
     """
     try:
-        clear_success = clear_user_memories(memory, session_id)
+        clear_success = await clear_session(session_id)
         
         if clear_success:
             return {"status": "success", "message": f"Cleared all memories for session {session_id}"}
@@ -417,6 +719,152 @@ async def clear_session_memory(session_id: str):
         raise HTTPException(status_code=500, detail="Failed to clear memory.")
 
 
+def forget_session(session_id: str) -> None:
+    """Drop this worker's resident copies of a session another worker has written; they are re-read on demand"""
+    session_cache.invalidate(session_id)
+    world_bibles.forget(session_id)
+    lore_store.forget(session_id)
+    usage_ledger.forget(session_id)
+    rolling_summary.forget(session_id)
+
+
+async def clear_session(session_id: str) -> bool:
+    """Delete everything stored for a session, under its lock"""
+    try:
+        async with session_store.lock(session_id) as lease:
+            clear_success = clear_user_memories(agent_registry.memory, session_id)
+            world_bibles.clear(agent_registry.memory, session_id)
+            lore_store.clear(agent_registry.memory, session_id)
+            usage_ledger.clear(agent_registry.memory, session_id)
+            rolling_summary.clear(agent_registry.memory, session_id)
+            scene_versions.clear(session_id)
+            turn_deduplicator.clear(session_id, agent_registry.memory)
+            turn_jobs.clear(session_id)
+            await session_store.written(lease)
+            return clear_success
+    except SessionBusy as e:
+        logger.error(f"Could not clear session {session_id}: {e}")
+        return False
+
+
+def session_etag(kind: str, session_id: str) -> Optional[str]:
+    """Weak ETag for a session read endpoint (weak: compression changes the bytes, not the content)"""
+    validator = get_session_validator(agent_registry.memory, session_id)
+    return f'W/"{kind}-{validator}"' if validator else None
+
+
+def etag_matches(if_none_match: Optional[str], etag: Optional[str]) -> bool:
+    if not if_none_match or not etag:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison (RFC 9110 13.1.2): W/ prefixes are ignored
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+def etag_headers(etag: Optional[str]) -> dict:
+    # Clients may keep the body but must revalidate before reusing it
+    return {"ETag": etag, "Cache-Control": "private, no-cache"} if etag else {}
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers=etag_headers(etag))
+
+
+def scene_version_response(session_id: str, scene_data: dict, base_version: Optional[str]) -> Response:
+    """The scene as a full body or a JSON Patch against base_version, tagged with its new X-Scene-Version"""
+    body, media_type, version = scene_versions.respond(session_id, scene_data, base_version)
+    return Response(content=body, media_type=media_type, headers={"X-Scene-Version": version})
+
+
+# game_state lists kept to a window, and how entries that fall out read in the rolling summary
+GAME_STATE_WINDOWS = {
+    "major_events": "{}",
+    "revealed_secrets": "Secret revealed: {}",
+    "completed_objectives": "Objective completed: {}",
+    "failed_objectives": "Objective failed: {}",
+}
+
+
+def window_game_state(result_dict: dict) -> list:
+    """Trim the scene's game_state lists to their windows; returns the dropped entries as summary lines"""
+    game_state = result_dict.get("game_state")
+    evicted = []
+    if not isinstance(game_state, dict):
+        return evicted
+    for name, line in GAME_STATE_WINDOWS.items():
+        if isinstance(game_state.get(name), list):
+            game_state[name], dropped = rolling_summary.window(name, game_state[name])
+            evicted.extend(line.format(entry) for entry in dropped)
+    return evicted
+
+
+def load_world_bible(input: AgentInput) -> WorldBible:
+    """
+    The session's world bible, or None before the opening scene has created it.
+    Sessions that predate the bible are seeded from the client's current world_info.
+    """
+    bible = world_bibles.get(agent_registry.memory, input.session_id)
+    # A session whose opening failed has no snapshot either; it still needs its opening scene
+    if (bible is None and input.game_progress.scenes_completed > 1
+            and has_user_memories(agent_registry.memory, input.session_id)):
+        bible = world_bibles.create(agent_registry.memory, input.session_id, input.current_scene.world_info,
+                                    input.game_progress.scenes_completed)
+    return bible
+
+
+def update_world_bible(input: AgentInput, bible: WorldBible, result_dict: dict) -> WorldBible:
+    """Create the bible from the opening scene's world_info, or apply the model's world_info_delta"""
+    scene = input.game_progress.scenes_completed
+    if bible is None:
+        return world_bibles.create(agent_registry.memory, input.session_id, WorldInfo(**result_dict["world_info"]), scene)
+    delta = result_dict.get("world_info_delta")
+    if delta:
+        bible = world_bibles.apply_delta(agent_registry.memory, bible, WorldInfoDelta(**delta), scene)
+    return bible
+
+
+def rehydrate_world_info(memory_data: dict, session_id: str) -> None:
+    """Put the bible's world_info back into a loaded snapshot, which no longer stores it"""
+    if "world_info" in memory_data:
+        return
+    bible = world_bibles.get(agent_registry.memory, session_id)
+    if bible is not None:
+        world_info = bible.world_info.model_dump()
+        memory_data["world_info"] = world_info
+        memory_data["current_scene"] = {**memory_data.get("current_scene", {}), "world_info": world_info}
+
+
+def rehydrate_lore_collection(memory_data: dict, session_id: str) -> None:
+    """Fill a loaded snapshot's lore_collection from the session's lore store, one entry per id"""
+    if "lore_collection" in memory_data:
+        return
+    lore = lore_store.get(agent_registry.memory, session_id)
+    memory_data["lore_collection"] = [entry.model_dump() for entry in lore.entries.values()]
+
+
+def create_carry_forward_response(input: AgentInput) -> dict:
+    """
+    Create a scene dictionary that repeats the previous scene's persistent state.
+    Used to fill sections a turn did not (or could not) regenerate.
+    """
+    current_scene = input.current_scene
+    carried = create_fallback_response(input)
+    carried.update({
+        "scene_tag": input.scene_tag or carried["scene_tag"],
+        "characters": [char.model_dump() for char in current_scene.characters],
+        "game_state": input.game_state.model_dump(),
+        "mood_atmosphere": current_scene.mood_atmosphere,
+        "interactive_elements": [element.model_dump() for element in current_scene.interactive_elements],
+        "threat_updates": [threat.model_dump() for threat in current_scene.threat_updates],
+        "discovered_lore": [lore.model_dump() for lore in current_scene.discovered_lore],
+        "world_info": current_scene.world_info.model_dump(),
+        "location_details": current_scene.location_details.model_dump(),
+    })
+    return carried
+
+
 def create_fallback_response(input: AgentInput) -> dict:
     """
     Create a fallback response when the main processing fails.
@@ -458,8 +906,8 @@ def create_fallback_response(input: AgentInput) -> dict:
             story_flags={},
             reputation={},
             major_events=[],
-            environmental_conditions=EnvironmentalConditions(),
-            resource_availability=ResourceAvailability()
+            environmental_conditions=EnvironmentalConditions(weather="clear", visibility="normal", temperature="comfortable", hazard_level=0),
+            resource_availability=ResourceAvailability(food="moderate", water="moderate", medical_supplies="scarce", shelter_materials="moderate", fuel="scarce", tools="moderate")
         ).model_dump(),
         "inventory_changes": InventoryChanges(
             added_items=[],
@@ -0,0 +1,198 @@
+# idempotency.py
+"""
+Single-flight and replay for /game/interact.
+
+A double-click or a client retry used to run the whole turn twice and
+append two snapshots. Turns are now keyed by (session, Idempotency-Key
+header). Without that header the key is the turn's own identity: scene
+number, interaction type and choice text.
+
+- A request whose key is already running waits for that run and gets its
+  result. The provider is called once.
+- A request whose key completed within IDEMPOTENCY_TTL_SECONDS gets the
+  stored scene back. This only applies to requests that sent an
+  Idempotency-Key.
+- Reusing a key for a different turn (another choice or scene) is refused
+  with 422.
+
+Failed turns (errors, fallback scenes) are not stored, so a retry runs
+again. Keys are held per worker. Each session's last completed keyed turn
+is also kept in the memory DB (a "<session>::last_turn" row), which every
+worker shares. A worker that takes the session's lock after another one
+wrote it checks that row first. So a retry or a resubmitted turn job that
+lands on another worker gets the scene back instead of running again.
+"""
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+import asyncio
+import hashlib
+import logging
+import os
+import time
+
+from models.serialization import dumps, dumps_str, loads
+
+logger = logging.getLogger(__name__)
+
+
+def last_turn_user_id(session_id: str) -> str:
+    return f"{session_id}::last_turn"
+
+
+class IdempotencyConflict(ValueError):
+    """The key was already used for a different turn"""
+
+
+class TurnDeduplicator:
+    def __init__(self, ttl_seconds: float = 600.0, max_entries: int = 2000,
+                 clock: Callable[[], float] = time.monotonic):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max(1, max_entries)
+        self.clock = clock
+        self._running: Dict[Tuple[str, str], Tuple[str, asyncio.Future]] = {}
+        # (session, key) -> (fingerprint, encoded scene, expires_at)
+        self._done: "OrderedDict[Tuple[str, str], Tuple[str, bytes, float]]" = OrderedDict()
+        self._stats = {"runs": 0, "shared": 0, "replayed": 0, "recalled": 0, "conflicts": 0, "expired": 0}
+
+    @classmethod
+    def from_env(cls) -> "TurnDeduplicator":
+        return cls(
+            ttl_seconds=float(os.getenv("IDEMPOTENCY_TTL_SECONDS", "600")),
+            max_entries=int(os.getenv("IDEMPOTENCY_MAX_ENTRIES", "2000")),
+        )
+
+    @staticmethod
+    def fingerprint(scenes_completed: int, interaction_type: str, choice: str) -> str:
+        """What makes two requests the same turn (the client rebuilds timestamps on every send)"""
+        return hashlib.sha1(f"{scenes_completed}|{interaction_type}|{choice}".encode()).hexdigest()[:16]
+
+    def _completed(self, key: Tuple[str, str], fingerprint: str) -> Optional[Dict[str, Any]]:
+        entry = self._done.get(key)
+        if entry is None:
+            return None
+        stored_fingerprint, body, expires_at = entry
+        if self.clock() >= expires_at:
+            self._done.pop(key)
+            self._stats["expired"] += 1
+            return None
+        if stored_fingerprint != fingerprint:
+            self._stats["conflicts"] += 1
+            raise IdempotencyConflict("Idempotency-Key was already used for a different turn")
+        self._stats["replayed"] += 1
+        return loads(body)
+
+    def _store(self, key: Tuple[str, str], fingerprint: str, scene_data: Dict[str, Any]) -> None:
+        self._done[key] = (fingerprint, dumps(scene_data), self.clock() + self.ttl_seconds)
+        self._done.move_to_end(key)
+        while len(self._done) > self.max_entries:
+            self._done.popitem(last=False)
+
+    async def run(self, session_id: str, idempotency_key: Optional[str], fingerprint: str,
+                  turn: Callable[[], Awaitable[Tuple[Dict[str, Any], bool, bool]]]) -> Tuple[Dict[str, Any], bool]:
+        """
+        Run `turn` once per key. `turn` returns (scene_data, completed,
+        recalled), and only completed turns are kept for replay; recalled
+        is True when `turn` found the scene with `recall` instead of playing
+        it. Returns (scene_data, replayed), where replayed is True when the
+        scene came from another request's run.
+        """
+        key = (session_id, idempotency_key or f"turn:{fingerprint}")
+        if idempotency_key:
+            scene_data = self._completed(key, fingerprint)
+            if scene_data is not None:
+                return scene_data, True
+
+        running = self._running.get(key)
+        if running is not None:
+            running_fingerprint, future = running
+            if running_fingerprint != fingerprint:
+                self._stats["conflicts"] += 1
+                raise IdempotencyConflict("Idempotency-Key is in use by a different turn")
+            self._stats["shared"] += 1
+            # Shielded: a waiter that disconnects must not cancel the run it joined
+            scene_data, _ = await asyncio.shield(future)
+            return scene_data, True
+
+        future = asyncio.get_running_loop().create_future()
+        self._running[key] = (fingerprint, future)
+        self._stats["runs"] += 1
+        try:
+            scene_data, completed, recalled = await turn()
+        except BaseException as e:
+            if not future.done():
+                future.set_exception(e)
+                # Nobody else may be waiting; don't log "exception never retrieved"
+                future.exception()
+            raise
+        finally:
+            self._running.pop(key, None)
+        future.set_result((scene_data, completed))
+        if completed and idempotency_key:
+            self._store(key, fingerprint, scene_data)
+        return scene_data, recalled
+
+    def remember(self, memory_instance, session_id: str, idempotency_key: Optional[str], fingerprint: str,
+                 scene_data: Dict[str, Any]) -> None:
+        """Keep a completed keyed turn as the session's last turn, for every worker; call it under the session lock"""
+        if not idempotency_key:
+            return
+        from agno.memory.v2.schema import UserMemory
+
+        user_id = last_turn_user_id(session_id)
+        entry = {"key": idempotency_key, "fingerprint": fingerprint, "expires_at": time.time() + self.ttl_seconds,
+                 "scene": scene_data}
+        try:
+            # A fixed memory_id makes every save an upsert of the session's single row
+            memory_instance.add_user_memory(user_id=user_id, memory=UserMemory(memory=dumps_str(entry), memory_id=user_id),
+                                            refresh_from_db=False)
+        except Exception as e:
+            logger.error(f"Error saving the last turn of session {session_id}: {e}")
+
+    def recall(self, memory_instance, session_id: str, idempotency_key: Optional[str],
+               fingerprint: str) -> Optional[Dict[str, Any]]:
+        """
+        The scene of this key's turn if it is the session's last turn, played
+        by any worker; call it under the session lock. A different turn
+        under the key is refused like a local one.
+        """
+        if not idempotency_key:
+            return None
+        user_id = last_turn_user_id(session_id)
+        try:
+            row = memory_instance.get_user_memory(memory_id=user_id, user_id=user_id)
+        except Exception as e:
+            logger.error(f"Error loading the last turn of session {session_id}: {e}")
+            return None
+        if row is None:
+            return None
+        entry = loads(row.memory)
+        if entry["key"] != idempotency_key or time.time() >= entry["expires_at"]:
+            return None
+        if entry["fingerprint"] != fingerprint:
+            self._stats["conflicts"] += 1
+            raise IdempotencyConflict("Idempotency-Key was already used for a different turn")
+        self._stats["recalled"] += 1
+        return entry["scene"]
+
+    def clear(self, session_id: str, memory_instance=None) -> None:
+        for key in [key for key in self._done if key[0] == session_id]:
+            self._done.pop(key)
+        if memory_instance is None:
+            return
+        user_id = last_turn_user_id(session_id)
+        try:
+            if memory_instance.get_user_memory(memory_id=user_id, user_id=user_id) is not None:
+                memory_instance.delete_user_memory(memory_id=user_id, user_id=user_id, refresh_from_db=False)
+        except Exception as e:
+            logger.error(f"Error clearing the last turn of session {session_id}: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": len(self._running),
+            "stored": len(self._done),
+            "ttl_seconds": self.ttl_seconds,
+            **self._stats,
+        }
+
+
+turn_deduplicator = TurnDeduplicator.from_env()
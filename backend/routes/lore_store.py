@@ -0,0 +1,207 @@
+# lore_store.py
+"""
+Per-session lore store.
+
+Every memory snapshot used to carry a lore_collection built by concatenating
+the previous and new discovered_lore, with no de-duplication by id, and
+related_entries were never resolved. Lore now lives in one store per session,
+indexed by id and category, with an undirected graph over related_entries
+(links to entries not discovered yet are kept and resolve once they appear).
+The game context gets only the top-k entries ranked by importance and
+relevance to the current scene instead of the whole collection.
+"""
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Set
+import logging
+import os
+import re
+
+from models.schemas import LoreEntry
+from models.serialization import dumps_str, loads
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r"[a-z0-9]{4,}")
+
+
+def lore_user_id(session_id: str) -> str:
+    """Memory user id holding a session's lore, kept apart from its scene snapshots"""
+    return f"{session_id}::lore"
+
+
+def _terms(*texts: str) -> Set[str]:
+    return {word for text in texts if text for word in _WORD.findall(text.lower())}
+
+
+class LoreIndex:
+    """One session's lore: entries by id, ids by category and the related_entries graph."""
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.entries: Dict[str, LoreEntry] = {}
+        self.first_seen: Dict[str, int] = {}
+        self.by_category: Dict[str, Set[str]] = {}
+        self.links: Dict[str, Set[str]] = {}
+        self._terms: Dict[str, Set[str]] = {}
+
+    def add(self, entries: Iterable[LoreEntry], scene: int) -> List[str]:
+        """Insert or update entries by id; returns the ids that changed"""
+        changed = []
+        for entry in entries:
+            previous = self.entries.get(entry.id)
+            if previous == entry:
+                continue
+            if previous is not None:
+                self.by_category[previous.category].discard(entry.id)
+                self._unlink(previous)
+            self.entries[entry.id] = entry
+            self.first_seen.setdefault(entry.id, scene)
+            self.by_category.setdefault(entry.category, set()).add(entry.id)
+            self._terms[entry.id] = _terms(entry.title, entry.content)
+            for related in entry.related_entries:
+                if related != entry.id:
+                    self.links.setdefault(entry.id, set()).add(related)
+                    self.links.setdefault(related, set()).add(entry.id)
+            changed.append(entry.id)
+        return changed
+
+    def _unlink(self, entry: LoreEntry) -> None:
+        """Drop the links entry added, except those the other side still lists itself"""
+        for related in entry.related_entries:
+            other = self.entries.get(related)
+            if related == entry.id or (other is not None and entry.id in other.related_entries):
+                continue
+            self.links.get(entry.id, set()).discard(related)
+            self.links.get(related, set()).discard(entry.id)
+
+    def related(self, entry_id: str) -> List[LoreEntry]:
+        """Discovered entries linked to entry_id in either direction"""
+        return [self.entries[other] for other in sorted(self.links.get(entry_id, ())) if other in self.entries]
+
+    def category(self, category: str) -> List[LoreEntry]:
+        return [self.entries[entry_id] for entry_id in sorted(self.by_category.get(category, ()))]
+
+    def top_k(self, k: int, query: Iterable[str] = (), focus: Iterable[str] = ()) -> List[LoreEntry]:
+        """
+        Entries ranked by importance plus relevance: shared words with the
+        query texts, being in focus (the current scene's lore) or linked to it.
+        """
+        query_terms = _terms(*query)
+        focus = {entry_id for entry_id in focus if entry_id in self.entries}
+        linked = {other for entry_id in focus for other in self.links.get(entry_id, ())}
+
+        def score(entry_id: str) -> tuple:
+            entry = self.entries[entry_id]
+            relevance = min(3, len(query_terms & self._terms[entry_id])) * 3
+            relevance += 3 if entry_id in focus else 2 if entry_id in linked else 0
+            return (entry.importance_level + relevance, self.first_seen[entry_id])
+
+        ranked = sorted(self.entries, key=score, reverse=True)
+        return [self.entries[entry_id] for entry_id in ranked[:max(0, k)]]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "session_id": self.session_id,
+            "entries": [
+                {"entry": entry.model_dump(), "first_seen": self.first_seen[entry_id]}
+                for entry_id, entry in self.entries.items()
+            ],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "LoreIndex":
+        index = cls(data["session_id"])
+        for item in data.get("entries", []):
+            index.add([LoreEntry(**item["entry"])], item.get("first_seen", 0))
+        return index
+
+
+def compact_lore(index: LoreIndex, entries: List[LoreEntry], max_chars: int = 240) -> str:
+    """Context lines for the retrieved entries, with their related titles resolved"""
+    if not entries:
+        return "None discovered yet"
+    lines = []
+    for entry in entries:
+        content = entry.content if len(entry.content) <= max_chars else entry.content[:max_chars].rstrip() + "..."
+        related = [other.title for other in index.related(entry.id)]
+        lines.append(
+            f"- [{entry.category}, importance {entry.importance_level}] {entry.title}: {content}"
+            + (f" (related: {', '.join(related)})" if related else "")
+        )
+    return f"{len(entries)} most relevant of {len(index.entries)} entries\n" + "\n".join(lines)
+
+
+class LoreStore:
+    def __init__(self, cache_size: int = 1000, top_k: int = 5):
+        self.cache_size = max(1, cache_size)
+        self.top_k = top_k
+        self._cache: "OrderedDict[str, LoreIndex]" = OrderedDict()
+        self._stats = {"saves": 0, "entries_added": 0, "duplicates_skipped": 0, "cache_hits": 0, "cache_misses": 0}
+
+    @classmethod
+    def from_env(cls) -> "LoreStore":
+        return cls(
+            cache_size=int(os.getenv("LORE_CACHE_SIZE", "1000")),
+            top_k=int(os.getenv("LORE_CONTEXT_TOP_K", "5")),
+        )
+
+    def _remember(self, index: LoreIndex) -> LoreIndex:
+        self._cache[index.session_id] = index
+        self._cache.move_to_end(index.session_id)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return index
+
+    def get(self, memory_instance, session_id: str) -> LoreIndex:
+        """The session's lore index; empty when nothing has been discovered"""
+        if session_id in self._cache:
+            self._stats["cache_hits"] += 1
+            self._cache.move_to_end(session_id)
+            return self._cache[session_id]
+        self._stats["cache_misses"] += 1
+        user_id = lore_user_id(session_id)
+        try:
+            row = memory_instance.get_user_memory(memory_id=user_id, user_id=user_id)
+            index = LoreIndex.from_dict(loads(row.memory)) if row is not None else LoreIndex(session_id)
+        except Exception as e:
+            logger.error(f"Error loading lore for session {session_id}: {e}")
+            index = LoreIndex(session_id)
+        return self._remember(index)
+
+    def add(self, memory_instance, session_id: str, entries: List[LoreEntry], scene: int) -> LoreIndex:
+        """Add discovered lore, persisting the session's single lore row only when something changed"""
+        from agno.memory.v2.schema import UserMemory
+
+        index = self.get(memory_instance, session_id)
+        changed = index.add(entries, scene)
+        self._stats["duplicates_skipped"] += len(entries) - len(changed)
+        if changed:
+            # A fixed memory_id makes every save an upsert of the session's single row
+            user_id = lore_user_id(session_id)
+            memory_instance.add_user_memory(
+                user_id=user_id,
+                memory=UserMemory(memory=dumps_str(index.to_dict()), memory_id=user_id),
+                refresh_from_db=False
+            )
+            self._stats["saves"] += 1
+            self._stats["entries_added"] += len(changed)
+        return index
+
+    def forget(self, session_id: str) -> None:
+        """Drop the resident lore index (another worker wrote the session); the next get re-reads it"""
+        self._cache.pop(session_id, None)
+
+    def clear(self, memory_instance, session_id: str) -> None:
+        self._cache.pop(session_id, None)
+        user_id = lore_user_id(session_id)
+        try:
+            if memory_instance.get_user_memory(memory_id=user_id, user_id=user_id) is not None:
+                memory_instance.delete_user_memory(memory_id=user_id, user_id=user_id, refresh_from_db=False)
+        except Exception as e:
+            logger.error(f"Error clearing lore for session {session_id}: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {"cached_sessions": len(self._cache), "top_k": self.top_k, **self._stats}
+
+
+lore_store = LoreStore.from_env()
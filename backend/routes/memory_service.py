@@ -1,21 +1,29 @@
 # memory_service.py
-from agno.memory.v2.schema import UserMemory
-from typing import List, Optional, Dict, Any
+from typing import TYPE_CHECKING, List, Optional, Dict, Any
+from models.serialization import dumps_str, loads
+from routes.session_cache import session_cache
+import hashlib
 import logging
-import json
+
+if TYPE_CHECKING:
+    from agno.memory.v2.schema import UserMemory
 
 logger = logging.getLogger(__name__)
 
 def add_game_memory(memory_instance, session_id: str, game_data: Dict[str, Any]) -> bool:
+    from agno.memory.v2.schema import UserMemory
 
     try:
         memory_summary = game_data
  
-        
+        user_memory = UserMemory(memory=dumps_str(memory_summary))
+        # No refresh: the session's rows are served from the session cache, not agno's in-memory copy
         memory_instance.add_user_memory(
             user_id=session_id,
-            memory=UserMemory(memory=json.dumps(memory_summary))
+            memory=user_memory,
+            refresh_from_db=False
         )
+        session_cache.write_through(session_id, user_memory, memory_summary)
   
         logger.info(f"Added game memory for session {session_id}")
         return True
@@ -24,11 +32,15 @@ def add_game_memory(memory_instance, session_id: str, game_data: Dict[str, Any])
         logger.error(f"Error adding game memory for session {session_id}: {e}")
         return False
 
-def get_user_memories(memory_instance, session_id: str) -> List[UserMemory]:
+def get_user_memories(memory_instance, session_id: str) -> List["UserMemory"]:
 
     try:
+        memories = session_cache.memories(session_id)
+        if memories is not None:
+            return memories
         
         memories = memory_instance.get_user_memories(user_id=session_id)
+        session_cache.fill(session_id, memories)
         
         logger.info(f"Retrieved {len(memories)} memories for session {session_id}")
         return memories
@@ -40,7 +52,8 @@ def get_user_memories(memory_instance, session_id: str) -> List[UserMemory]:
 def clear_user_memories(memory_instance, session_id: str) -> bool:
    
     try:
-        # Get all memories first
+        # Get all memories first, from the DB rather than the cache
+        session_cache.invalidate(session_id)
         memories = get_user_memories(memory_instance, session_id)
         
         # Delete each memory
@@ -50,6 +63,7 @@ def clear_user_memories(memory_instance, session_id: str) -> bool:
                     user_id=session_id,
                     memory_id=memory_item.memory_id
                 )
+        session_cache.invalidate(session_id)
         
         logger.info(f"Cleared all memories for session {session_id}")
         return True
@@ -58,7 +72,42 @@ def clear_user_memories(memory_instance, session_id: str) -> bool:
         logger.error(f"Error clearing memories for session {session_id}: {e}")
         return False
 
-def search_memories(memory_instance, session_id: str, query: str, limit: int = 10) -> List[UserMemory]:
+def get_latest_game_state(memory_instance, session_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Latest parsed game snapshot for a session, or None if there is none.
+    Served from the session cache; callers must not mutate the result.
+    """
+    try:
+        latest = session_cache.latest(session_id)
+        if latest is not None:
+            return latest
+        
+        memories = get_user_memories(memory_instance, session_id)
+        if not memories:
+            return None
+        latest = loads(memories[0].memory)
+        session_cache.fill_latest(session_id, latest, len(memories[0].memory))
+        return latest
+        
+    except Exception as e:
+        logger.error(f"Error getting latest game state for session {session_id}: {e}")
+        return None
+
+def get_session_validator(memory_instance, session_id: str) -> Optional[str]:
+    """
+    Validator for the session's stored state: changes whenever a snapshot is
+    added or removed. Built from the latest snapshot's last_updated and the
+    row count, both served from the session cache. None when there is nothing
+    stored.
+    """
+    memories = get_user_memories(memory_instance, session_id)
+    if not memories:
+        return None
+    latest = get_latest_game_state(memory_instance, session_id) or {}
+    key = f"{session_id}|{latest.get('last_updated')}|{len(memories)}"
+    return hashlib.sha1(key.encode()).hexdigest()[:20]
+
+def search_memories(memory_instance, session_id: str, query: str, limit: int = 10) -> List["UserMemory"]:
 
     try:
         results = memory_instance.search_user_memories(
@@ -74,7 +123,7 @@ def search_memories(memory_instance, session_id: str, query: str, limit: int = 1
         logger.error(f"Error searching memories for session {session_id}: {e}")
         return []
 
-def get_latest_memories(memory_instance, session_id: str, limit: int = 5) -> List[UserMemory]:
+def get_latest_memories(memory_instance, session_id: str, limit: int = 5) -> List["UserMemory"]:
 
     try:
         memories = get_user_memories(memory_instance, session_id)
@@ -0,0 +1,116 @@
+# scene_versions.py
+"""
+Scene versions for opt-in JSON Patch responses from /game/interact.
+
+Each scene served is given a version, "<epoch>.<n>", and sent back in the
+X-Scene-Version header. Serving the same scene again (an idempotent replay,
+a job collected twice) reuses its version. A client that has applied a scene can send that
+version as X-Scene-Base-Version on its next turn. If this worker still holds
+that version, the response is an RFC 6902 patch from it to the new scene
+(Content-Type application/json-patch+json) instead of the full
+SceneResponse. If it does not, the full scene is sent. That happens when
+the version is not recent, the worker has restarted (new epoch), the
+request went to another worker, or the patch would not be smaller.
+
+Sessions keep their last SCENE_PATCH_VERSIONS_KEPT scenes, as encoded JSON
+bytes, in an LRU bounded by SCENE_PATCH_MAX_SESSIONS.
+"""
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, Optional, Tuple
+import os
+import uuid
+
+from models.json_patch import make_patch
+from models.serialization import dumps, loads
+
+PATCH_MEDIA_TYPE = "application/json-patch+json"
+
+
+class SceneVersions:
+    def __init__(self, max_sessions: int = 1000, versions_kept: int = 2, enabled: bool = True):
+        self.max_sessions = max(1, max_sessions)
+        self.versions_kept = max(1, versions_kept)
+        self.enabled = enabled
+        # Versions from a previous process (or another worker) never match this one's
+        self.epoch = uuid.uuid4().hex[:8]
+        self._sessions: "OrderedDict[str, Deque[Tuple[str, bytes]]]" = OrderedDict()
+        self._counter = 0
+        self._stats = {"full": 0, "patches": 0, "base_missing": 0, "patch_not_smaller": 0,
+                       "full_bytes": 0, "patch_bytes": 0}
+
+    @classmethod
+    def from_env(cls) -> "SceneVersions":
+        return cls(
+            max_sessions=int(os.getenv("SCENE_PATCH_MAX_SESSIONS", "1000")),
+            versions_kept=int(os.getenv("SCENE_PATCH_VERSIONS_KEPT", "2")),
+            enabled=os.getenv("SCENE_PATCH_ENABLED", "true").lower() == "true",
+        )
+
+    def _find(self, session_id: str, version: str) -> Optional[bytes]:
+        for held, body in self._sessions.get(session_id, ()):
+            if held == version:
+                return body
+        return None
+
+    def _version_of(self, session_id: str, body: bytes) -> Optional[str]:
+        """The version this exact scene was already served under (an idempotent replay or a job collected twice)"""
+        for held, held_body in reversed(self._sessions.get(session_id, ())):
+            if held_body == body:
+                return held
+        return None
+
+    def record(self, session_id: str, body: bytes) -> str:
+        """Store a scene's encoded body as the session's newest version and return the version"""
+        self._counter += 1
+        version = f"{self.epoch}.{self._counter}"
+        if not self.enabled:
+            return version
+        versions = self._sessions.get(session_id)
+        if versions is None:
+            versions = self._sessions[session_id] = deque(maxlen=self.versions_kept)
+        versions.append((version, body))
+        self._sessions.move_to_end(session_id)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+        return version
+
+    def respond(self, session_id: str, scene_data: Dict[str, Any],
+                base_version: Optional[str]) -> Tuple[bytes, str, str]:
+        """
+        Encode a new scene and record it: (body, media type, version). The body
+        is a patch against base_version when that is held and the patch is
+        smaller, else the full scene.
+        """
+        full = dumps(scene_data)
+        base = self._find(session_id, base_version) if self.enabled and base_version else None
+        version = (self._version_of(session_id, full) if self.enabled else None) or self.record(session_id, full)
+        if base_version and self.enabled:
+            if base is None:
+                self._stats["base_missing"] += 1
+            else:
+                patch = dumps(make_patch(loads(base), loads(full)))
+                if len(patch) < len(full):
+                    self._stats["patches"] += 1
+                    self._stats["patch_bytes"] += len(patch)
+                    self._stats["full_bytes"] += len(full)
+                    return patch, PATCH_MEDIA_TYPE, version
+                self._stats["patch_not_smaller"] += 1
+        self._stats["full"] += 1
+        return full, "application/json", version
+
+    def clear(self, session_id: str) -> None:
+        self._sessions.pop(session_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        full_bytes = self._stats["full_bytes"]
+        return {
+            "enabled": self.enabled,
+            "epoch": self.epoch,
+            "sessions": len(self._sessions),
+            "versions_kept": self.versions_kept,
+            "patch_vs_full": round(self._stats["patch_bytes"] / full_bytes, 3) if full_bytes else None,
+            **self._stats,
+        }
+
+
+scene_versions = SceneVersions.from_env()
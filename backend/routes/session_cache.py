@@ -0,0 +1,181 @@
+# session_cache.py
+"""
+In-process LRU/TTL cache of session state in front of the memory DB.
+
+/init load, /memory/{session_id} and every turn's snapshot write used to
+re-read all of a session's rows from SQLite (agno refreshes from the DB on
+each call and eval()s every row) to get back state this worker had just
+written. The cache keeps each session's rows, newest first, and its latest
+parsed snapshot. add_game_memory writes through, and clear_user_memories
+invalidates.
+
+Entries expire after SESSION_CACHE_TTL_SECONDS so other workers' writes are
+picked up eventually. The cache is bounded by session count and by an
+approximate byte size (the serialized length of the cached rows). Latest
+snapshots are held as compact slotted records (models/compact.py) unless
+SESSION_CACHE_COMPACT=false.
+"""
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional
+import os
+import time
+
+from models.compact import CompactSnapshot, compact_snapshot
+
+if TYPE_CHECKING:
+    from agno.memory.v2.schema import UserMemory
+
+
+class _Entry:
+    __slots__ = ("memories", "latest", "latest_bytes", "size", "expires_at")
+
+    def __init__(self, expires_at: float):
+        self.memories: Optional[List["UserMemory"]] = None  # None until the full row list has been read once
+        self.latest: Optional[Any] = None  # snapshot dict, or a CompactSnapshot of it
+        self.latest_bytes = 0
+        self.size = 0
+        self.expires_at = expires_at
+
+    def resize(self) -> int:
+        rows = sum(len(memory.memory or "") for memory in self.memories) if self.memories is not None else 0
+        self.size = rows + self.latest_bytes
+        return self.size
+
+
+class SessionStateCache:
+    def __init__(self, max_sessions: int = 1000, max_bytes: int = 64 * 1024 * 1024, ttl_seconds: float = 1800.0,
+                 enabled: bool = True, compact: bool = True, clock: Callable[[], float] = time.monotonic):
+        self.max_sessions = max(1, max_sessions)
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self.compact = compact
+        self.clock = clock
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self.bytes = 0
+        self._stats = {"hits": 0, "misses": 0, "writes": 0, "invalidations": 0,
+                       "evictions_lru": 0, "evictions_bytes": 0, "expirations": 0}
+
+    @classmethod
+    def from_env(cls) -> "SessionStateCache":
+        return cls(
+            max_sessions=int(os.getenv("SESSION_CACHE_MAX_SESSIONS", "1000")),
+            max_bytes=int(os.getenv("SESSION_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+            ttl_seconds=float(os.getenv("SESSION_CACHE_TTL_SECONDS", "1800")),
+            enabled=os.getenv("SESSION_CACHE_ENABLED", "true").lower() == "true",
+            compact=os.getenv("SESSION_CACHE_COMPACT", "true").lower() == "true",
+        )
+
+    def _get(self, session_id: str) -> Optional[_Entry]:
+        entry = self._entries.get(session_id)
+        if entry is None:
+            return None
+        if self.clock() >= entry.expires_at:
+            self._drop(session_id)
+            self._stats["expirations"] += 1
+            return None
+        self._entries.move_to_end(session_id)
+        return entry
+
+    def _entry(self, session_id: str) -> _Entry:
+        entry = self._get(session_id)
+        if entry is None:
+            entry = _Entry(self.clock() + self.ttl_seconds)
+            self._entries[session_id] = entry
+        return entry
+
+    def _drop(self, session_id: str) -> None:
+        entry = self._entries.pop(session_id, None)
+        if entry is not None:
+            self.bytes -= entry.size
+
+    def _settle(self, session_id: str, entry: _Entry) -> None:
+        """Re-measure a written entry and restart its TTL, then evict least recently used sessions until within both caps"""
+        entry.expires_at = self.clock() + self.ttl_seconds
+        self.bytes -= entry.size
+        self.bytes += entry.resize()
+        while len(self._entries) > self.max_sessions:
+            self._drop(next(iter(self._entries)))
+            self._stats["evictions_lru"] += 1
+        while self.bytes > self.max_bytes and self._entries:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+            self._stats["evictions_bytes"] += 1
+            if oldest == session_id:
+                break
+
+    def memories(self, session_id: str) -> Optional[List["UserMemory"]]:
+        """Cached rows for a session, newest first; None on a miss"""
+        if not self.enabled:
+            return None
+        entry = self._get(session_id)
+        if entry is None or entry.memories is None:
+            self._stats["misses"] += 1
+            return None
+        self._stats["hits"] += 1
+        return list(entry.memories)
+
+    def latest(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Cached latest parsed snapshot for a session (a fresh dict when held compact); None on a miss"""
+        if not self.enabled:
+            return None
+        entry = self._get(session_id)
+        if entry is None or entry.latest is None:
+            self._stats["misses"] += 1
+            return None
+        self._stats["hits"] += 1
+        if isinstance(entry.latest, CompactSnapshot):
+            return entry.latest.to_dict()
+        return entry.latest
+
+    def _resident(self, data: Dict[str, Any]) -> Any:
+        if self.compact:
+            return compact_snapshot(data) or data
+        return data
+
+    def fill(self, session_id: str, memories: List["UserMemory"]) -> None:
+        """Cache the full row list read from the DB (newest first)"""
+        if not self.enabled:
+            return
+        entry = self._entry(session_id)
+        entry.memories = list(memories)
+        self._settle(session_id, entry)
+
+    def fill_latest(self, session_id: str, latest: Dict[str, Any], raw_bytes: int) -> None:
+        if not self.enabled:
+            return
+        entry = self._entry(session_id)
+        entry.latest, entry.latest_bytes = self._resident(latest), raw_bytes
+        self._settle(session_id, entry)
+
+    def write_through(self, session_id: str, memory: "UserMemory", data: Dict[str, Any]) -> None:
+        """Record a snapshot just written to the DB as the session's newest row and latest state"""
+        if not self.enabled:
+            return
+        self._stats["writes"] += 1
+        entry = self._entry(session_id)
+        if entry.memories is not None:
+            entry.memories.insert(0, memory)
+        entry.latest, entry.latest_bytes = self._resident(data), len(memory.memory or "")
+        self._settle(session_id, entry)
+
+    def invalidate(self, session_id: str) -> None:
+        if session_id in self._entries:
+            self._drop(session_id)
+            self._stats["invalidations"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self._stats["hits"] + self._stats["misses"]
+        return {
+            "enabled": self.enabled,
+            "compact": self.compact,
+            "sessions": len(self._entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+            "hit_rate": round(self._stats["hits"] / lookups, 3) if lookups else None,
+            **self._stats,
+        }
+
+
+session_cache = SessionStateCache.from_env()
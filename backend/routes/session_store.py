@@ -0,0 +1,346 @@
+# session_store.py
+"""
+Cross-process session coordination: per-session advisory locks and write
+versions.
+
+Several uvicorn workers (or hosts) can serve the same session. Two things
+must then hold. First, only one worker runs a session's turn, /init new or
+DELETE at a time. Second, a worker must notice that another one wrote the
+session since it last did, so it drops its resident copies (session cache,
+world bible, lore index, usage totals, rolling summary) and re-reads them
+from the memory DB.
+
+SESSION_STORE picks the backend:
+
+  local   one process: asyncio locks, in-memory versions (the default)
+  sqlite  processes on one host: lease rows in a WAL-mode SQLite file
+          (SESSION_STORE_URL, default data/session_store.db)
+  redis   any number of hosts: SET NX PX leases and INCR versions on
+          SESSION_STORE_URL (needs the optional `redis` package; startup
+          fails without it rather than falling back to a per-host store)
+
+Locks are leases that expire after SESSION_LOCK_TTL_SECONDS, so a worker
+that dies mid-turn cannot wedge a session. While a lock is held, a
+heartbeat renews the lease every third of the TTL, so a slow turn keeps
+it. A lease that was lost anyway (the heartbeat could not reach the store
+in time) is logged and counted as `lost`. Waiting longer than
+SESSION_LOCK_WAIT_SECONDS raises SessionBusy.
+"""
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from importlib.util import find_spec
+from typing import Any, AsyncIterator, Dict, Optional
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+REDIS_AVAILABLE = find_spec("redis") is not None
+
+
+class SessionBusy(TimeoutError):
+    """Another request held the session's lock for longer than the wait allows"""
+
+
+class SessionLease:
+    __slots__ = ("session_id", "token", "version", "changed", "waited", "lost")
+
+    def __init__(self, session_id: str, token: str, version: int, changed: bool, waited: float):
+        self.session_id = session_id
+        self.token = token
+        self.version = version
+        # True when another process wrote the session since this one last saw it
+        self.changed = changed
+        self.waited = waited
+        # Set when the lease expired or was taken over while this holder still ran
+        self.lost = False
+
+
+class SessionStore(ABC):
+    """
+    Base class: subclasses implement _acquire, _renew, _release, _version and _bump.
+    Contenders in the same process queue on a local asyncio lock first, so
+    only one of them polls the shared backend.
+    """
+    name = "base"
+    shared = True
+    seen_kept = 100000
+
+    def __init__(self, lock_ttl_seconds: float = 180.0, lock_wait_seconds: float = 30.0,
+                 poll_seconds: float = 0.05):
+        self.lock_ttl_seconds = lock_ttl_seconds
+        self.lock_wait_seconds = lock_wait_seconds
+        self.poll_seconds = poll_seconds
+        self._local: Dict[str, asyncio.Lock] = {}
+        self._waiters: Dict[str, int] = {}
+        # Last version each session had when this process wrote or read it
+        self._seen: "OrderedDict[str, int]" = OrderedDict()
+        self._stats = {"acquired": 0, "contended": 0, "busy": 0, "changed": 0, "renewed": 0, "lost": 0,
+                       "wait_seconds": 0.0}
+
+    @abstractmethod
+    async def _acquire(self, session_id: str, token: str) -> bool:
+        """Take the session's lease for `token`; False while someone else holds it"""
+
+    @abstractmethod
+    async def _renew(self, session_id: str, token: str) -> bool:
+        """Extend the lease by the TTL; False if `token` no longer holds it"""
+
+    @abstractmethod
+    async def _release(self, session_id: str, token: str) -> bool:
+        """Drop the lease if `token` still holds it; False if it did not"""
+
+    @abstractmethod
+    async def _version(self, session_id: str) -> int:
+        """The session's current write version (0 before its first write)"""
+
+    @abstractmethod
+    async def _bump(self, session_id: str) -> int:
+        """Advance the session's write version and return the new one"""
+
+    async def close(self) -> None:
+        pass
+
+    @asynccontextmanager
+    async def lock(self, session_id: str, wait_seconds: Optional[float] = None) -> AsyncIterator[SessionLease]:
+        """Hold the session's lock for the block; call `written` inside it after changing the session"""
+        wait = self.lock_wait_seconds if wait_seconds is None else wait_seconds
+        started = time.monotonic()
+        local = self._local.setdefault(session_id, asyncio.Lock())
+        self._waiters[session_id] = self._waiters.get(session_id, 0) + 1
+        try:
+            if local.locked():
+                self._stats["contended"] += 1
+            try:
+                await asyncio.wait_for(local.acquire(), timeout=wait)
+            except asyncio.TimeoutError:
+                self._stats["busy"] += 1
+                raise SessionBusy(f"session {session_id} is busy")
+            try:
+                token = uuid.uuid4().hex
+                while not await self._acquire(session_id, token):
+                    if time.monotonic() - started >= wait:
+                        self._stats["busy"] += 1
+                        raise SessionBusy(f"session {session_id} is locked by another worker")
+                    await asyncio.sleep(self.poll_seconds)
+                lease = SessionLease(session_id, token, 0, False, 0.0)
+                # One process needs no lease, so no heartbeat
+                heartbeat = asyncio.create_task(self._heartbeat(lease)) if self.shared else None
+                try:
+                    lease.version = await self._version(session_id)
+                    lease.changed = self._observe(session_id, lease.version)
+                    lease.waited = time.monotonic() - started
+                    self._stats["acquired"] += 1
+                    self._stats["changed"] += lease.changed
+                    self._stats["wait_seconds"] += lease.waited
+                    yield lease
+                finally:
+                    if heartbeat is not None:
+                        heartbeat.cancel()
+                        await asyncio.gather(heartbeat, return_exceptions=True)
+                    if not await self._release(session_id, token) and not lease.lost:
+                        self._lost(lease)
+            finally:
+                local.release()
+        finally:
+            self._waiters[session_id] -= 1
+            if not self._waiters[session_id]:
+                self._waiters.pop(session_id)
+                self._local.pop(session_id, None)
+
+    async def _heartbeat(self, lease: SessionLease) -> None:
+        """Renew the lease every third of the TTL until the holder releases it"""
+        while True:
+            await asyncio.sleep(self.lock_ttl_seconds / 3)
+            try:
+                renewed = await self._renew(lease.session_id, lease.token)
+            except Exception as e:
+                # The lease is still good until its TTL runs out; try again next beat
+                logger.warning(f"Could not renew the lock on session {lease.session_id}: {e!r}")
+                continue
+            if not renewed:
+                self._lost(lease)
+                return
+            self._stats["renewed"] += 1
+
+    def _lost(self, lease: SessionLease) -> None:
+        lease.lost = True
+        self._stats["lost"] += 1
+        logger.error(f"Lock on session {lease.session_id} was lost while held; "
+                     f"another worker may have written the session concurrently")
+
+    def _observe(self, session_id: str, version: int) -> bool:
+        """Remember the session's version; True if it moved since this process last saw it (or never saw it)"""
+        changed = self.shared and self._seen.get(session_id) != version
+        self._seen[session_id] = version
+        self._seen.move_to_end(session_id)
+        while len(self._seen) > self.seen_kept:
+            self._seen.popitem(last=False)
+        return changed
+
+    async def check(self, session_id: str) -> bool:
+        """Lock-free read path: True if another process wrote the session since this one last saw it"""
+        changed = self._observe(session_id, await self._version(session_id))
+        self._stats["changed"] += changed
+        return changed
+
+    async def written(self, lease: SessionLease) -> None:
+        """Record a write under the lease so other processes drop their resident copies"""
+        lease.version = await self._bump(lease.session_id)
+        self._observe(lease.session_id, lease.version)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.name,
+            "lock_ttl_seconds": self.lock_ttl_seconds,
+            "locked_sessions": len(self._local),
+            **{key: round(value, 3) if isinstance(value, float) else value for key, value in self._stats.items()},
+        }
+
+
+class LocalSessionStore(SessionStore):
+    """One process: the local asyncio lock is the whole lock"""
+    name = "local"
+    shared = False
+
+    async def _acquire(self, session_id: str, token: str) -> bool:
+        return True
+
+    async def _renew(self, session_id: str, token: str) -> bool:
+        return True
+
+    async def _release(self, session_id: str, token: str) -> bool:
+        return True
+
+    # Nothing else writes the sessions, so there is no version to track
+    async def _version(self, session_id: str) -> int:
+        return 0
+
+    async def _bump(self, session_id: str) -> int:
+        return 0
+
+
+class SqliteSessionStore(SessionStore):
+    """Processes on one host: lease and version rows in a WAL-mode SQLite file"""
+    name = "sqlite"
+
+    def __init__(self, path: str = "data/session_store.db", **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self._connections = threading.local()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as db:
+            db.execute("CREATE TABLE IF NOT EXISTS session_locks (session_id TEXT PRIMARY KEY, token TEXT, expires_at REAL)")
+            db.execute("CREATE TABLE IF NOT EXISTS session_versions (session_id TEXT PRIMARY KEY, version INTEGER)")
+
+    def _connect(self) -> sqlite3.Connection:
+        db = getattr(self._connections, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._connections.db = db
+        return db
+
+    def _acquire_sync(self, session_id: str, token: str) -> bool:
+        db = self._connect()
+        now = time.time()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            db.execute("DELETE FROM session_locks WHERE session_id = ? AND expires_at < ?", (session_id, now))
+            inserted = db.execute("INSERT OR IGNORE INTO session_locks VALUES (?, ?, ?)",
+                                  (session_id, token, now + self.lock_ttl_seconds)).rowcount
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+        return inserted == 1
+
+    async def _acquire(self, session_id: str, token: str) -> bool:
+        return await asyncio.to_thread(self._acquire_sync, session_id, token)
+
+    async def _renew(self, session_id: str, token: str) -> bool:
+        return await asyncio.to_thread(lambda: self._connect().execute(
+            "UPDATE session_locks SET expires_at = ? WHERE session_id = ? AND token = ?",
+            (time.time() + self.lock_ttl_seconds, session_id, token)).rowcount == 1)
+
+    async def _release(self, session_id: str, token: str) -> bool:
+        return await asyncio.to_thread(lambda: self._connect().execute(
+            "DELETE FROM session_locks WHERE session_id = ? AND token = ?", (session_id, token)).rowcount == 1)
+
+    async def _version(self, session_id: str) -> int:
+        row = await asyncio.to_thread(lambda: self._connect().execute(
+            "SELECT version FROM session_versions WHERE session_id = ?", (session_id,)).fetchone())
+        return row[0] if row else 0
+
+    async def _bump(self, session_id: str) -> int:
+        row = await asyncio.to_thread(lambda: self._connect().execute(
+            "INSERT INTO session_versions VALUES (?, 1) ON CONFLICT(session_id) "
+            "DO UPDATE SET version = version + 1 RETURNING version", (session_id,)).fetchone())
+        return row[0]
+
+
+# Delete or extend the lock only if this lease still owns it
+_REDIS_RELEASE = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) else return 0 end"
+_REDIS_RENEW = ("if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('pexpire', KEYS[1], ARGV[2]) "
+                "else return 0 end")
+
+
+class RedisSessionStore(SessionStore):
+    """Any number of hosts: SET NX PX leases and INCR versions in Redis (or anything speaking its protocol)"""
+    name = "redis"
+
+    def __init__(self, url: str = "redis://localhost:6379/0", prefix: str = "sinbad", **kwargs):
+        super().__init__(**kwargs)
+        import redis.asyncio as redis
+
+        self.url = url
+        self.prefix = prefix
+        self.client = redis.from_url(url)
+
+    async def _acquire(self, session_id: str, token: str) -> bool:
+        return bool(await self.client.set(f"{self.prefix}:lock:{session_id}", token, nx=True,
+                                          px=int(self.lock_ttl_seconds * 1000)))
+
+    async def _renew(self, session_id: str, token: str) -> bool:
+        return bool(await self.client.eval(_REDIS_RENEW, 1, f"{self.prefix}:lock:{session_id}", token,
+                                           int(self.lock_ttl_seconds * 1000)))
+
+    async def _release(self, session_id: str, token: str) -> bool:
+        return bool(await self.client.eval(_REDIS_RELEASE, 1, f"{self.prefix}:lock:{session_id}", token))
+
+    async def _version(self, session_id: str) -> int:
+        return int(await self.client.get(f"{self.prefix}:version:{session_id}") or 0)
+
+    async def _bump(self, session_id: str) -> int:
+        return int(await self.client.incr(f"{self.prefix}:version:{session_id}"))
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+def session_store_from_env() -> SessionStore:
+    backend = os.getenv("SESSION_STORE", "local").lower()
+    options = {
+        "lock_ttl_seconds": float(os.getenv("SESSION_LOCK_TTL_SECONDS", "180")),
+        "lock_wait_seconds": float(os.getenv("SESSION_LOCK_WAIT_SECONDS", "30")),
+    }
+    if backend == "redis":
+        # Falling back to a per-host store would silently unlock sessions across hosts
+        if not REDIS_AVAILABLE:
+            raise RuntimeError("SESSION_STORE=redis needs the redis package (pip install redis)")
+        return RedisSessionStore(url=os.getenv("SESSION_STORE_URL", "redis://localhost:6379/0"), **options)
+    if backend == "sqlite":
+        return SqliteSessionStore(path=os.getenv("SESSION_STORE_URL", "data/session_store.db"), **options)
+    if backend == "local":
+        return LocalSessionStore(**options)
+    raise ValueError(f"Unknown SESSION_STORE: {backend}")
+
+
+session_store = session_store_from_env()
@@ -0,0 +1,199 @@
+# turn_jobs.py
+"""
+Asynchronous turn jobs.
+
+A full turn can outlast the proxy timeouts between the browser, the Next.js
+/api/interact route and FastAPI. When a proxy gives up, the finished
+generation is lost. A client that sends `Prefer: respond-async` to
+/game/interact gets 202 Accepted and a job id right away. The turn runs on a
+bounded pool of JOB_WORKERS tasks fed by a queue of at most JOB_QUEUE_SIZE
+jobs; a full queue answers 503 with Retry-After. The client collects the
+scene from /game/jobs/{id}, either by polling or by long-polling with
+?wait=<seconds>. Finished jobs are kept for JOB_RESULT_TTL_SECONDS so a
+client that reconnects can still collect its scene.
+
+Jobs live in the worker process that accepted them. A poll that reaches
+another worker, or comes after the TTL, is a 404; the client then submits
+the turn again under the same Idempotency-Key.
+"""
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import asyncio
+import logging
+import os
+import time
+import uuid
+
+from fastapi import HTTPException
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFull(RuntimeError):
+    """The job queue is at JOB_QUEUE_SIZE"""
+
+
+class TurnJob:
+    __slots__ = ("job_id", "session_id", "run", "status", "result", "error_status", "error_detail",
+                 "created_at", "finished_at", "done")
+
+    def __init__(self, session_id: str, run: Callable[[], Awaitable[Any]]):
+        self.job_id = uuid.uuid4().hex
+        self.session_id = session_id
+        self.run = run
+        self.status = "queued"  # queued | running | done | failed
+        self.result: Any = None
+        self.error_status: Optional[int] = None
+        self.error_detail: Optional[str] = None
+        self.created_at = time.monotonic()
+        self.finished_at: Optional[float] = None
+        self.done = asyncio.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed")
+
+
+class TurnJobs:
+    def __init__(self, workers: int = 4, queue_size: int = 100, result_ttl_seconds: float = 300.0,
+                 max_wait_seconds: float = 25.0):
+        self.workers = max(1, workers)
+        self.queue_size = max(1, queue_size)
+        self.result_ttl_seconds = result_ttl_seconds
+        # Cap on ?wait=, kept under common proxy timeouts (60s)
+        self.max_wait_seconds = max_wait_seconds
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._jobs: "OrderedDict[str, TurnJob]" = OrderedDict()
+        self._queued: "OrderedDict[str, None]" = OrderedDict()
+        self._running = 0
+        self._stats = {"submitted": 0, "completed": 0, "failed": 0, "rejected": 0, "expired": 0,
+                       "queue_seconds": 0.0, "run_seconds": 0.0}
+
+    @classmethod
+    def from_env(cls) -> "TurnJobs":
+        return cls(
+            workers=int(os.getenv("JOB_WORKERS", "4")),
+            queue_size=int(os.getenv("JOB_QUEUE_SIZE", "100")),
+            result_ttl_seconds=float(os.getenv("JOB_RESULT_TTL_SECONDS", "300")),
+            max_wait_seconds=float(os.getenv("JOB_MAX_WAIT_SECONDS", "25")),
+        )
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        # Created here rather than in __init__ so the queue belongs to the serving event loop
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+        for job in self._jobs.values():
+            if not job.finished:
+                self._fail(job, 503, "Server shut down before the turn ran")
+
+    def submit(self, session_id: str, run: Callable[[], Awaitable[Any]]) -> TurnJob:
+        """Queue `run` for the pool; raises QueueFull when JOB_QUEUE_SIZE jobs are already waiting"""
+        self.start()
+        self._expire()
+        job = TurnJob(session_id, run)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self._stats["rejected"] += 1
+            raise QueueFull(f"{self.queue_size} turns are already queued")
+        self._jobs[job.job_id] = job
+        self._queued[job.job_id] = None
+        self._stats["submitted"] += 1
+        return job
+
+    def get(self, job_id: str) -> Optional[TurnJob]:
+        self._expire()
+        return self._jobs.get(job_id)
+
+    async def wait(self, job: TurnJob, seconds: float) -> TurnJob:
+        """Long-poll: return once the job finishes or `seconds` (capped at JOB_MAX_WAIT_SECONDS) pass"""
+        seconds = min(max(seconds, 0.0), self.max_wait_seconds)
+        if seconds and not job.finished:
+            try:
+                await asyncio.wait_for(job.done.wait(), timeout=seconds)
+            except asyncio.TimeoutError:
+                pass
+        return job
+
+    def position(self, job: TurnJob) -> Optional[int]:
+        """1-based place in the queue, or None once a worker has it"""
+        if job.job_id not in self._queued:
+            return None
+        for position, job_id in enumerate(self._queued, start=1):
+            if job_id == job.job_id:
+                return position
+
+    def clear(self, session_id: str) -> None:
+        """Forget a deleted session's finished jobs (queued and running ones still finish)"""
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.session_id == session_id and job.finished]:
+            self._jobs.pop(job_id)
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            self._queued.pop(job.job_id, None)
+            job.status = "running"
+            self._running += 1
+            started = time.monotonic()
+            self._stats["queue_seconds"] += started - job.created_at
+            try:
+                job.result = await job.run()
+                job.status = "done"
+                self._stats["completed"] += 1
+            except HTTPException as e:
+                self._fail(job, e.status_code, str(e.detail))
+            except asyncio.CancelledError:
+                self._fail(job, 503, "Server shut down while the turn ran")
+                raise
+            except Exception as e:
+                logger.error(f"Turn job {job.job_id} for session {job.session_id} failed: {e}", exc_info=True)
+                self._fail(job, 500, repr(e))
+            finally:
+                self._running -= 1
+                self._stats["run_seconds"] += time.monotonic() - started
+                job.finished_at = time.monotonic()
+                job.run = None
+                job.done.set()
+                self._queue.task_done()
+
+    def _fail(self, job: TurnJob, status: int, detail: str) -> None:
+        job.status = "failed"
+        job.error_status = status
+        job.error_detail = detail
+        job.finished_at = time.monotonic()
+        job.done.set()
+        self._stats["failed"] += 1
+
+    def _expire(self) -> None:
+        now = time.monotonic()
+        for job_id in [job_id for job_id, job in self._jobs.items()
+                       if job.finished and now - job.finished_at >= self.result_ttl_seconds]:
+            self._jobs.pop(job_id)
+            self._stats["expired"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "queue_depth": self.queue_depth,
+            "queue_size": self.queue_size,
+            "running": self._running,
+            "stored": len(self._jobs),
+            **{key: round(value, 3) if isinstance(value, float) else value for key, value in self._stats.items()},
+        }
+
+
+turn_jobs = TurnJobs.from_env()
@@ -0,0 +1,165 @@
+# world_bible.py
+"""
+Per-session world bible.
+
+world_info used to be regenerated by the model every scene and stored twice
+in every memory snapshot, although the world barely changes between scenes.
+The bible is created once from the opening scene, changed only through
+explicit `world_info_delta` objects in the model output, injected into the
+game context in compact form, and stored as a single memory row per session.
+"""
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+import os
+
+from models.schemas import WorldBible, WorldInfo, WorldInfoDelta
+from models.serialization import dumps_str, loads
+
+logger = logging.getLogger(__name__)
+
+CHANGELOG_SIZE = 20
+
+
+def bible_user_id(session_id: str) -> str:
+    """Memory user id holding a session's bible, kept apart from its scene snapshots"""
+    return f"{session_id}::world_bible"
+
+
+def _merge_list(current: List[Any], add: List[Any], remove: List[Any] = ()) -> List[Any]:
+    removed = {str(value).casefold() for value in remove}
+    merged = [value for value in current if str(value).casefold() not in removed]
+    seen = {str(value).casefold() for value in merged}
+    for value in add:
+        if str(value).casefold() not in seen:
+            merged.append(value)
+            seen.add(str(value).casefold())
+    return merged
+
+
+def apply_world_info_delta(world_info: WorldInfo, delta: WorldInfoDelta) -> Tuple[WorldInfo, bool]:
+    """Apply a delta to world_info; returns (updated, changed)"""
+    current = world_info.model_dump()
+    updated = dict(current)
+    for field in ("name", "theme", "description"):
+        value = getattr(delta, field)
+        if value:
+            updated[field] = value
+    for field in ("key_locations", "dominant_factions", "major_threats"):
+        updated[field] = _merge_list(current[field], getattr(delta, f"add_{field}"), getattr(delta, f"remove_{field}"))
+    updated["cultural_notes"] = _merge_list(current["cultural_notes"], delta.add_cultural_notes)
+    updated["historical_timeline"] = current["historical_timeline"] + delta.add_historical_events
+    return WorldInfo(**updated), updated != current
+
+
+def compact_world_bible(bible: WorldBible) -> str:
+    """One-paragraph rendering of the bible for the game context"""
+    world = bible.world_info
+    timeline = "; ".join(
+        f"{period}: {', '.join(events)}" for entry in world.historical_timeline[-5:] for period, events in entry.items()
+    )
+    return (
+        f"{world.name} (v{bible.version}, theme: {world.theme}). {world.description}\n"
+        f"Locations: {', '.join(world.key_locations) or 'none'} | "
+        f"Factions: {', '.join(world.dominant_factions) or 'none'} | "
+        f"Threats: {', '.join(world.major_threats) or 'none'}\n"
+        f"Culture: {'; '.join(world.cultural_notes) or 'none'}"
+        + (f"\nRecent history: {timeline}" if timeline else "")
+    )
+
+
+class WorldBibleStore:
+    def __init__(self, cache_size: int = 1000):
+        self.cache_size = max(1, cache_size)
+        self._cache: "OrderedDict[str, WorldBible]" = OrderedDict()
+        self._stats = {"created": 0, "updates": 0, "ignored_deltas": 0, "cache_hits": 0, "cache_misses": 0}
+
+    @classmethod
+    def from_env(cls) -> "WorldBibleStore":
+        return cls(cache_size=int(os.getenv("WORLD_BIBLE_CACHE_SIZE", "1000")))
+
+    def _remember(self, bible: WorldBible) -> WorldBible:
+        self._cache[bible.session_id] = bible
+        self._cache.move_to_end(bible.session_id)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return bible
+
+    def _save(self, memory_instance, bible: WorldBible) -> None:
+        from agno.memory.v2.schema import UserMemory
+
+        # A fixed memory_id makes every save an upsert of the session's single row
+        user_id = bible_user_id(bible.session_id)
+        memory_instance.add_user_memory(
+            user_id=user_id,
+            memory=UserMemory(memory=dumps_str(bible.model_dump()), memory_id=user_id),
+            refresh_from_db=False
+        )
+        self._remember(bible)
+
+    def get(self, memory_instance, session_id: str) -> Optional[WorldBible]:
+        if session_id in self._cache:
+            self._stats["cache_hits"] += 1
+            self._cache.move_to_end(session_id)
+            return self._cache[session_id]
+        self._stats["cache_misses"] += 1
+        user_id = bible_user_id(session_id)
+        try:
+            row = memory_instance.get_user_memory(memory_id=user_id, user_id=user_id)
+            if row is None:
+                return None
+            return self._remember(WorldBible(**loads(row.memory)))
+        except Exception as e:
+            logger.error(f"Error loading world bible for session {session_id}: {e}")
+            return None
+
+    def create(self, memory_instance, session_id: str, world_info: WorldInfo, scene: int) -> WorldBible:
+        bible = WorldBible(
+            session_id=session_id,
+            world_info=world_info,
+            updated_at=datetime.now().isoformat(),
+            changelog=[{"version": 1, "scene": scene, "reason": "created"}]
+        )
+        self._save(memory_instance, bible)
+        self._stats["created"] += 1
+        logger.info(f"Created world bible for session {session_id} at scene {scene}")
+        return bible
+
+    def apply_delta(self, memory_instance, bible: WorldBible, delta: WorldInfoDelta, scene: int) -> WorldBible:
+        """Apply the model's delta, bumping the version only when something actually changed"""
+        world_info, changed = apply_world_info_delta(bible.world_info, delta)
+        if not changed:
+            self._stats["ignored_deltas"] += 1
+            return bible
+        version = bible.version + 1
+        updated = WorldBible(
+            session_id=bible.session_id,
+            version=version,
+            world_info=world_info,
+            updated_at=datetime.now().isoformat(),
+            changelog=(bible.changelog + [{"version": version, "scene": scene, "reason": delta.reason or "updated"}])[-CHANGELOG_SIZE:]
+        )
+        self._save(memory_instance, updated)
+        self._stats["updates"] += 1
+        logger.info(f"World bible for session {bible.session_id} is now v{version}")
+        return updated
+
+    def forget(self, session_id: str) -> None:
+        """Drop the resident bible (another worker wrote the session); the next get re-reads it"""
+        self._cache.pop(session_id, None)
+
+    def clear(self, memory_instance, session_id: str) -> None:
+        self._cache.pop(session_id, None)
+        user_id = bible_user_id(session_id)
+        try:
+            if memory_instance.get_user_memory(memory_id=user_id, user_id=user_id) is not None:
+                memory_instance.delete_user_memory(memory_id=user_id, user_id=user_id, refresh_from_db=False)
+        except Exception as e:
+            logger.error(f"Error clearing world bible for session {session_id}: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {"cached_sessions": len(self._cache), **self._stats}
+
+
+world_bibles = WorldBibleStore.from_env()
@@ -0,0 +1,111 @@
+# world_bootstrap.py
+"""
+Coalescing of concurrent opening scenes for the same world.
+
+When a stream or event sends many players into one world at once, every
+session's first turn asks the model for the same thing: the world_info
+that seeds the session's world bible, the opening lore and the opening
+location. The first opening for a normalized world name generates. Any
+other opening for that world that arrives while it runs waits for it
+(up to WORLD_BOOTSTRAP_WAIT_SECONDS) and gets its own copy. Each session
+then builds its own bible, lore index and snapshot from that copy as if
+it had generated it.
+
+Only real generated openings are shared. When the leader fails, or its
+result is not `shareable` (a salvaged opening with no world of its own),
+its waiters generate their own, as does a waiter that times out, so
+coalescing never costs a player their scene. Only in-flight generations
+are shared; an opening that starts after the leader finished generates
+again.
+"""
+from typing import Any, Awaitable, Callable, Dict, Tuple
+import asyncio
+import logging
+import os
+
+from models.serialization import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+
+class NotShared(RuntimeError):
+    """The leader's opening is not fit to share; its waiters generate their own"""
+
+
+def normalize_world(world: str) -> str:
+    return " ".join(world.lower().split())
+
+
+class BootstrapCoalescer:
+    def __init__(self, wait_seconds: float = 30.0, enabled: bool = True):
+        self.wait_seconds = wait_seconds
+        self.enabled = enabled
+        self._running: Dict[str, asyncio.Future] = {}
+        self._stats = {"generated": 0, "coalesced": 0, "timeouts": 0, "leader_failures": 0, "not_shared": 0}
+
+    @classmethod
+    def from_env(cls) -> "BootstrapCoalescer":
+        return cls(
+            wait_seconds=float(os.getenv("WORLD_BOOTSTRAP_WAIT_SECONDS", "30")),
+            enabled=os.getenv("WORLD_BOOTSTRAP_COALESCE", "true").lower() == "true",
+        )
+
+    async def run(self, world: str, generate: Callable[[], Awaitable[Any]],
+                  shareable: Callable[[Any], bool] = lambda result: True) -> Tuple[Any, bool]:
+        """
+        The opening for `world`: generated by `generate` or shared from a
+        concurrent call. The result must be JSON-serializable; every caller
+        gets its own copy, and only results that pass `shareable` are handed
+        to waiters. Returns (result, shared).
+        """
+        if not self.enabled:
+            return await generate(), False
+        key = normalize_world(world)
+        running = self._running.get(key)
+        if running is not None:
+            try:
+                # Shielded: a waiter giving up must not cancel the leader's generation
+                encoded = await asyncio.wait_for(asyncio.shield(running), timeout=self.wait_seconds)
+                self._stats["coalesced"] += 1
+                logger.info(f"Opening for world '{key}' shared from a concurrent generation")
+                return loads(encoded), True
+            except asyncio.TimeoutError:
+                self._stats["timeouts"] += 1
+                logger.warning(f"Waited {self.wait_seconds}s for the opening of world '{key}'; generating")
+            except Exception as e:
+                self._stats["leader_failures"] += 1
+                logger.warning(f"Concurrent opening for world '{key}' failed ({e!r}); generating")
+            self._stats["generated"] += 1
+            return await generate(), False
+
+        future = asyncio.get_running_loop().create_future()
+        self._running[key] = future
+        self._stats["generated"] += 1
+        try:
+            result = await generate()
+            if shareable(result):
+                future.set_result(dumps(result))
+            else:
+                self._stats["not_shared"] += 1
+                future.set_exception(NotShared(f"Opening for world '{key}' is not shareable"))
+                future.exception()
+            return result, False
+        except BaseException as e:
+            if not future.done():
+                future.set_exception(e)
+                # Nobody may be waiting; don't log "exception never retrieved"
+                future.exception()
+            raise
+        finally:
+            self._running.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "in_flight": len(self._running),
+            "wait_seconds": self.wait_seconds,
+            **self._stats,
+        }
+
+
+world_bootstrap = BootstrapCoalescer.from_env()
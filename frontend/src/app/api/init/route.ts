@@ -5,18 +5,32 @@ export async function POST(req: NextRequest) {
 
     const data = await req.json();
     console.log(data)
-    // Your existing backend logic here (send data to FastAPI or run logic)
+    // Forward the client's validator so an unchanged saved game comes back as a 304
+    const headers: Record<string, string> = { 'Content-Type': 'application/json' };
+    const ifNoneMatch = req.headers.get('if-none-match');
+    if (ifNoneMatch) headers['If-None-Match'] = ifNoneMatch;
+
+    // fetch negotiates gzip/br with the backend and decompresses transparently
     const response = await fetch('http://localhost:8000/game/init', {
       method: 'POST',
-      headers: { 'Content-Type': 'application/json' },
+      headers,
       body: JSON.stringify(data),
     });
 
+    const etag = response.headers.get('etag');
+    const cacheHeaders: Record<string, string> = etag
+      ? { ETag: etag, 'Cache-Control': response.headers.get('cache-control') || 'private, no-cache' }
+      : {};
+
+    if (response.status === 304) {
+      return new NextResponse(null, { status: 304, headers: cacheHeaders });
+    }
+
     const result = await response.json();
-    return NextResponse.json(result);
+    return NextResponse.json(result, { headers: cacheHeaders });
 
   } catch (error) {
     console.error("❌ Error in /api/interact:", error);
     return NextResponse.json({ error: 'Failed to process interaction' }, { status: 500 });
   }
-}
\ No newline at end of file
+}
@@ -1,20 +1,36 @@
 // ✅ New App Router format
 import { NextRequest, NextResponse } from 'next/server';
-import { stringify } from 'querystring';
 
 export async function POST(req: NextRequest) {
   try {
     const data = await req.json();
-   
+
+    // Forward the turn's key so a retried or double-sent turn is answered once
+    const headers: Record<string, string> = { 'Content-Type': 'application/json' };
+    const idempotencyKey = req.headers.get('idempotency-key');
+    if (idempotencyKey) headers['Idempotency-Key'] = idempotencyKey;
+    // `Prefer: respond-async` queues the turn as a job; the client collects it from /api/jobs/[id]
+    const prefer = req.headers.get('prefer');
+    if (prefer) headers['Prefer'] = prefer;
+    // Opt-in JSON Patch: the scene version the client holds, so the answer can be a patch against it
+    const baseVersion = req.headers.get('x-scene-base-version');
+    if (baseVersion) headers['X-Scene-Base-Version'] = baseVersion;
+
     // Your existing backend logic here (send data to FastAPI or run logic)
     const response = await fetch('http://localhost:8000/game/interact', {
       method: 'POST',
-      headers: { 'Content-Type': 'application/json' },
+      headers,
       body: JSON.stringify(data),
     });
 
+    const passHeaders: Record<string, string> = {};
+    // content-type tells a JSON Patch body (application/json-patch+json) from a full scene
+    for (const name of ['idempotent-replayed', 'retry-after', 'x-scene-version', 'content-type']) {
+      const value = response.headers.get(name);
+      if (value) passHeaders[name] = value;
+    }
     const result = await response.json();
-    return NextResponse.json(result);
+    return NextResponse.json(result, { status: response.status, headers: passHeaders });
 
   } catch (error) {
     console.error("❌ Error in /api/interact:", error);
@@ -0,0 +1,31 @@
+import { NextRequest, NextResponse } from 'next/server';
+
+export async function GET(req: NextRequest, { params }: { params: Promise<{ id: string }> }) {
+  try {
+    const { id } = await params;
+    // `wait` long-polls on the backend; keep it under this route's own timeout
+    const wait = req.nextUrl.searchParams.get('wait') || '0';
+
+    // Opt-in JSON Patch: the finished scene can come back as a patch against the version the client holds
+    const headers: Record<string, string> = {};
+    const baseVersion = req.headers.get('x-scene-base-version');
+    if (baseVersion) headers['X-Scene-Base-Version'] = baseVersion;
+
+    const response = await fetch(
+      `http://localhost:8000/game/jobs/${encodeURIComponent(id)}?wait=${encodeURIComponent(wait)}`,
+      { cache: 'no-store', headers }
+    );
+
+    const passHeaders: Record<string, string> = {};
+    for (const name of ['idempotent-replayed', 'retry-after', 'x-job-id', 'x-scene-version', 'content-type']) {
+      const value = response.headers.get(name);
+      if (value) passHeaders[name] = value;
+    }
+    const result = await response.json();
+    return NextResponse.json(result, { status: response.status, headers: passHeaders });
+
+  } catch (error) {
+    console.error("❌ Error in /api/jobs:", error);
+    return NextResponse.json({ error: 'Failed to fetch turn job' }, { status: 500 });
+  }
+}
@@ -4,6 +4,7 @@ import { useState, useEffect } from "react";
 import { useSession } from "next-auth/react";
 import { useRouter } from "next/navigation";
 import { useGameContext } from '@/components/GameContext';
+import { fetchSavedGame } from '@/hooks/useGameMemory';
 
 export default function HomeScreen() {
   const { data: session } = useSession();
@@ -27,12 +28,7 @@ export default function HomeScreen() {
 
   useEffect(() => {
     const checkMemory = async () => {
-      const res = await fetch("/api/init", {
-        method: "POST",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ session_id, action: "load" }),
-      });
-      const data = await res.json();
+      const data = await fetchSavedGame(session_id);
       if (data.status === "loaded") {
         setHasSavedGame(true);
         setLastNarration(data.scene_state || "");
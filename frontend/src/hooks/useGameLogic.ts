@@ -31,6 +31,10 @@ export const useGameLogic = () => {
   
   const [sessionStartTime, setSessionStartTime] = useState(Date.now());
   const hasLoadedInitialScene = useRef(false);
+  // Set synchronously, so a double-click cannot slip in before `loading` re-renders
+  const turnInFlight = useRef(false);
+  // Idempotency key of the turn last sent; a retry of the same turn reuses it and gets the same scene
+  const pendingTurn = useRef<{ signature: string; key: string } | null>(null);
 
   // Create default structures to prevent backend errors
   const createDefaultWorldInfo = (): WorldInfo => ({
@@ -215,6 +219,35 @@ useEffect(() => {
   }
 }, [initialized, gameMemory, gameData?.worldName]); // Updated dependencies
 
+  // Submit a turn and long-poll its job (202 + job_id) until the scene or error is ready
+  const collectTurn = async (submit: () => Promise<Response>): Promise<Response> => {
+    let response = await submit();
+    let failures = 0;
+    let resubmits = 0;
+    while (response.status === 202) {
+      const { job_id } = await response.json();
+      while (true) {
+        try {
+          const poll = await fetch(`/api/jobs/${job_id}?wait=20`);
+          failures = 0;
+          if (poll.status === 202) continue;
+          // Jobs live on the worker that accepted them: a poll routed elsewhere (or after the job
+          // expired) is a 404, so send the turn again under the same Idempotency-Key
+          if (poll.status === 404 && ++resubmits <= 3) {
+            response = await submit();
+            break;
+          }
+          return poll;
+        } catch (err) {
+          // The job keeps running on the server; retry a dropped poll a few times before giving up
+          if (++failures >= 3) throw err;
+          await new Promise(resolve => setTimeout(resolve, 1000));
+        }
+      }
+    }
+    return response;
+  };
+
   const handleChoice = async (
     choiceText: string,
     interactionType: UserInteraction['interaction_type'],
@@ -222,7 +255,8 @@ useEffect(() => {
     elementType?: string,
     choiceIndex?: number
   ) => {
-    if (loading) return;
+    if (loading || turnInFlight.current) return;
+    turnInFlight.current = true;
 
     setLoading(true);
     setError(null);
@@ -300,11 +334,29 @@ useEffect(() => {
 
       console.log("Sending request to backend:", JSON.stringify(requestBody, null, 2));
       
-      const response = await fetch("/api/interact", {
+      const signature = `${updatedScenesCompleted}|${interactionType}|${choiceText}`;
+      if (pendingTurn.current?.signature !== signature) {
+        pendingTurn.current = { signature, key: crypto.randomUUID() };
+      }
+
+      // Queued as a job so a slow turn cannot be cut off by a proxy timeout; the scene is collected below
+      const idempotencyKey = pendingTurn.current.key;
+      const response = await collectTurn(() => fetch("/api/interact", {
         method: "POST",
-        headers: { "Content-Type": "application/json" },
+        headers: {
+          "Content-Type": "application/json",
+          "Idempotency-Key": idempotencyKey,
+          "Prefer": "respond-async"
+        },
         body: JSON.stringify(requestBody)
-      });
+      }));
+
+      if (response.status === 503) {
+        // Overloaded: the turn was not played, so the current scene stays; the same choice can be sent again
+        const retryAfter = response.headers.get("retry-after");
+        setError(`The server is busy${retryAfter ? `; try again in ${retryAfter}s` : ""}.`);
+        return;
+      }
 
       if (!response.ok) {
         const errorText = await response.text();
@@ -318,6 +370,7 @@ useEffect(() => {
         throw new Error("Invalid response: missing required fields");
       }
 
+      pendingTurn.current = null;
       setScene(data);
       
       // Update game progress with safe property access
@@ -346,6 +399,7 @@ useEffect(() => {
       const errorMessage = err instanceof Error ? err.message : "An unexpected error occurred";
       setError(`Failed to process choice: ${errorMessage}`);
     } finally {
+      turnInFlight.current = false;
       setLoading(false);
     }
   };
@@ -4,6 +4,39 @@ import { useEffect, useState } from "react";
 import { useSession } from "next-auth/react";
 import { useGameContext } from "@/components/GameContext"; // adjust path as needed
 
+// Saved-game load revalidated with the ETag of the last one: an unchanged save costs a 304
+export async function fetchSavedGame(session_id: string): Promise<any> {
+  const cacheKey = `initLoad:${session_id}`;
+  let cached: { etag: string; data: any } | null = null;
+  try {
+    cached = JSON.parse(sessionStorage.getItem(cacheKey) || "null");
+  } catch {
+    cached = null;
+  }
+
+  const headers: Record<string, string> = { "Content-Type": "application/json" };
+  if (cached?.etag) headers["If-None-Match"] = cached.etag;
+  const res = await fetch("/api/init", {
+    method: "POST",
+    headers,
+    body: JSON.stringify({ session_id, action: "load" }),
+  });
+  if (res.status === 304 && cached) return cached.data;
+
+  const data = await res.json();
+  const etag = res.headers.get("etag");
+  try {
+    if (etag && data.status === "loaded") {
+      sessionStorage.setItem(cacheKey, JSON.stringify({ etag, data }));
+    } else {
+      sessionStorage.removeItem(cacheKey);
+    }
+  } catch {
+    // Over quota: go without revalidation
+    sessionStorage.removeItem(cacheKey);
+  }
+  return data;
+}
 
 export function useGameMemory(scene: SceneResponse | null) {
   const { data: session } = useSession();
@@ -46,12 +79,7 @@ export function useGameMemory(scene: SceneResponse | null) {
       const loadFromServer = async () => {
         try {
           console.log("Attempting to load game memory from server");
-          const res = await fetch("/api/init", {
-            method: "POST",
-            headers: { "Content-Type": "application/json" },
-            body: JSON.stringify({ session_id, action: "load" }),
-          });
-          const data = await res.json();
+          const data = await fetchSavedGame(session_id);
           if (data.status === "loaded") {
             const memory = data.latest_memory_data;
             console.log("Loaded game memory from server");
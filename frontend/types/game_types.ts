@@ -251,6 +251,7 @@ interface SceneResponse {
   discovered_lore: LoreEntry[];
   world_info: WorldInfo;
   location_details: LocationDetails;
+  salvaged_fields?: Record<string, string>; // field -> "regenerated" | "derived" | "carried_forward"
 }
 
 // Enhanced memory model